@@ -1,38 +1,262 @@
+import atexit
+import base64
+import click
+import csv
+import functools
+import hashlib
+import importlib.util
+import io
+import json
 import os
+import re
 import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from typing import NamedTuple, Optional
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, session, jsonify, g, send_from_directory, stream_with_context
+from flask import before_render_template, has_request_context, make_response, message_flashed, template_rendered
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSession
+from itsdangerous import URLSafeSerializer, BadSignature
+from markupsafe import Markup, escape
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+from sqlalchemy.exc import IntegrityError, OperationalError
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.utils import secure_filename
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-import cloudinary
-import cloudinary.uploader
 import uuid
+import media
+from changefeed import ChangeFeed
+from metrics import RequestMetrics, instrument_methods
+from ratelimit import MemoryBackend, RateLimiter, RedisBackend, SQLiteBackend, parse_limit, retry_after_seconds
+from storage import CloudinaryStorage, LocalStorage
 
 # Flask init
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET', 'dev-secret-key-123456')
 
-# Gunakan SQLite untuk Vercel - lebih reliable
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///streamflix.db'
+# Database: DATABASE_URL (PostgreSQL) untuk production, SQLite lokal untuk satu node
+def database_url(value):
+    # Heroku/Vercel Postgres memberi skema postgres:// yang tidak dikenal SQLAlchemy
+    if value.startswith('postgres://'):
+        return 'postgresql://' + value[len('postgres://'):]
+    return value
+
+def engine_options(url):
+    if url.startswith('sqlite'):
+        # Pragma WAL diset per koneksi di _sqlite_pragmas
+        return {'connect_args': {'timeout': 15}}
+    options = {
+        # Worker serverless berumur pendek: pool kecil, cek koneksi mati, daur ulang sebelum idle timeout server
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 300)),
+        'connect_args': {'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5))}
+    }
+    if os.getenv('DB_POOL', 'queue') == 'null':
+        # Di belakang PgBouncer/pooler eksternal: jangan simpan koneksi di proses
+        options['poolclass'] = NullPool
+    else:
+        options['pool_size'] = int(os.getenv('DB_POOL_SIZE', 2))
+        options['max_overflow'] = int(os.getenv('DB_MAX_OVERFLOW', 3))
+        options['pool_timeout'] = int(os.getenv('DB_POOL_TIMEOUT', 10))
+    return options
+
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url(os.getenv('DATABASE_URL', 'sqlite:///streamflix.db'))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Migrasi + seed admin: normalnya lewat `flask init-db` saat deploy. SQLite lokal/ephemeral
+# tidak punya langkah deploy, jadi defaultnya dicek sekali di request pertama: database yang
+# sudah di head hanya butuh satu SELECT (~10 ms cold start), database kosong menjalankan
+# semua migrasi (~150 ms, lihat bench/cold_start.py)
+app.config['DB_AUTO_MIGRATE'] = os.getenv(
+    'DB_AUTO_MIGRATE', '1' if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite') else '0'
+) == '1'
+
+# Read replica opsional untuk katalog, pencarian dan cek entitlement
+if os.getenv('DATABASE_REPLICA_URL'):
+    replica_url = database_url(os.getenv('DATABASE_REPLICA_URL'))
+    app.config['SQLALCHEMY_BINDS'] = {'replica': {'url': replica_url, **engine_options(replica_url)}}
+
+# Cache entitlement per device (detik); di-invalidate oleh aksi admin
+app.config['ENTITLEMENT_CACHE_TTL'] = int(os.getenv('ENTITLEMENT_CACHE_TTL', 60))
+app.config['ENTITLEMENT_CACHE_MAX'] = int(os.getenv('ENTITLEMENT_CACHE_MAX', 10000))
+
+# Klaim entitlement bertanda tangan di session (detik)
+app.config['ENTITLEMENT_CLAIM_MAX_AGE'] = int(os.getenv('ENTITLEMENT_CLAIM_MAX_AGE', 24 * 3600))
+app.config['REVOCATION_REFRESH_INTERVAL'] = int(os.getenv('REVOCATION_REFRESH_INTERVAL', 30))
+
+# Katalog video: ukuran halaman dan cache halaman per proses
+app.config['CATALOG_PAGE_SIZE'] = int(os.getenv('CATALOG_PAGE_SIZE', 24))
+app.config['CATALOG_MAX_PAGE_SIZE'] = 100
+app.config['CATALOG_CACHE_TTL'] = int(os.getenv('CATALOG_CACHE_TTL', 300))
+app.config['CATALOG_CACHE_MAX_PAGES'] = 256
+# Mode shell: HTML katalog sama untuk semua penonton, bagian yang bergantung entitlement
+# (banner paywall, overlay kunci, akses player) diatur di browser dari /api/viewer
+app.config['CATALOG_SHELL'] = os.getenv('CATALOG_SHELL', '1') == '1'
+
+# Pencarian video: batas waktu query (ms), batas hasil dan cache hasil
+app.config['SEARCH_TIME_BUDGET_MS'] = int(os.getenv('SEARCH_TIME_BUDGET_MS', 150))
+app.config['SEARCH_MAX_RESULTS'] = 50
+app.config['SEARCH_CACHE_TTL'] = int(os.getenv('SEARCH_CACHE_TTL', 60))
+app.config['SEARCH_CACHE_MAX'] = 1024
+
+# Cache HTTP: halaman/JSON katalog yang sama untuk semua penonton anonim
+app.config['PAGE_CACHE_TTL'] = int(os.getenv('PAGE_CACHE_TTL', 300))
+app.config['PAGE_CACHE_MAX'] = int(os.getenv('PAGE_CACHE_MAX', 512))
+# Edge (Vercel): simpan s-maxage detik, lalu sajikan versi basi sambil revalidate
+app.config['HTTP_CACHE_S_MAXAGE'] = int(os.getenv('HTTP_CACHE_S_MAXAGE', 60))
+app.config['HTTP_CACHE_SWR'] = int(os.getenv('HTTP_CACHE_SWR', 300))
+
+# Pipeline upload di background: file di-spool ke disk lalu diupload per chunk
+# Antrean (thread worker atau `flask process-uploads`) hanya untuk host yang prosesnya tetap hidup
+# dan berbagi UPLOAD_SPOOL_DIR dengan worker: VM/container, atau beberapa instance dengan volume bersama.
+# Di serverless (Vercel) /tmp milik satu instance dan thread dibekukan setelah response, jadi
+# UPLOAD_INLINE menyelesaikan upload di request itu juga; video besar lewat direct upload ke storage
+app.config['STORAGE_BACKEND'] = os.getenv('STORAGE_BACKEND', 'cloudinary')
+app.config['LOCAL_STORAGE_DIR'] = os.getenv('LOCAL_STORAGE_DIR', os.path.join(app.instance_path, 'media'))
+app.config['UPLOAD_SPOOL_DIR'] = os.getenv('UPLOAD_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'streamflix_spool'))
+app.config['UPLOAD_INLINE'] = os.getenv('UPLOAD_INLINE', '1' if os.getenv('VERCEL') else '0') == '1'
+app.config['UPLOAD_WORKERS'] = int(os.getenv('UPLOAD_WORKERS', 2))
+app.config['UPLOAD_CHUNK_SIZE'] = int(os.getenv('UPLOAD_CHUNK_SIZE', 20 * 1024 * 1024))
+app.config['UPLOAD_MAX_ATTEMPTS'] = 3
+app.config['UPLOAD_STALE_AFTER'] = 600
+
+# Bukti pembayaran diproses worker sebelum diupload: dikecilkan, thumbnail, hash perseptual
+app.config['PROOF_MAX_SIDE'] = int(os.getenv('PROOF_MAX_SIDE', 1600))
+app.config['PROOF_JPEG_QUALITY'] = int(os.getenv('PROOF_JPEG_QUALITY', 80))
+app.config['PROOF_THUMB_WIDTH'] = int(os.getenv('PROOF_THUMB_WIDTH', 320))
+# Jarak Hamming maksimal dHash 64-bit untuk dianggap gambar yang sama, dan jumlah bukti terbaru yang dibandingkan
+app.config['PROOF_DUPLICATE_DISTANCE'] = int(os.getenv('PROOF_DUPLICATE_DISTANCE', 6))
+app.config['PROOF_DUPLICATE_WINDOW'] = int(os.getenv('PROOF_DUPLICATE_WINDOW', 5000))
+
+# Rate limit penebusan kode akses: token bucket "burst/periode detik"
+# Backend: memory (per proses), sqlite (bersama di satu host) atau redis (bersama semua instance)
+app.config['RATE_LIMIT_BACKEND'] = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+# URL Redis wajib diisi untuk backend redis; untuk sqlite berupa path file (default instance/ratelimit.db)
+app.config['RATE_LIMIT_URL'] = os.getenv('RATE_LIMIT_URL')
+if app.config['RATE_LIMIT_BACKEND'] == 'redis':
+    if not app.config['RATE_LIMIT_URL']:
+        raise RuntimeError('RATE_LIMIT_URL wajib diisi jika RATE_LIMIT_BACKEND=redis')
+    if importlib.util.find_spec('redis') is None:
+        raise RuntimeError('RATE_LIMIT_BACKEND=redis butuh paket redis (pip install -r requirements.txt)')
+app.config['RATE_LIMIT_REDEEM_IP'] = os.getenv('RATE_LIMIT_REDEEM_IP', '10/60')
+app.config['RATE_LIMIT_REDEEM_DEVICE'] = os.getenv('RATE_LIMIT_REDEEM_DEVICE', '5/60')
+# Kode salah per IP; habis = IP dikunci sampai bucket terisi lagi
+app.config['RATE_LIMIT_REDEEM_FAILURES'] = os.getenv('RATE_LIMIT_REDEEM_FAILURES', '20/3600')
+# Batas total lookup kode ke database, berapa pun IP penyerangnya
+app.config['RATE_LIMIT_REDEEM_GLOBAL'] = os.getenv('RATE_LIMIT_REDEEM_GLOBAL', '20/1')
+# Event beacon pemutaran per IP (buffer analitik tidak bisa dibanjiri satu klien)
+app.config['RATE_LIMIT_PLAYBACK'] = os.getenv('RATE_LIMIT_PLAYBACK', '120/60')
+# Jumlah proxy (Vercel edge) di depan app; IP klien diambil dari X-Forwarded-For sejauh itu
+app.config['TRUSTED_PROXIES'] = int(os.getenv('TRUSTED_PROXIES', 1))
+
+# Upload langsung dari browser ke storage (detik berlakunya tanda tangan)
+app.config['DIRECT_UPLOAD_TTL'] = int(os.getenv('DIRECT_UPLOAD_TTL', 900))
+
+# Dashboard admin: cache statistik (detik) dan ukuran halaman panel video/pembayaran
+app.config['DASHBOARD_STATS_TTL'] = int(os.getenv('DASHBOARD_STATS_TTL', 30))
+app.config['ADMIN_PANEL_PAGE_SIZE'] = int(os.getenv('ADMIN_PANEL_PAGE_SIZE', 10))
+# Paginator tabel kode: hitung paling banyak sekian baris yang cocok, sisanya ditampilkan "N+"
+app.config['ADMIN_CODE_COUNT_CAP'] = int(os.getenv('ADMIN_CODE_COUNT_CAP', 10000))
+# Live update dashboard: perubahan yang disimpan untuk disusul, umur satu koneksi SSE
+# (detik; browser menyambung lagi), jeda keepalive, jeda polling fallback, SSE on/off
+app.config['ADMIN_EVENTS_BUFFER'] = int(os.getenv('ADMIN_EVENTS_BUFFER', 1000))
+app.config['ADMIN_EVENTS_STREAM_SECONDS'] = int(os.getenv('ADMIN_EVENTS_STREAM_SECONDS', 55))
+app.config['ADMIN_EVENTS_KEEPALIVE'] = int(os.getenv('ADMIN_EVENTS_KEEPALIVE', 15))
+app.config['ADMIN_EVENTS_POLL_INTERVAL'] = int(os.getenv('ADMIN_EVENTS_POLL_INTERVAL', 10))
+app.config['ADMIN_EVENTS_SSE'] = os.getenv('ADMIN_EVENTS_SSE', '1') == '1'
+
+# Minting kode massal: kode per chunk (satu INSERT + satu commit) dan batas per permintaan
+app.config['MINT_CHUNK_SIZE'] = int(os.getenv('MINT_CHUNK_SIZE', 1000))
+app.config['MINT_MAX_COUNT'] = int(os.getenv('MINT_MAX_COUNT', 100000))
+
+# Analitik pemutaran (write-behind): flush buffer tiap N detik (0 = hanya saat ambang/exit)
+# oleh request yang selesai setelah interval lewat (dan thread, jika proses tetap hidup),
+# atau langsung di request beacon saat sekian event terkumpul, batas kunci (video, jam) di buffer, detik progress
+# maksimum per event, jendela dan cache "paling banyak ditonton"
+app.config['PLAYBACK_FLUSH_INTERVAL'] = int(os.getenv('PLAYBACK_FLUSH_INTERVAL', 10))
+app.config['PLAYBACK_FLUSH_EVENTS'] = int(os.getenv('PLAYBACK_FLUSH_EVENTS', 500))
+app.config['PLAYBACK_BUFFER_MAX_KEYS'] = int(os.getenv('PLAYBACK_BUFFER_MAX_KEYS', 50000))
+app.config['PLAYBACK_MAX_PROGRESS_SECONDS'] = int(os.getenv('PLAYBACK_MAX_PROGRESS_SECONDS', 120))
+app.config['POPULAR_WINDOW_HOURS'] = int(os.getenv('POPULAR_WINDOW_HOURS', 168))
+app.config['POPULAR_CACHE_TTL'] = int(os.getenv('POPULAR_CACHE_TTL', 300))
+
+# Export massal: baris per fetch dari cursor database dan ukuran potongan response (byte)
+app.config['EXPORT_BATCH_SIZE'] = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+app.config['EXPORT_CHUNK_BYTES'] = int(os.getenv('EXPORT_CHUNK_BYTES', 64 * 1024))
+
+# Instrumentasi: peringatan jika satu request menjalankan terlalu banyak query,
+# batas query lambat (ms), token scraper untuk /metrics (tanpa token hanya admin yang login)
+app.config['QUERY_COUNT_WARN'] = int(os.getenv('QUERY_COUNT_WARN', 20))
+app.config['SLOW_QUERY_MS'] = int(os.getenv('SLOW_QUERY_MS', 250))
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+app.config['PROFILE_SAMPLE_SIZE'] = 1000
+
+# Sweeper kode kedaluwarsa: jeda antar putaran (detik; 0 = hanya `flask sweep-codes`),
+# ukuran batch, dan arsipkan alih-alih hapus
+app.config['CODE_SWEEP_INTERVAL'] = int(os.getenv('CODE_SWEEP_INTERVAL', 300))
+app.config['CODE_SWEEP_BATCH_SIZE'] = int(os.getenv('CODE_SWEEP_BATCH_SIZE', 500))
+app.config['CODE_SWEEP_ARCHIVE'] = os.getenv('CODE_SWEEP_ARCHIVE', '0') == '1'
+
 # Initialize extensions
-db = SQLAlchemy(app)
+class RoutingSession(FlaskSession):
+    """Send statements marked execution_options(read_replica=True) to the replica bind, if any"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and clause is not None and 'replica' in self._db.engines
+                and clause.get_execution_options().get('read_replica')):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    # WAL: pembaca tidak diblok penulis; busy_timeout menunggu lock alih-alih langsung gagal
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.execute('PRAGMA cache_size=-20000')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+if app.config['TRUSTED_PROXIES']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+def init_migrate():
+    """Register Flask-Migrate on first need; importing it pulls in alembic, which cold starts don't need"""
+    if 'migrate' not in app.extensions:
+        from flask_migrate import Migrate
+        Migrate(
+            app, db,
+            directory=MIGRATIONS_DIR,
+            render_as_batch=True,
+            # Tabel/trigger FTS5 dan index pg_trgm dikelola manual di migrasi, bukan lewat model
+            include_object=lambda obj, name, type_, reflected, compare_to: not (
+                (name or '').startswith(('video_fts', 'access_code_fts')) or (name or '').endswith('_trgm')
+            )
+        )
+
+# Perintah `flask db ...` membaca extension saat app dimuat oleh CLI
+if os.environ.get('FLASK_RUN_FROM_CLI'):
+    init_migrate()
+
 login_manager = LoginManager(app)
 login_manager.login_view = 'admin_login'
 
-# Cloudinary config dengan error handling
-try:
-    cloudinary.config(
-        cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-        api_key=os.getenv('CLOUDINARY_API_KEY'),
-        api_secret=os.getenv('CLOUDINARY_API_SECRET'),
-        secure=True
-    )
-except:
-    print("Cloudinary config skipped")
-
 # Helper function untuk UTC time
 def utc_now():
     return datetime.now(timezone.utc)
@@ -52,6 +276,17 @@ class Video(db.Model):
     url = db.Column(db.String(1024))
     public_id = db.Column(db.String(1024))
     created_at = db.Column(db.DateTime, default=utc_now)
+    # Aset turunan dari tahap ingest
+    poster_url = db.Column(db.String(1024))
+    sprite_url = db.Column(db.String(1024))
+    hls_url = db.Column(db.String(1024))
+
+    __table_args__ = (
+        # Keyset pagination katalog: ORDER BY created_at DESC, id DESC
+        db.Index('ix_video_created_at_id', 'created_at', 'id'),
+        # Callback upload langsung bersifat idempoten per public_id
+        db.Index('ix_video_public_id', 'public_id', unique=True),
+    )
 
 class PaymentProof(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -61,6 +296,11 @@ class PaymentProof(db.Model):
     payment_method = db.Column(db.String(50))
     payment_amount = db.Column(db.Integer)
     proof_image = db.Column(db.String(500))
+    thumbnail_url = db.Column(db.String(500))
+    # dHash gambar bukti dan bukti lebih lama yang gambarnya (hampir) sama
+    image_hash = db.Column(db.String(16), index=True)
+    duplicate_of_id = db.Column(db.Integer)
+    # processing -> pending (siap direview) -> approved/rejected; failed jika upload gagal
     status = db.Column(db.String(20), default='pending')
     access_code = db.Column(db.String(10))
     device_id = db.Column(db.String(200))
@@ -68,6 +308,12 @@ class PaymentProof(db.Model):
     created_at = db.Column(db.DateTime, default=utc_now)
     approved_at = db.Column(db.DateTime)
 
+    __table_args__ = (
+        # Daftar pembayaran pending di dashboard; partial karena hanya pending yang dibaca
+        db.Index('ix_payment_proof_pending', 'created_at',
+                 sqlite_where=text("status = 'pending'"), postgresql_where=text("status = 'pending'")),
+    )
+
 class AccessCode(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String(10), unique=True)
@@ -78,83 +324,2029 @@ class AccessCode(db.Model):
     used_at = db.Column(db.DateTime)
     is_active = db.Column(db.Boolean, default=True)
     notes = db.Column(db.String(200))
+    # Kode yang dibuat bersama lewat mint_access_codes (untuk export CSV)
+    batch_id = db.Column(db.String(32), index=True)
+
+    __table_args__ = (
+        # check_access_code: device_id + is_used + is_active, range dan ORDER BY di expires_at
+        db.Index('ix_access_code_entitlement', 'device_id', 'is_used', 'is_active', 'expires_at'),
+        # Cleanup kode kedaluwarsa dan statistik dashboard
+        db.Index('ix_access_code_expires_at', 'expires_at'),
+        # Tabel kode di dashboard (ORDER BY created_at DESC)
+        db.Index('ix_access_code_created_at', 'created_at'),
+    )
+
+class AccessCodeArchive(db.Model):
+    """Kode kedaluwarsa yang dipindahkan sweeper (CODE_SWEEP_ARCHIVE=1); id sama dengan aslinya"""
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    code = db.Column(db.String(10))
+    is_used = db.Column(db.Boolean)
+    device_id = db.Column(db.String(200))
+    expires_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime)
+    used_at = db.Column(db.DateTime)
+    is_active = db.Column(db.Boolean)
+    notes = db.Column(db.String(200))
+    archived_at = db.Column(db.DateTime, default=utc_now)
+
+class CodeRevocation(db.Model):
+    """Kode yang dicabut admin; membatalkan klaim entitlement yang sudah diterbitkan"""
+    id = db.Column(db.Integer, primary_key=True)
+    code_id = db.Column(db.Integer, nullable=False)
+    revoked_at = db.Column(db.DateTime, default=utc_now, index=True)
+
+class VideoPlaybackHourly(db.Model):
+    """Agregat pemutaran per video per jam; ditulis oleh flush_playback, bukan per request"""
+    video_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    hour = db.Column(db.DateTime, primary_key=True)
+    plays = db.Column(db.Integer, nullable=False, default=0)
+    completes = db.Column(db.Integer, nullable=False, default=0)
+    # Pemutaran preview 30 detik di halaman demo, dihitung terpisah dari plays
+    previews = db.Column(db.Integer, nullable=False, default=0)
+    watch_seconds = db.Column(db.BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        # "Paling banyak ditonton" dan panel analitik membaca rentang jam terakhir
+        db.Index('ix_video_playback_hourly_hour', 'hour', 'video_id'),
+    )
+
+class UploadJob(db.Model):
+    """Upload file ke storage yang diproses di background"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # video | payment_proof | ingest
+    status = db.Column(db.String(20), default='queued')  # queued | uploading | done | failed
+    filename = db.Column(db.String(255))
+    spool_path = db.Column(db.String(1024))
+    total_bytes = db.Column(db.BigInteger, default=0)
+    uploaded_bytes = db.Column(db.BigInteger, default=0)
+    upload_id = db.Column(db.String(64))
+    payload = db.Column(db.Text)  # field form dalam JSON
+    attempts = db.Column(db.Integer, default=0)
+    error = db.Column(db.String(500))
+    result_url = db.Column(db.String(1024))
+    result_public_id = db.Column(db.String(1024))
+    target_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=utc_now)
+    updated_at = db.Column(db.DateTime, default=utc_now)
+
+    __table_args__ = (
+        # Worker mengambil job queued tertua
+        db.Index('ix_upload_job_status_id', 'status', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'filename': self.filename,
+            'total_bytes': self.total_bytes,
+            'uploaded_bytes': self.uploaded_bytes,
+            'progress': 100 if self.status == 'done' else (
+                round(100 * self.uploaded_bytes / self.total_bytes) if self.total_bytes else 0
+            ),
+            'attempts': self.attempts,
+            'error': self.error,
+            'target_id': self.target_id
+        }
 
 def generate_access_code():
     return secrets.token_hex(4).upper()
 
+def unique_access_codes(count):
+    """Generate `count` distinct codes not yet in the database, checking each chunk in one query"""
+    codes = set()
+    while len(codes) < count:
+        candidates = set()
+        wanted = min(count - len(codes), app.config['MINT_CHUNK_SIZE'])
+        while len(candidates) < wanted:
+            code = generate_access_code()
+            if code not in codes:
+                candidates.add(code)
+        taken = {row.code for row in db.session.query(AccessCode.code).filter(AccessCode.code.in_(candidates))}
+        codes |= candidates - taken
+    return list(codes)
+
+def mint_access_codes(count, days_valid=30, notes=None):
+    """Insert `count` new access codes in bulk chunks; returns (batch_id, codes)"""
+    batch_id = uuid.uuid4().hex
+    now = utc_now()
+    expires_at = now + timedelta(days=days_valid)
+    minted = []
+    
+    while len(minted) < count:
+        codes = unique_access_codes(min(count - len(minted), app.config['MINT_CHUNK_SIZE']))
+        try:
+            db.session.execute(db.insert(AccessCode), [{
+                'code': code,
+                'is_used': False,
+                'is_active': True,
+                'expires_at': expires_at,
+                'created_at': now,
+                'notes': notes,
+                'batch_id': batch_id
+            } for code in codes])
+            db.session.commit()
+        except IntegrityError:
+            # Minting lain memakai kode yang sama di antara cek dan insert; ulangi chunk ini
+            db.session.rollback()
+            continue
+        minted.extend(codes)
+    
+    invalidate_dashboard_stats()
+    publish_change('codes', action='minted', count=len(minted))
+    return batch_id, minted
+
+def filter_access_codes(query, status_filter='all', search_query=''):
+    """Apply the dashboard's status filter and search box to an AccessCode query"""
+    if status_filter == 'active':
+        query = query.filter_by(is_active=True)
+    elif status_filter == 'inactive':
+        query = query.filter_by(is_active=False)
+    elif status_filter == 'used':
+        query = query.filter_by(is_used=True)
+    elif status_filter == 'unused':
+        query = query.filter_by(is_used=False)
+    elif status_filter == 'expired':
+        query = query.filter(AccessCode.expires_at <= utc_now())
+    
+    if search_query:
+        query = query.filter(access_code_search_condition(search_query))
+    return query
+
+def _like_pattern(term):
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def access_code_search_condition(search_query):
+    """Substring match on code, device_id and notes for the dashboard search box
+    
+    A full access code is also matched on the unique code index, OR'd with the
+    substring match so notes and device ids that mention it still show up. Terms
+    of three or more characters use the trigram index (FTS5 on SQLite, pg_trgm on
+    Postgres, where ILIKE picks up the GIN indexes by itself); shorter ones scan.
+    """
+    term = search_query.strip()
+    condition = _substring_search_condition(term)
+    code = term.upper()
+    if ACCESS_CODE_PATTERN.fullmatch(code):
+        # Kode lengkap dicari lewat index unik, tapi catatan/device yang menyebut kode itu tetap ikut
+        return db.or_(AccessCode.code == code, condition)
+    return condition
+
+def _substring_search_condition(term):
+    if len(term) >= 3:
+        if _search_state['code_fts'] is None:
+            detect_search_index()
+        if _search_state['code_fts']:
+            # Frasa FTS5 dengan tokenizer trigram = substring, tidak peka huruf besar/kecil
+            return AccessCode.id.in_(
+                text('SELECT rowid FROM access_code_fts WHERE access_code_fts MATCH :code_match')
+                .bindparams(code_match='"' + term.replace('"', '""') + '"')
+                .columns(db.column('rowid', db.Integer))
+            )
+    
+    pattern = _like_pattern(term)
+    return db.or_(
+        AccessCode.code.ilike(pattern, escape='\\'),
+        AccessCode.device_id.ilike(pattern, escape='\\'),
+        AccessCode.notes.ilike(pattern, escape='\\')
+    )
+
+def count_access_codes(query, status_filter='all', search_query=''):
+    """Paginator total for the dashboard code table; returns (total, capped)
+    
+    Unfiltered totals come from the cached dashboard stats. Filtered ones count
+    at most ADMIN_CODE_COUNT_CAP matching rows instead of the whole result.
+    """
+    if not search_query and status_filter in ('all', 'used'):
+        stats = get_dashboard_stats()
+        return (stats.total_codes if status_filter == 'all' else stats.used_codes), False
+    
+    cap = app.config['ADMIN_CODE_COUNT_CAP']
+    matched = query.with_entities(AccessCode.id).order_by(None).limit(cap + 1).subquery()
+    total = db.session.query(db.func.count()).select_from(matched).scalar()
+    return min(total, cap), total > cap
+
+BULK_CODE_ACTIONS = ('activate', 'deactivate', 'reset', 'extend', 'expire', 'delete')
+# Aksi yang membuat klaim entitlement yang sudah diterbitkan tidak berlaku lagi
+REVOKING_CODE_ACTIONS = ('deactivate', 'reset', 'expire', 'delete')
+
+def _days_after(value, days):
+    if db.engine.dialect.name == 'sqlite':
+        # datetime()/strftime('%f') memotong mikrodetik; sambung lagi pecahan detik aslinya
+        shifted = db.func.strftime('%Y-%m-%d %H:%M:%S', value, f'+{int(days)} days')
+        return shifted.concat(db.func.substr(value, 20))
+    return value + timedelta(days=days)
+
+def apply_code_action(action, query, days=30):
+    """Apply a bulk action to every code matched by `query` in one UPDATE/DELETE; returns the affected count"""
+    if action not in BULK_CODE_ACTIONS:
+        raise ValueError(f'unknown action: {action}')
+    now = utc_now()
+    
+    # Hanya kode yang sudah dipakai yang bisa punya klaim dan cache entitlement
+    claimed = query.with_entities(AccessCode.id, AccessCode.device_id).filter(AccessCode.device_id.isnot(None)).all()
+    
+    if action == 'delete':
+        affected = query.delete(synchronize_session=False)
+    else:
+        values = {
+            'activate': {'is_active': True},
+            'deactivate': {'is_active': False},
+            'reset': {'is_used': False, 'device_id': None, 'used_at': None},
+            # Perpanjang dari waktu kadaluarsa, atau dari sekarang jika sudah lewat
+            'extend': {'expires_at': _days_after(
+                db.case((AccessCode.expires_at > now, AccessCode.expires_at), else_=now), days
+            )},
+            'expire': {'expires_at': now}
+        }[action]
+        affected = query.update(values, synchronize_session=False)
+    
+    if action in REVOKING_CODE_ACTIONS:
+        revoke_codes([code_id for code_id, _ in claimed])
+    db.session.commit()
+    
+    device_ids = {device_id for _, device_id in claimed}
+    if len(device_ids) > 1000:
+        invalidate_entitlement()
+    else:
+        for device_id in device_ids:
+            invalidate_entitlement(device_id)
+    invalidate_dashboard_stats()
+    publish_change('codes', action=action, count=affected)
+    return affected
+
+PAYMENT_STATUSES = ('processing', 'pending', 'approved', 'rejected', 'failed')
+
+def filter_payment_proofs(query, status_filter='all', search_query=''):
+    """Apply a status filter and a name/email/phone/code search to a PaymentProof query"""
+    if status_filter in PAYMENT_STATUSES:
+        query = query.filter_by(status=status_filter)
+    
+    if search_query:
+        pattern = _like_pattern(search_query.strip())
+        query = query.filter(db.or_(
+            PaymentProof.user_name.ilike(pattern, escape='\\'),
+            PaymentProof.user_email.ilike(pattern, escape='\\'),
+            PaymentProof.user_phone.ilike(pattern, escape='\\'),
+            PaymentProof.access_code.ilike(pattern, escape='\\')
+        ))
+    return query
+
+class ExportSpec(NamedTuple):
+    model: type
+    columns: tuple
+    apply_filters: object
+
+EXPORTS = {
+    'codes': ExportSpec(AccessCode, (
+        'id', 'code', 'is_used', 'is_active', 'device_id', 'expires_at', 'created_at', 'used_at', 'notes', 'batch_id'
+    ), filter_access_codes),
+    'payments': ExportSpec(PaymentProof, (
+        'id', 'user_name', 'user_email', 'user_phone', 'payment_method', 'payment_amount', 'status', 'access_code',
+        'device_id', 'proof_image', 'image_hash', 'duplicate_of_id', 'expires_at', 'created_at', 'approved_at'
+    ), filter_payment_proofs),
+}
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+# CSV satu batch minting: hanya yang perlu dibagikan ke pembeli
+CODE_BATCH_COLUMNS = ('code', 'expires_at', 'notes')
+
+def code_batch_query(batch_id):
+    return AccessCode.query.filter_by(batch_id=batch_id).order_by(AccessCode.id).with_entities(
+        *(getattr(AccessCode, column) for column in CODE_BATCH_COLUMNS)
+    )
+
+def export_query(kind, status_filter='all', search_query='', since_id=None):
+    """Return (query, watermark) for an export, ordered by id
+    
+    The watermark is the highest matching id when the export starts; rows above
+    it are left for the next export (`since_id=watermark`), so repeated exports
+    neither skip nor repeat inserted rows.
+    """
+    spec = EXPORTS[kind]
+    query = spec.apply_filters(spec.model.query, status_filter, search_query)
+    if since_id is not None:
+        query = query.filter(spec.model.id > since_id)
+    watermark = query.with_entities(db.func.max(spec.model.id)).execution_options(read_replica=True).scalar()
+    if watermark is None:
+        return None, since_id
+    query = query.filter(spec.model.id <= watermark).order_by(spec.model.id).with_entities(
+        *(getattr(spec.model, column) for column in spec.columns)
+    )
+    return query, watermark
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def stream_export(columns, query, fmt='csv', compress=False):
+    """Yield the rows of `query` (selecting `columns`) as byte chunks, optionally gzipped, with constant memory
+    
+    Rows are fetched EXPORT_BATCH_SIZE at a time (yield_per: server-side cursor
+    on Postgres) and written out in EXPORT_CHUNK_BYTES pieces.
+    """
+    chunk_bytes = app.config['EXPORT_CHUNK_BYTES']
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    
+    def flush(final=False):
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        if compressor is not None:
+            data = compressor.compress(data) + (compressor.flush() if final else compressor.flush(zlib.Z_SYNC_FLUSH))
+        return data
+    
+    if writer is not None:
+        writer.writerow(columns)
+    rows = () if query is None else query.execution_options(
+        yield_per=app.config['EXPORT_BATCH_SIZE'], read_replica=True
+    )
+    for row in rows:
+        if writer is not None:
+            writer.writerow(['' if value is None else _export_value(value) for value in row])
+        else:
+            buffer.write(json.dumps(dict(zip(columns, map(_export_value, row))), ensure_ascii=False) + '\n')
+        if buffer.tell() >= chunk_bytes:
+            yield flush()
+    yield flush(final=True)
+
 def get_device_id():
     """Generate unique device ID"""
     if 'device_id' not in session:
         session['device_id'] = str(uuid.uuid4())
+        # Device baru belum mungkin menebus kode; get_entitlement tidak perlu ke database
+        g.new_device = True
     return session['device_id']
 
-def cleanup_expired_codes():
-    """Remove expired access codes"""
+def expired_code_batch_query(now, limit):
+    return db.session.query(AccessCode.id).filter(
+        AccessCode.expires_at <= now
+    ).order_by(AccessCode.expires_at).limit(limit)
+
+# Statistik sweeper per proses
+_sweep_stats = {
+    'runs': 0,
+    'last_run_at': None,
+    'last_duration_ms': 0,
+    'last_removed': 0,
+    'total_deleted': 0,
+    'total_archived': 0,
+    'revocations_pruned': 0,
+    'last_error': None
+}
+_sweep_lock = threading.Lock()
+_sweeper = {'thread': None}
+
+ARCHIVED_CODE_COLUMNS = ['id', 'code', 'is_used', 'device_id', 'expires_at', 'created_at', 'used_at', 'is_active', 'notes']
+
+def _sweep_code_batch(now, batch_size, archive):
+    ids = [row.id for row in expired_code_batch_query(now, batch_size)]
+    if not ids:
+        return 0
+    if archive:
+        db.session.execute(
+            db.insert(AccessCodeArchive).from_select(
+                ARCHIVED_CODE_COLUMNS + ['archived_at'],
+                db.select(*[getattr(AccessCode, name) for name in ARCHIVED_CODE_COLUMNS],
+                          db.literal(now, db.DateTime)).where(AccessCode.id.in_(ids))
+            )
+        )
+    removed = db.session.execute(db.delete(AccessCode).where(AccessCode.id.in_(ids))).rowcount
+    db.session.commit()
+    return removed
+
+def sweep_expired_codes(batch_size=None, archive=None, max_batches=None):
+    """Delete (or archive) expired access codes in bounded set-based batches"""
+    batch_size = batch_size or app.config['CODE_SWEEP_BATCH_SIZE']
+    archive = app.config['CODE_SWEEP_ARCHIVE'] if archive is None else archive
+    started = time.monotonic()
+    now = utc_now()
+    removed = batches = pruned = 0
+    error = None
     try:
-        expired_codes = AccessCode.query.filter(
-            AccessCode.expires_at <= utc_now()
-        ).all()
-        
-        for code in expired_codes:
-            db.session.delete(code)
+        while max_batches is None or batches < max_batches:
+            count = _sweep_code_batch(now, batch_size, archive)
+            removed += count
+            batches += 1
+            if count < batch_size:
+                break
         
-        if expired_codes:
-            db.session.commit()
+        # Pencabutan yang lebih tua dari umur klaim maksimum sudah tidak diperlukan
+        horizon = now - timedelta(seconds=app.config['ENTITLEMENT_CLAIM_MAX_AGE'])
+        pruned = db.session.execute(
+            db.delete(CodeRevocation).where(CodeRevocation.revoked_at < horizon)
+        ).rowcount
+        db.session.commit()
+    except Exception as e:
+        # Sweeper lain mungkin mengarsipkan batch yang sama; putaran berikutnya melanjutkan
+        db.session.rollback()
+        error = str(e)
+        print(f"Error sweeping expired codes: {e}")
+    
+    if removed:
+        invalidate_dashboard_stats()
+        publish_change('codes', action='swept', count=removed)
+    
+    with _sweep_lock:
+        _sweep_stats['runs'] += 1
+        _sweep_stats['last_run_at'] = now.isoformat()
+        _sweep_stats['last_duration_ms'] = round((time.monotonic() - started) * 1000, 1)
+        _sweep_stats['last_removed'] = removed
+        _sweep_stats['total_archived' if archive else 'total_deleted'] += removed
+        _sweep_stats['revocations_pruned'] += pruned
+        _sweep_stats['last_error'] = error
+    return removed
+
+def sweep_stats():
+    with _sweep_lock:
+        return dict(_sweep_stats)
+
+def _code_sweeper_loop():
+    while True:
+        with app.app_context():
+            sweep_expired_codes()
+            db.session.remove()
+        time.sleep(app.config['CODE_SWEEP_INTERVAL'])
+
+def start_code_sweeper():
+    """Start the background sweeper thread once per process (no-op if CODE_SWEEP_INTERVAL is 0)"""
+    if app.config['CODE_SWEEP_INTERVAL'] <= 0 or _sweeper['thread'] is not None:
+        return
+    with _sweep_lock:
+        if _sweeper['thread'] is not None:
+            return
+        _sweeper['thread'] = threading.Thread(target=_code_sweeper_loop, name='code-sweeper', daemon=True)
+    _sweeper['thread'].start()
+
+# Analitik pemutaran: event dari beacon dijumlahkan di memori per (video_id, jam)
+# dan ditulis sebagai satu upsert batch; request beacon tidak pernah menulis ke database
+PLAYBACK_EVENTS = ('play', 'progress', 'complete')
+PLAYBACK_COUNTERS = ('plays', 'completes', 'previews', 'watch_seconds')
+_playback = {'buffer': {}, 'events': 0, 'thread': None, 'flushed_at': time.monotonic()}
+_playback_lock = threading.Lock()
+_playback_stats = {
+    'received': 0,
+    'dropped': 0,
+    'flushes': 0,
+    'flushed_rows': 0,
+    'last_flush_at': None,
+    'last_flush_ms': 0,
+    'last_error': None
+}
+
+def _playback_hour(now=None):
+    return (now or utc_now()).replace(minute=0, second=0, microsecond=0, tzinfo=None)
+
+def record_playback(video_id, event, seconds=0, preview=False, now=None):
+    """Add one player event to the buffer; returns True once PLAYBACK_FLUSH_EVENTS are waiting"""
+    key = (video_id, _playback_hour(now))
+    with _playback_lock:
+        buffer = _playback['buffer']
+        counts = buffer.get(key)
+        if counts is None:
+            # Buffer penuh (flush gagal terus): buang event baru daripada memori tumbuh tanpa batas
+            if len(buffer) >= app.config['PLAYBACK_BUFFER_MAX_KEYS']:
+                _playback_stats['dropped'] += 1
+                return True
+            counts = buffer[key] = dict.fromkeys(PLAYBACK_COUNTERS, 0)
+        if preview:
+            counts['previews'] += event == 'play'
+        else:
+            counts['plays'] += event == 'play'
+            counts['completes'] += event == 'complete'
+            counts['watch_seconds'] += int(seconds) if event == 'progress' else 0
+        _playback['events'] += 1
+        _playback_stats['received'] += 1
+        return _playback['events'] >= app.config['PLAYBACK_FLUSH_EVENTS']
+
+def _playback_upsert():
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(VideoPlaybackHourly)
+    table = VideoPlaybackHourly.__table__
+    return statement.on_conflict_do_update(
+        index_elements=['video_id', 'hour'],
+        set_={name: table.c[name] + statement.excluded[name] for name in PLAYBACK_COUNTERS}
+    )
+
+def flush_playback():
+    """Write the buffered counts as one batched upsert into the hourly rollup; returns rows written"""
+    with _playback_lock:
+        buffer, events = _playback['buffer'], _playback['events']
+        _playback['buffer'], _playback['events'] = {}, 0
+        _playback['flushed_at'] = time.monotonic()
+    if not buffer:
+        return 0
+    
+    started = time.monotonic()
+    written = 0
+    error = None
+    try:
+        # Beacon tidak dicek ke database; id video yang tidak ada dibuang di sini
+        video_ids = sorted({video_id for video_id, _ in buffer})
+        known = set()
+        for start in range(0, len(video_ids), 500):
+            known.update(db.session.execute(
+                db.select(Video.id).where(Video.id.in_(video_ids[start:start + 500]))
+            ).scalars())
+        rows = [dict(counts, video_id=video_id, hour=hour)
+                for (video_id, hour), counts in buffer.items() if video_id in known]
+        if rows:
+            db.session.execute(_playback_upsert(), rows)
+        db.session.commit()
+        written = len(rows)
     except Exception as e:
-        print(f"Error cleaning expired codes: {e}")
+        db.session.rollback()
+        error = str(e)
+        print(f"Error flushing playback analytics: {e}")
+        # Kembalikan ke buffer supaya gangguan sesaat tidak menghilangkan hitungan
+        with _playback_lock:
+            for key, counts in buffer.items():
+                current = _playback['buffer'].setdefault(key, dict.fromkeys(PLAYBACK_COUNTERS, 0))
+                for name in PLAYBACK_COUNTERS:
+                    current[name] += counts[name]
+            _playback['events'] += events
+    
+    with _playback_lock:
+        _playback_stats['flushes'] += 1
+        _playback_stats['flushed_rows'] += written
+        _playback_stats['last_flush_at'] = utc_now().isoformat()
+        _playback_stats['last_flush_ms'] = round((time.monotonic() - started) * 1000, 1)
+        _playback_stats['last_error'] = error
+    return written
+
+def playback_stats():
+    with _playback_lock:
+        return dict(_playback_stats, buffered_events=_playback['events'], buffered_keys=len(_playback['buffer']))
+
+def _flush_playback_in_context():
+    with app.app_context():
+        flush_playback()
+        db.session.remove()
+
+def _playback_flusher_loop():
+    while True:
+        time.sleep(app.config['PLAYBACK_FLUSH_INTERVAL'])
+        _flush_playback_in_context()
+
+def start_playback_flusher():
+    """Start the analytics flusher thread once per process; the buffer is also flushed at exit
+
+    Only a backstop for long-lived processes: on serverless hosts the thread and
+    the atexit hook may never run, so requests flush by themselves (see
+    flush_playback_when_due and api_playback).
+    """
+    if _playback['thread'] is not None:
+        return
+    with _playback_lock:
+        if _playback['thread'] is not None:
+            return
+        _playback['thread'] = False
+        if app.config['PLAYBACK_FLUSH_INTERVAL'] > 0:
+            _playback['thread'] = threading.Thread(target=_playback_flusher_loop, name='playback-flusher', daemon=True)
+    atexit.register(_flush_playback_in_context)
+    if _playback['thread']:
+        _playback['thread'].start()
+
+def playback_flush_due():
+    """True when events have been buffered for PLAYBACK_FLUSH_INTERVAL seconds since the last flush"""
+    interval = app.config['PLAYBACK_FLUSH_INTERVAL']
+    with _playback_lock:
+        return interval > 0 and _playback['events'] > 0 and time.monotonic() - _playback['flushed_at'] >= interval
+
+def _query_popular_videos(limit, hours):
+    plays = db.func.sum(VideoPlaybackHourly.plays)
+    top = db.select(VideoPlaybackHourly.video_id, plays.label('plays')).where(
+        VideoPlaybackHourly.hour >= _playback_hour() - timedelta(hours=hours)
+    ).group_by(VideoPlaybackHourly.video_id).having(plays > 0).order_by(plays.desc()).limit(limit).subquery()
+    rows = db.session.query(
+        Video.id, Video.title, Video.description, Video.url, Video.public_id, Video.created_at,
+        Video.poster_url, Video.sprite_url, Video.hls_url
+    ).join(top, top.c.video_id == Video.id).order_by(top.c.plays.desc(), Video.created_at.desc()).execution_options(
+        read_replica=True
+    ).all()
+    return [CatalogVideo(*row) for row in rows]
+
+def get_popular_videos(limit=None):
+    """Most played videos over the last POPULAR_WINDOW_HOURS, cached for POPULAR_CACHE_TTL"""
+    limit = max(1, min(limit or app.config['CATALOG_PAGE_SIZE'], app.config['CATALOG_MAX_PAGE_SIZE']))
+    with _catalog_cache_lock:
+        version = _catalog_cache['version']
+        entry = _catalog_cache['popular'].get(limit)
+    if entry is not None and time.monotonic() - entry[1] < app.config['POPULAR_CACHE_TTL']:
+        return entry[0]
+    
+    videos = _query_popular_videos(limit, app.config['POPULAR_WINDOW_HOURS'])
+    with _catalog_cache_lock:
+        if _catalog_cache['version'] == version:
+            _catalog_cache['popular'][limit] = (videos, time.monotonic())
+    return videos
+
+def playback_summary(hours=24, limit=20):
+    """Per-video totals and per-hour totals from the rollup for the admin analytics panel"""
+    since = _playback_hour() - timedelta(hours=hours - 1)
+    table = VideoPlaybackHourly
+    totals = [db.func.sum(getattr(table, name)).label(name) for name in PLAYBACK_COUNTERS]
+    videos = db.session.query(Video.id, Video.title, *totals).join(table, table.video_id == Video.id).filter(
+        table.hour >= since
+    ).group_by(Video.id, Video.title).order_by(db.desc('plays'), Video.id).limit(limit).all()
+    hourly = db.session.query(table.hour, *totals).filter(table.hour >= since).group_by(table.hour).order_by(
+        table.hour
+    ).all()
+    return [row._asdict() for row in videos], [row._asdict() for row in hourly]
+
+class Entitlement(NamedTuple):
+    """Hasil pengecekan akses untuk satu device"""
+    valid: bool
+    expires_at: Optional[datetime] = None
+    code_id: Optional[int] = None
+
+    def is_current(self, now=None):
+        return self.valid and self.expires_at is not None and self.expires_at > (now or utc_now())
+
+NO_ENTITLEMENT = Entitlement(valid=False)
+
+# Cache lintas request per device_id: {device_id: (Entitlement, cached_at)}
+_entitlement_cache = {}
+_entitlement_cache_lock = threading.Lock()
+
+def invalidate_entitlement(device_id=None):
+    """Drop cached entitlement for a device, or for every device if None"""
+    with _entitlement_cache_lock:
+        if device_id is None:
+            _entitlement_cache.clear()
+        else:
+            _entitlement_cache.pop(device_id, None)
+
+def _cached_entitlement(device_id):
+    ttl = app.config['ENTITLEMENT_CACHE_TTL']
+    with _entitlement_cache_lock:
+        entry = _entitlement_cache.get(device_id)
+    if entry is None:
+        return None
+    entitlement, cached_at = entry
+    if time.monotonic() - cached_at > ttl:
+        invalidate_entitlement(device_id)
+        return None
+    # Kode bisa kadaluarsa selama masih di cache
+    if entitlement.valid and not entitlement.is_current():
+        return NO_ENTITLEMENT
+    return entitlement
+
+def _store_entitlement(device_id, entitlement):
+    now = time.monotonic()
+    with _entitlement_cache_lock:
+        if len(_entitlement_cache) >= app.config['ENTITLEMENT_CACHE_MAX']:
+            ttl = app.config['ENTITLEMENT_CACHE_TTL']
+            for key in [k for k, (_, at) in _entitlement_cache.items() if now - at > ttl]:
+                del _entitlement_cache[key]
+            if len(_entitlement_cache) >= app.config['ENTITLEMENT_CACHE_MAX']:
+                _entitlement_cache.clear()
+        _entitlement_cache[device_id] = (entitlement, now)
+
+def _entitlement_query(device_id):
+    return db.session.query(AccessCode.id, AccessCode.expires_at).filter_by(
+        device_id=device_id, 
+        is_used=True,
+        is_active=True
+    ).filter(AccessCode.expires_at > utc_now()).order_by(AccessCode.expires_at.desc()).execution_options(read_replica=True)
+
+def _load_entitlement(device_id):
+    row = _entitlement_query(device_id).first()
+    
+    if row is None:
+        return NO_ENTITLEMENT
+    return Entitlement(valid=True, expires_at=row.expires_at.replace(tzinfo=timezone.utc), code_id=row.id)
+
+# Revocation set per proses: {code_id: revoked_at epoch}
+_revocations = {}
+_revocations_state = {'last_id': 0, 'checked_at': None}
+_revocations_lock = threading.Lock()
+
+def _claim_serializer():
+    return URLSafeSerializer(app.config['SECRET_KEY'], salt='streamflix-entitlement')
+
+def revoke_codes(code_ids):
+    """Record revoked codes so outstanding entitlement claims stop validating"""
+    code_ids = [code_id for code_id in code_ids if code_id is not None]
+    if not code_ids:
+        return
+    now = utc_now()
+    db.session.execute(db.insert(CodeRevocation), [
+        {'code_id': code_id, 'revoked_at': now} for code_id in code_ids
+    ])
+    with _revocations_lock:
+        for code_id in code_ids:
+            _revocations[code_id] = now.timestamp()
+
+def refresh_revocations(force=False):
+    """Pull revocations recorded since the last refresh (by other instances too)"""
+    with _revocations_lock:
+        checked_at = _revocations_state['checked_at']
+        if not force and checked_at is not None and \
+                time.monotonic() - checked_at < app.config['REVOCATION_REFRESH_INTERVAL']:
+            return
+        _revocations_state['checked_at'] = time.monotonic()
+        last_id = _revocations_state['last_id']
+    
+    rows = db.session.query(CodeRevocation.id, CodeRevocation.code_id, CodeRevocation.revoked_at).filter(
+        CodeRevocation.id > last_id
+    ).order_by(CodeRevocation.id).all()
+    
+    horizon = utc_now().timestamp() - app.config['ENTITLEMENT_CLAIM_MAX_AGE']
+    with _revocations_lock:
+        for row in rows:
+            revoked_at = row.revoked_at.replace(tzinfo=timezone.utc).timestamp()
+            _revocations[row.code_id] = max(revoked_at, _revocations.get(row.code_id, 0))
+            _revocations_state['last_id'] = max(row.id, _revocations_state['last_id'])
+        # Klaim yang lebih tua dari horizon sudah tidak berlaku, jadi entri lama aman dibuang
+        for code_id in [k for k, at in _revocations.items() if at < horizon]:
+            del _revocations[code_id]
+
+def issue_entitlement_claim(entitlement, device_id):
+    """Store a signed claim in the session so later requests skip the database"""
+    now = utc_now().timestamp()
+    expires = min(entitlement.expires_at.timestamp(), now + app.config['ENTITLEMENT_CLAIM_MAX_AGE'])
+    session['entitlement'] = _claim_serializer().dumps({
+        'cid': entitlement.code_id,
+        'dev': device_id,
+        'exp': int(expires),
+        'iat': int(now)
+    })
+
+def _verify_entitlement_claim(device_id):
+    """Return (entitlement or None, revoked) for the signed claim in the session"""
+    token = session.get('entitlement')
+    if not token:
+        return None, False
+    try:
+        claim = _claim_serializer().loads(token)
+    except BadSignature:
+        session.pop('entitlement', None)
+        return None, False
+    
+    if claim.get('dev') != device_id or claim.get('exp', 0) <= utc_now().timestamp():
+        return None, False
+    
+    refresh_revocations()
+    with _revocations_lock:
+        revoked_at = _revocations.get(claim['cid'])
+    # iat dibulatkan ke bawah; klaim yang terbit pada detik pencabutan ikut dianggap batal
+    if revoked_at is not None and revoked_at >= claim['iat']:
+        return None, True
+    
+    return Entitlement(
+        valid=True,
+        expires_at=datetime.fromtimestamp(claim['exp'], timezone.utc),
+        code_id=claim['cid']
+    ), False
+
+def get_entitlement():
+    """Resolve entitlement once per request (flask.g), from the signed claim or the device cache"""
+    if 'entitlement' in g:
+        return g.entitlement
+    
+    try:
+        device_id = get_device_id()
+        if g.get('new_device'):
+            g.entitlement = NO_ENTITLEMENT
+            return NO_ENTITLEMENT
+        entitlement, revoked = _verify_entitlement_claim(device_id)
+        if entitlement is None:
+            # Kode dicabut: cache device di proses ini bisa belum di-invalidate (aksi admin
+            # di proses lain), jadi langsung ke database
+            entitlement = None if revoked else _cached_entitlement(device_id)
+            if entitlement is None:
+                entitlement = _load_entitlement(device_id)
+                _store_entitlement(device_id, entitlement)
+                # Klaim hanya diterbitkan dari data database, bukan dari cache yang mungkin basi
+                if entitlement.is_current():
+                    issue_entitlement_claim(entitlement, device_id)
+            if not entitlement.is_current():
+                session.pop('entitlement', None)
+    except Exception as e:
+        print(f"Error checking access code: {e}")
+        entitlement = NO_ENTITLEMENT
+    
+    g.entitlement = entitlement
+    return entitlement
 
 def check_access_code():
     """Check if current device has valid access code"""
+    return get_entitlement().is_current()
+
+class CatalogVideo(NamedTuple):
+    """Snapshot baris Video yang aman disimpan di cache lintas request"""
+    id: int
+    title: str
+    description: Optional[str]
+    url: str
+    public_id: Optional[str]
+    created_at: datetime
+    poster_url: Optional[str]
+    sprite_url: Optional[str]
+    hls_url: Optional[str]
+
+# Cache halaman katalog: {(cursor, limit): (videos, next_cursor, cached_at)},
+# HTML kartunya: {(card_template, cursor, limit): (videos, Markup)}
+# dan video terpopuler: {limit: (videos, cached_at)}
+_catalog_cache = {'version': 0, 'pages': {}, 'cards': {}, 'popular': {}}
+_catalog_cache_lock = threading.Lock()
+
+# Response yang sudah dirender: {(variant, path): CachedPage}
+_page_cache = {}
+_page_cache_lock = threading.Lock()
+
+def catalog_version():
+    return _catalog_cache['version']
+
+def bump_catalog_version():
+    """Invalidate cached catalog pages after a video is added or removed"""
+    with _catalog_cache_lock:
+        _catalog_cache['version'] += 1
+        _catalog_cache['pages'].clear()
+        _catalog_cache['cards'].clear()
+        _catalog_cache['popular'].clear()
+    with _page_cache_lock:
+        _page_cache.clear()
+
+def encode_cursor(video):
+    raw = f"{video.created_at.isoformat()}|{video.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor, raising ValueError if malformed"""
     try:
-        device_id = get_device_id()
-        
-        # Check for valid access code
-        access_code_obj = AccessCode.query.filter_by(
-            device_id=device_id, 
-            is_used=True,
-            is_active=True
-        ).filter(AccessCode.expires_at > utc_now()).first()
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, video_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(video_id)
+    except Exception:
+        raise ValueError('invalid cursor')
+
+def _catalog_page_query(cursor, limit):
+    query = db.session.query(
+        Video.id, Video.title, Video.description, Video.url, Video.public_id, Video.created_at,
+        Video.poster_url, Video.sprite_url, Video.hls_url
+    )
+    if cursor:
+        created_at, video_id = cursor
+        # Row value comparison supaya planner bisa SEARCH di ix_video_created_at_id
+        query = query.filter(db.tuple_(Video.created_at, Video.id) < db.tuple_(created_at, video_id))
+    return query.order_by(Video.created_at.desc(), Video.id.desc()).limit(limit + 1).execution_options(read_replica=True)
+
+def _query_catalog_page(cursor, limit):
+    rows = _catalog_page_query(cursor, limit).all()
+    
+    videos = [CatalogVideo(*row) for row in rows[:limit]]
+    next_cursor = encode_cursor(videos[-1]) if len(rows) > limit else None
+    return videos, next_cursor
+
+def get_catalog_page(cursor=None, limit=None):
+    """Return (videos, next_cursor) for one catalog page, newest first"""
+    limit = max(1, min(limit or app.config['CATALOG_PAGE_SIZE'], app.config['CATALOG_MAX_PAGE_SIZE']))
+    key = (cursor, limit)
+    
+    with _catalog_cache_lock:
+        version = _catalog_cache['version']
+        entry = _catalog_cache['pages'].get(key)
+    if entry is not None and time.monotonic() - entry[2] < app.config['CATALOG_CACHE_TTL']:
+        return entry[0], entry[1]
+    
+    videos, next_cursor = _query_catalog_page(decode_cursor(cursor) if cursor else None, limit)
+    
+    with _catalog_cache_lock:
+        # Jangan simpan hasil lama jika katalog berubah selama query berjalan
+        if _catalog_cache['version'] == version:
+            pages = _catalog_cache['pages']
+            if len(pages) >= app.config['CATALOG_CACHE_MAX_PAGES']:
+                pages.clear()
+            pages[key] = (videos, next_cursor, time.monotonic())
+    return videos, next_cursor
+
+class CachedPage(NamedTuple):
+    body: bytes
+    mimetype: str
+    etag: str
+    version: int
+    cached_at: float
+
+def _page_flashed(sender, message, category):
+    g.page_flashed = True
+
+message_flashed.connect(_page_flashed, app)
+
+def page_cache_variant(entitlement=False):
+    """Which shared copy a viewer may get: 'anon', 'entitled', or None for a personal response"""
+    # Admin melihat navigasi lain; flash yang menunggu harus tampil di halaman ini
+    if current_user.is_authenticated or session.get('_flashes'):
+        return None
+    if entitlement and check_access_code():
+        return 'entitled'
+    return 'anon'
+
+def _store_page(key, response, version):
+    body = response.get_data()
+    entry = CachedPage(body, response.mimetype, hashlib.sha1(body).hexdigest()[:32], version, time.monotonic())
+    with _page_cache_lock:
+        # Jangan simpan hasil lama jika katalog berubah selama render
+        if catalog_version() == version:
+            if len(_page_cache) >= app.config['PAGE_CACHE_MAX']:
+                _page_cache.clear()
+            _page_cache[key] = entry
+    return entry
+
+def _cache_headers(response, variant, max_age):
+    if variant == 'anon' and not session.modified:
+        response.headers['Cache-Control'] = (
+            f"public, max-age={max_age}, s-maxage={app.config['HTTP_CACHE_S_MAXAGE']}, "
+            f"stale-while-revalidate={app.config['HTTP_CACHE_SWR']}"
+        )
+    else:
+        # Versi entitled hanya boleh disimpan browser pemiliknya; ETag tetap memberi 304
+        response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
+def cached_view(entitlement=False, max_age_config=None, params=()):
+    """Serve a catalog view from the rendered-page cache, with ETag/304 and CDN headers
+
+    The cache is cleared by bump_catalog_version. entitlement may be a bool or a
+    callable; when true the body depends on check_access_code() and is cached
+    per entitlement state. params names the query args the view reads; only
+    those are part of the cache key. Non-200 responses, responses that flash a message
+    and views that set Cache-Control: no-store are passed through uncached.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            variant = page_cache_variant(entitlement() if callable(entitlement) else entitlement)
+            if variant is None:
+                response = make_response(view(*args, **kwargs))
+                response.headers.setdefault('Cache-Control', 'private, no-cache')
+                return response
+            
+            # Query string lain diabaikan agar parameter sampah tidak mengisi (dan mengosongkan) cache
+            key = (variant, request.path, tuple(request.args.get(name) for name in params))
+            version = catalog_version()
+            with _page_cache_lock:
+                entry = _page_cache.get(key)
+            if entry is None or entry.version != version or time.monotonic() - entry.cached_at >= app.config['PAGE_CACHE_TTL']:
+                g.page_flashed = False
+                response = make_response(view(*args, **kwargs))
+                if (response.status_code != 200 or response.is_streamed or g.page_flashed
+                        or 'no-store' in response.headers.get('Cache-Control', '')):
+                    response.headers.setdefault('Cache-Control', 'private, no-cache')
+                    return response
+                entry = _store_page(key, response, version)
+            
+            response = app.response_class(entry.body, mimetype=entry.mimetype)
+            response.set_etag(entry.etag)
+            max_age = app.config[max_age_config] if max_age_config else 0
+            return _cache_headers(response, variant, max_age).make_conditional(request)
+        return wrapper
+    return decorator
+
+# Template kartu untuk render halaman berikutnya ("load more")
+CATALOG_CARD_TEMPLATES = {
+    'index': '_video_card.html',
+    'demo': '_demo_video_card.html'
+}
+
+def render_catalog_cards(videos, card_template, cursor=None, limit=None):
+    """Card HTML for one catalog page, rendered once per cached page when it doesn't depend on the viewer"""
+    if card_template == '_video_card.html' and not app.config['CATALOG_SHELL']:
+        return Markup(render_template('_catalog_page.html', videos=videos, card_template=card_template))
+    
+    key = (card_template, cursor, limit)
+    with _catalog_cache_lock:
+        entry = _catalog_cache['cards'].get(key)
+    # Berlaku selama halaman katalog yang sama (objek list yang sama) masih di cache
+    if entry is not None and entry[0] is videos:
+        return entry[1]
+    
+    html = Markup(render_template('_catalog_page.html', videos=videos, card_template=card_template))
+    with _catalog_cache_lock:
+        cards = _catalog_cache['cards']
+        if len(cards) >= app.config['CATALOG_CACHE_MAX_PAGES']:
+            cards.clear()
+        cards[key] = (videos, html)
+    return html
+
+class DashboardStats(NamedTuple):
+    videos: int = 0
+    pending_payments: int = 0
+    total_codes: int = 0
+    active_codes: int = 0
+    used_codes: int = 0
+    expired_codes: int = 0
+
+# Statistik dashboard per proses: (versi katalog, stats, waktu)
+_dashboard_stats = {'entry': None}
+_dashboard_stats_lock = threading.Lock()
+
+def invalidate_dashboard_stats():
+    with _dashboard_stats_lock:
+        _dashboard_stats['entry'] = None
+
+def _query_dashboard_stats():
+    now = utc_now()
+    
+    def count_where(condition):
+        return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+    
+    row = db.session.query(
+        db.select(db.func.count(Video.id)).scalar_subquery(),
+        db.select(db.func.count(PaymentProof.id)).where(PaymentProof.status == 'pending').scalar_subquery(),
+        db.func.count(AccessCode.id),
+        count_where(db.and_(AccessCode.is_active.is_(True), AccessCode.expires_at > now)),
+        count_where(AccessCode.is_used.is_(True)),
+        count_where(AccessCode.expires_at <= now)
+    ).select_from(AccessCode).one()
+    return DashboardStats(*(int(value or 0) for value in row))
+
+def get_dashboard_stats():
+    """All dashboard counters from one aggregate query, cached for DASHBOARD_STATS_TTL"""
+    version = catalog_version()
+    with _dashboard_stats_lock:
+        entry = _dashboard_stats['entry']
+    if entry is not None and entry[0] == version and time.monotonic() - entry[2] < app.config['DASHBOARD_STATS_TTL']:
+        return entry[1]
+    
+    stats = _query_dashboard_stats()
+    with _dashboard_stats_lock:
+        _dashboard_stats['entry'] = (version, stats, time.monotonic())
+    return stats
+
+def pending_payments_query(cursor=None):
+    query = PaymentProof.query.filter_by(status='pending')
+    if cursor:
+        created_at, payment_id = cursor
+        query = query.filter(db.tuple_(PaymentProof.created_at, PaymentProof.id) < db.tuple_(created_at, payment_id))
+    return query.order_by(PaymentProof.created_at.desc(), PaymentProof.id.desc())
+
+def get_pending_payments_page(cursor=None, limit=None):
+    """Return (payments, next_cursor) for the dashboard's pending list, newest first"""
+    limit = limit or app.config['ADMIN_PANEL_PAGE_SIZE']
+    rows = pending_payments_query(decode_cursor(cursor) if cursor else None).limit(limit + 1).all()
+    payments = rows[:limit]
+    next_cursor = encode_cursor(payments[-1]) if len(rows) > limit else None
+    return payments, next_cursor
+
+# Live update dashboard: setiap mutasi pembayaran/kode/video diumumkan setelah commit,
+# dashboard yang terbuka menyusul lewat SSE (/admin/events) atau polling (/admin/events.json)
+change_feed = ChangeFeed(app.config['ADMIN_EVENTS_BUFFER'])
+FEED_KINDS = {'payment': PaymentProof, 'code': AccessCode, 'video': Video}
+
+def publish_change(kind, **data):
+    """Announce a committed mutation to open admin dashboards; call after commit"""
+    change_feed.publish(kind, data)
+
+def feed_watermark():
+    """Return (since, stale) from Last-Event-ID ("epoch:id", sent by EventSource on reconnect) or ?epoch=&since="""
+    epoch, _, since = request.headers.get('Last-Event-ID', '').partition(':')
+    if not since:
+        epoch, since = request.args.get('epoch', ''), request.args.get('since', '')
+    # Watermark dari proses lain / sebelum restart tidak bisa disusul
+    if epoch != change_feed.epoch or not since.isdigit():
+        return change_feed.last_id, True
+    return int(since), False
+
+def admin_feed_payload(changes, last_id, reset=False):
+    """Dashboard update: current HTML of each changed payment/code/video plus fresh counters"""
+    # Beberapa perubahan pada objek yang sama cukup dikirim sekali, dengan keadaan terbarunya
+    latest = {}
+    for change in changes:
+        key = (change.kind, change.data.get('id'))
+        latest.pop(key, None)
+        latest[key] = change
+
+    rows = {}
+    for kind, model in FEED_KINDS.items():
+        ids = [object_id for (change_kind, object_id) in latest if change_kind == kind and object_id]
+        rows[kind] = {row.id: row for row in model.query.filter(model.id.in_(ids))} if ids else {}
+
+    current_time = utc_now().replace(tzinfo=None)
+    events = []
+    for (kind, object_id), change in latest.items():
+        event = {'kind': kind, **change.data}
+        row = rows.get(kind, {}).get(object_id)
+        if kind == 'payment':
+            event['status'] = row.status if row is not None else 'deleted'
+            if event['status'] == 'pending':
+                event['html'] = render_template('_admin_payment_items.html', pending_payments=[row])
+        elif kind == 'code':
+            event['status'] = 'exists' if row is not None else 'deleted'
+            if row is not None:
+                event['html'] = render_template('_admin_code_row.html', code=row, current_time=current_time)
+        elif kind == 'video':
+            event['status'] = 'exists' if row is not None else 'deleted'
+            if row is not None:
+                event['html'] = render_template('_admin_video_items.html', videos=[row])
+        events.append(event)
+
+    return {
+        'epoch': change_feed.epoch,
+        'last_id': last_id,
+        'reset': reset,
+        'events': events,
+        'stats': get_dashboard_stats()._asdict()
+    }
+
+def _sse_message(payload, event='change', event_id=None):
+    lines = [f'id: {change_feed.epoch}:{event_id}'] if event_id is not None else []
+    lines += [f'event: {event}', f'data: {json.dumps(payload)}']
+    return '\n'.join(lines) + '\n\n'
+
+class SearchHit(NamedTuple):
+    """Video hasil pencarian beserta judul/deskripsi yang sudah di-highlight"""
+    id: int
+    title: str
+    description: Optional[str]
+    url: str
+    public_id: Optional[str]
+    created_at: datetime
+    poster_url: Optional[str]
+    sprite_url: Optional[str]
+    hls_url: Optional[str]
+    title_html: Markup
+    description_html: Markup
+
+# Penanda highlight dari FTS5; diganti <mark> setelah teks di-escape
+_HL_START, _HL_END = '\x02', '\x03'
+
+# fts/code_fts None = belum dicek; dideteksi saat pencarian pertama
+_search_state = {'fts': None, 'code_fts': None}
+# Cache hasil pencarian dan query yang sedang berjalan (untuk coalescing)
+_search_cache = {}
+_search_inflight = {}
+_search_lock = threading.Lock()
+
+def detect_search_index():
+    """Use the FTS5 indexes when the migrations managed to create them; fall back to LIKE otherwise"""
+    if db.engine.dialect.name != 'sqlite':
+        _search_state.update(fts=False, code_fts=False)
+        return
+    with db.engine.connect() as conn:
+        tables = set(conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('video_fts', 'access_code_fts')"
+        )).scalars())
+    _search_state.update(fts='video_fts' in tables, code_fts='access_code_fts' in tables)
+
+def _search_terms(query):
+    return [term.lower() for term in re.findall(r'\w+', query)][:8]
+
+def _highlight(value):
+    if not value:
+        return Markup('')
+    return Markup(str(escape(value)).replace(_HL_START, '<mark>').replace(_HL_END, '</mark>'))
+
+def _run_fts_search(terms, limit):
+    match = ' '.join(f'"{term}"*' for term in terms)
+    rows = db.session.execute(text(f"""
+        SELECT v.id, v.title, v.description, v.url, v.public_id, v.created_at,
+               v.poster_url, v.sprite_url, v.hls_url,
+               highlight(video_fts, 0, '{_HL_START}', '{_HL_END}') AS title_hl,
+               snippet(video_fts, 1, '{_HL_START}', '{_HL_END}', '…', 16) AS description_hl
+        FROM video_fts JOIN video v ON v.id = video_fts.rowid
+        WHERE video_fts MATCH :match
+        ORDER BY bm25(video_fts, 10.0, 1.0), v.created_at DESC
+        LIMIT :limit
+    """), {'match': match, 'limit': limit}).all()
+    
+    return [SearchHit(
+        id=row.id,
+        title=row.title,
+        description=row.description,
+        url=row.url,
+        public_id=row.public_id,
+        created_at=datetime.fromisoformat(row.created_at) if isinstance(row.created_at, str) else row.created_at,
+        poster_url=row.poster_url,
+        sprite_url=row.sprite_url,
+        hls_url=row.hls_url,
+        title_html=_highlight(row.title_hl),
+        description_html=_highlight(row.description_hl)
+    ) for row in rows]
+
+def _run_like_search(terms, limit):
+    query = Video.query
+    for term in terms:
+        query = query.filter(db.or_(Video.title.ilike(f'%{term}%'), Video.description.ilike(f'%{term}%')))
+    videos = query.order_by(Video.created_at.desc()).limit(limit).execution_options(read_replica=True).all()
+    
+    return [SearchHit(
+        id=v.id,
+        title=v.title,
+        description=v.description,
+        url=v.url,
+        public_id=v.public_id,
+        created_at=v.created_at,
+        poster_url=v.poster_url,
+        sprite_url=v.sprite_url,
+        hls_url=v.hls_url,
+        title_html=escape(v.title or ''),
+        description_html=escape(v.description or '')
+    ) for v in videos]
+
+def _run_search(terms, limit):
+    """Run one search under SEARCH_TIME_BUDGET_MS; returns (hits, timed_out)"""
+    if _search_state['fts'] is None:
+        detect_search_index()
+    if not _search_state['fts']:
+        return _run_like_search(terms, limit), False
+    
+    raw_conn = db.session.connection().connection.driver_connection
+    deadline = time.monotonic() + app.config['SEARCH_TIME_BUDGET_MS'] / 1000
+    raw_conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 1000)
+    try:
+        return _run_fts_search(terms, limit), False
+    except OperationalError as e:
+        if 'interrupted' not in str(e):
+            raise
+        db.session.rollback()
+        return [], True
+    finally:
+        raw_conn.set_progress_handler(None, 0)
+
+def search_catalog(query, limit=None):
+    """Ranked prefix search over video titles and descriptions; returns (hits, timed_out)
+    
+    Results are cached per catalog version, and concurrent identical queries
+    (typeahead from many viewers) wait for the first one instead of all hitting the database.
+    """
+    terms = _search_terms(query)
+    if not terms:
+        return [], False
+    limit = max(1, min(limit or app.config['SEARCH_MAX_RESULTS'], app.config['SEARCH_MAX_RESULTS']))
+    key = (catalog_version(), ' '.join(terms), limit)
+    
+    with _search_lock:
+        entry = _search_cache.get(key)
+        if entry is not None and time.monotonic() - entry[1] < app.config['SEARCH_CACHE_TTL']:
+            return entry[0], False
+        event = _search_inflight.get(key)
+        leader = event is None
+        if leader:
+            event = _search_inflight[key] = threading.Event()
+    
+    if not leader:
+        event.wait(app.config['SEARCH_TIME_BUDGET_MS'] / 1000)
+        with _search_lock:
+            entry = _search_cache.get(key)
+        if entry is not None:
+            return entry[0], False
+        return _run_search(terms, limit)
+    
+    try:
+        hits, timed_out = _run_search(terms, limit)
+        if not timed_out:
+            with _search_lock:
+                if len(_search_cache) >= app.config['SEARCH_CACHE_MAX']:
+                    _search_cache.clear()
+                _search_cache[key] = (hits, time.monotonic())
+        return hits, timed_out
+    finally:
+        with _search_lock:
+            _search_inflight.pop(key, None)
+        event.set()
+
+# Rate limiting --------------------------------------------------------------
+
+ACCESS_CODE_PATTERN = re.compile(r'[0-9A-F]{8}')
+
+_rate_limiter = {}
+_rate_limit_stats = {'limited': 0, 'malformed': 0, 'failures': 0}
+_rate_limit_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Limiter for RATE_LIMIT_BACKEND (memory, sqlite or redis), created on first use"""
+    backend = app.config['RATE_LIMIT_BACKEND']
+    if backend not in _rate_limiter:
+        if backend == 'redis':
+            store = RedisBackend(app.config['RATE_LIMIT_URL'])
+        elif backend == 'sqlite':
+            store = SQLiteBackend(app.config['RATE_LIMIT_URL'] or os.path.join(app.instance_path, 'ratelimit.db'))
+        else:
+            store = MemoryBackend()
+        _rate_limiter[backend] = RateLimiter(store)
+    return _rate_limiter[backend]
+
+def _count_rate_limit(name):
+    with _rate_limit_lock:
+        _rate_limit_stats[name] += 1
+
+def limit_redeem_attempt():
+    """Per-IP/device attempt buckets and the failure lockout; returns the blocking Decision or None"""
+    limiter = get_rate_limiter()
+    ip = request.remote_addr or 'unknown'
+    decision = limiter.check(f'redeem-fail:{ip}', parse_limit(app.config['RATE_LIMIT_REDEEM_FAILURES']))
+    if decision.allowed:
+        decision = limiter.hit([
+            (f'redeem-ip:{ip}', parse_limit(app.config['RATE_LIMIT_REDEEM_IP'])),
+            (f'redeem-device:{get_device_id()}', parse_limit(app.config['RATE_LIMIT_REDEEM_DEVICE']))
+        ])
+    if decision.allowed:
+        return None
+    _count_rate_limit('limited')
+    return decision
+
+def limit_redeem_lookup():
+    """Global bucket in front of the access_code lookup; returns the blocking Decision or None"""
+    decision = get_rate_limiter().hit([('redeem-global', parse_limit(app.config['RATE_LIMIT_REDEEM_GLOBAL']))])
+    if decision.allowed:
+        return None
+    _count_rate_limit('limited')
+    return decision
+
+def record_redeem_failure():
+    """A wrong code costs a token from the IP's failure bucket"""
+    _count_rate_limit('failures')
+    get_rate_limiter().penalize(f'redeem-fail:{request.remote_addr or "unknown"}',
+                                parse_limit(app.config['RATE_LIMIT_REDEEM_FAILURES']))
+
+# Upload pipeline -----------------------------------------------------------
+
+# Tujuan upload per jenis job: (resource_type, folder)
+UPLOAD_TARGETS = {
+    'video': ('video', 'streamflix_videos'),
+    'payment_proof': ('image', 'streamflix_payments')
+}
+
+_storage = {}
+_upload_pool = {'executor': None, 'active': 0}
+_upload_lock = threading.Lock()
+
+def get_storage():
+    """Storage backend sesuai STORAGE_BACKEND (cloudinary atau local)"""
+    backend = app.config['STORAGE_BACKEND']
+    if backend not in _storage:
+        if backend == 'local':
+            _storage[backend] = LocalStorage(
+                app.config['LOCAL_STORAGE_DIR'], '/media',
+                secret=app.config['SECRET_KEY'],
+                upload_url='/media/upload',
+                signature_ttl=app.config['DIRECT_UPLOAD_TTL']
+            )
+        else:
+            _storage[backend] = CloudinaryStorage(
+                cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
+                api_key=os.getenv('CLOUDINARY_API_KEY'),
+                api_secret=os.getenv('CLOUDINARY_API_SECRET')
+            )
+        instrument_methods(_storage[backend], STORAGE_TIMED_METHODS, _observe_storage_call)
+    return _storage[backend]
+
+def spool_upload(file_storage):
+    """Copy an uploaded file to the spool directory block by block"""
+    os.makedirs(app.config['UPLOAD_SPOOL_DIR'], exist_ok=True)
+    ext = os.path.splitext(secure_filename(file_storage.filename or ''))[1]
+    path = os.path.join(app.config['UPLOAD_SPOOL_DIR'], uuid.uuid4().hex + ext)
+    file_storage.save(path)
+    return path
+
+def enqueue_upload(kind, file_storage, payload, target_id=None):
+    """Spool the file and record an UploadJob; uploads it right away with UPLOAD_INLINE, else wakes the worker pool"""
+    path = spool_upload(file_storage)
+    job = UploadJob(
+        kind=kind,
+        target_id=target_id,
+        filename=secure_filename(file_storage.filename or '') or 'upload',
+        spool_path=path,
+        total_bytes=os.path.getsize(path),
+        payload=json.dumps(payload)
+    )
+    db.session.add(job)
+    db.session.commit()
+    
+    if app.config['UPLOAD_INLINE']:
+        # Spool hanya ada di instance ini; ulangi dari chunk terakhir tanpa backoff
+        job_id = job.id
+        claimed = _claim_upload(job_id)
+        while claimed is not None and run_upload_job(claimed) == 'queued':
+            claimed = _claim_upload(job_id)
+        return db.session.get(UploadJob, job_id)
+    
+    wake_upload_workers()
+    return job
+
+def wake_upload_workers():
+    """Start another pool worker if fewer than UPLOAD_WORKERS are draining the queue"""
+    # UPLOAD_WORKERS=0 atau UPLOAD_INLINE: sisa antrean (mis. ingest) hanya diproses lewat `flask process-uploads`
+    if app.config['UPLOAD_WORKERS'] <= 0 or app.config['UPLOAD_INLINE']:
+        return
+    with _upload_lock:
+        if _upload_pool['executor'] is None:
+            _upload_pool['executor'] = ThreadPoolExecutor(
+                max_workers=app.config['UPLOAD_WORKERS'], thread_name_prefix='upload'
+            )
+        if _upload_pool['active'] >= app.config['UPLOAD_WORKERS']:
+            return
+        _upload_pool['active'] += 1
+    _upload_pool['executor'].submit(_upload_worker)
+
+def _upload_worker():
+    try:
+        with app.app_context():
+            while process_next_upload():
+                pass
+    except Exception as e:
+        print(f"Upload worker error: {e}")
+    finally:
+        with _upload_lock:
+            _upload_pool['active'] -= 1
+
+def requeue_stale_uploads():
+    """Put jobs whose worker died mid-upload back in the queue; they resume from their last chunk"""
+    stale_before = utc_now() - timedelta(seconds=app.config['UPLOAD_STALE_AFTER'])
+    count = UploadJob.query.filter(
+        UploadJob.status == 'uploading',
+        UploadJob.updated_at < stale_before
+    ).update({'status': 'queued'}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+def _next_upload_query():
+    return db.session.query(UploadJob.id).filter_by(status='queued').order_by(UploadJob.id).limit(1)
+
+def _claim_upload(job_id):
+    claimed = UploadJob.query.filter_by(id=job_id, status='queued').update({
+        'status': 'uploading',
+        'attempts': UploadJob.attempts + 1,
+        'updated_at': utc_now()
+    }, synchronize_session=False)
+    db.session.commit()
+    # Jika 0, job sudah diambil worker lain
+    return db.session.get(UploadJob, job_id) if claimed else None
+
+def _claim_next_upload():
+    while True:
+        job_id = _next_upload_query().scalar()
+        if job_id is None:
+            return None
+        job = _claim_upload(job_id)
+        if job is not None:
+            return job
+
+def _same_proof_hash_query(image_hash, exclude_id=None):
+    query = db.session.query(PaymentProof.id).filter(PaymentProof.image_hash == image_hash)
+    if exclude_id is not None:
+        query = query.filter(PaymentProof.id != exclude_id)
+    return query.order_by(PaymentProof.id).limit(1)
+
+def find_duplicate_proof(image_hash, exclude_id=None):
+    """Oldest recent PaymentProof whose image hash is within PROOF_DUPLICATE_DISTANCE, or None"""
+    match = _same_proof_hash_query(image_hash, exclude_id).scalar()
+    if match is not None or app.config['PROOF_DUPLICATE_DISTANCE'] <= 0:
+        return match
+    
+    # Hamming tidak bisa diindex; bandingkan hanya kolom hash dari jendela bukti terbaru
+    recent = db.session.query(PaymentProof.id, PaymentProof.image_hash).filter(
+        PaymentProof.image_hash.isnot(None)
+    ).order_by(PaymentProof.id.desc()).limit(app.config['PROOF_DUPLICATE_WINDOW']).all()
+    candidates = [row.id for row in recent
+                  if row.id != exclude_id and media.hash_distance(row.image_hash, image_hash) <= app.config['PROOF_DUPLICATE_DISTANCE']]
+    return min(candidates, default=None)
+
+def _prepare_payment_proof(job):
+    """Downscale/recompress the spooled proof, write its thumbnail and hash it (once per job)"""
+    payload = json.loads(job.payload or '{}')
+    if payload.get('prepared') or not media.pillow_available():
+        return
+    
+    base = os.path.splitext(job.spool_path)[0]
+    compressed = media.compress_image(job.spool_path, base + '.proof.jpg',
+                                      max_side=app.config['PROOF_MAX_SIDE'], quality=app.config['PROOF_JPEG_QUALITY'])
+    payload['thumbnail_path'] = media.make_thumbnail(compressed, base + '.thumb.jpg', width=app.config['PROOF_THUMB_WIDTH'])
+    payload['image_hash'] = media.image_dhash(compressed)
+    payload['prepared'] = True
+    
+    original = job.spool_path
+    job.spool_path = compressed
+    job.total_bytes = os.path.getsize(compressed)
+    job.filename = os.path.splitext(job.filename)[0] + '.jpg'
+    job.payload = json.dumps(payload)
+    db.session.commit()
+    try:
+        os.remove(original)
+    except OSError:
+        pass
+
+def _upload_job_chunks(job):
+    storage = get_storage()
+    resource_type, folder = UPLOAD_TARGETS[job.kind]
+    
+    if not job.upload_id:
+        job.upload_id = storage.new_upload_id()
+        job.uploaded_bytes = 0
+        db.session.commit()
+    
+    with open(job.spool_path, 'rb') as f:
+        f.seek(job.uploaded_bytes)
+        while job.uploaded_bytes < job.total_bytes:
+            chunk = f.read(app.config['UPLOAD_CHUNK_SIZE'])
+            result = storage.upload_chunk(
+                job.upload_id, chunk, job.uploaded_bytes, job.total_bytes, job.filename,
+                resource_type=resource_type, folder=folder
+            )
+            job.uploaded_bytes += len(chunk)
+            job.updated_at = utc_now()
+            if result is not None:
+                job.result_url = result.get('secure_url')
+                job.result_public_id = result.get('public_id')
+            # Checkpoint per chunk supaya upload bisa dilanjutkan
+            db.session.commit()
+    
+    if not job.result_url:
+        raise RuntimeError('Storage tidak mengembalikan URL file')
+
+def _complete_upload(job):
+    payload = json.loads(job.payload or '{}')
+    video = None
+    
+    if job.kind == 'video':
+        video = Video(
+            title=payload.get('title'),
+            description=payload.get('description'),
+            url=job.result_url,
+            public_id=job.result_public_id
+        )
+        db.session.add(video)
+        db.session.flush()
+        job.target_id = video.id
+        enqueue_ingest(video)
+    elif job.kind == 'payment_proof':
+        payment_proof = db.session.get(PaymentProof, job.target_id) if job.target_id else None
+        if payment_proof is None:
+            # Job lama (sebelum antrean pemrosesan) membawa datanya di payload
+            payment_proof = PaymentProof(
+                user_name=payload.get('user_name'),
+                user_email=payload.get('user_email'),
+                user_phone=payload.get('user_phone'),
+                payment_method=payload.get('payment_method'),
+                payment_amount=payload.get('payment_amount')
+            )
+            db.session.add(payment_proof)
+            db.session.flush()
+            job.target_id = payment_proof.id
         
-        return access_code_obj is not None
+        payment_proof.proof_image = job.result_url
+        if payload.get('thumbnail_path') and not payment_proof.thumbnail_url:
+            payment_proof.thumbnail_url = get_storage().store_file(
+                payload['thumbnail_path'], 'image', 'streamflix_payments_thumbs'
+            )
+        if payload.get('image_hash'):
+            payment_proof.image_hash = payload['image_hash']
+            payment_proof.duplicate_of_id = find_duplicate_proof(payload['image_hash'], exclude_id=payment_proof.id)
+        if payment_proof.status in (None, 'processing'):
+            payment_proof.status = 'pending'
+    
+    job.status = 'done'
+    job.error = None
+    job.updated_at = utc_now()
+    target_id = job.target_id
+    db.session.commit()
+    
+    if video is not None:
+        bump_catalog_version()
+        wake_upload_workers()
+        publish_change('video', id=target_id, action='created')
+    else:
+        invalidate_dashboard_stats()
+        publish_change('payment', id=target_id, action='submitted')
+    for path in (job.spool_path, payload.get('thumbnail_path')):
+        try:
+            if path:
+                os.remove(path)
+        except OSError:
+            pass
+
+def enqueue_ingest(video):
+    """Queue poster/sprite/HLS generation for a video (caller commits)"""
+    job = UploadJob(kind='ingest', target_id=video.id, filename=video.title or f'video-{video.id}')
+    db.session.add(job)
+    return job
+
+def _ingest_video(job):
+    """Poster, sprite sheet dan rendition HLS untuk satu video"""
+    video = db.session.get(Video, job.target_id)
+    if video is None:
+        # Video sudah dihapus sebelum sempat diproses
+        job.status = 'done'
+        db.session.commit()
+        return
+    
+    storage = get_storage()
+    assets = storage.derived_video_urls(video.public_id) if video.public_id else {}
+    
+    # Sprite (dan aset yang tidak bisa dibuat storage sendiri) butuh ffmpeg
+    if media.ffmpeg_available():
+        source = (storage.local_path(video.public_id) if video.public_id else None) or video.url
+        with tempfile.TemporaryDirectory() as workdir:
+            if not assets.get('poster_url'):
+                poster = media.make_poster(source, os.path.join(workdir, 'poster.jpg'))
+                assets['poster_url'] = storage.store_file(poster, 'image', 'streamflix_posters')
+            sprite = media.make_sprite(source, os.path.join(workdir, 'sprite.jpg'))
+            assets['sprite_url'] = storage.store_file(sprite, 'image', 'streamflix_sprites')
+            if not assets.get('hls_url'):
+                media.make_hls(source, os.path.join(workdir, 'hls'))
+                base_url = storage.store_directory(os.path.join(workdir, 'hls'), 'streamflix_hls')
+                if base_url:
+                    assets['hls_url'] = f'{base_url}/master.m3u8'
+    
+    video.poster_url = assets.get('poster_url')
+    video.sprite_url = assets.get('sprite_url')
+    video.hls_url = assets.get('hls_url')
+    job.status = 'done'
+    job.error = None
+    job.updated_at = utc_now()
+    db.session.commit()
+    bump_catalog_version()
+
+def run_upload_job(job):
+    """Process one claimed job; returns its status afterwards (done, queued for a retry, or failed)"""
+    job_id = job.id
+    try:
+        if job.kind == 'ingest':
+            _ingest_video(job)
+        else:
+            if job.kind == 'payment_proof' and not job.upload_id:
+                _prepare_payment_proof(job)
+            if not job.result_url:
+                _upload_job_chunks(job)
+            _complete_upload(job)
     except Exception as e:
-        print(f"Error checking access code: {e}")
+        db.session.rollback()
+        job = db.session.get(UploadJob, job_id)
+        job.error = str(e)[:500]
+        job.status = 'queued' if job.attempts < app.config['UPLOAD_MAX_ATTEMPTS'] else 'failed'
+        job.updated_at = utc_now()
+        if job.status == 'failed' and job.kind == 'payment_proof' and job.target_id:
+            PaymentProof.query.filter_by(id=job.target_id, status='processing').update(
+                {'status': 'failed'}, synchronize_session=False
+            )
+        db.session.commit()
+        print(f"Upload job {job_id} error: {e}")
+    return job.status
+
+def process_next_upload():
+    """Upload one queued job; returns False when the queue is empty"""
+    job = _claim_next_upload()
+    if job is None:
+        return False
+    if run_upload_job(job) == 'queued':
+        time.sleep(min(2 ** job.attempts, 30))
+    return True
+
+@app.cli.command('process-uploads')
+def process_uploads_command():
+    """Drain the upload queue in the foreground (resumes stale jobs first)."""
+    requeue_stale_uploads()
+    processed = 0
+    while process_next_upload():
+        processed += 1
+    print(f'{processed} upload job(s) processed')
+
+@app.cli.command('sweep-codes')
+@click.option('--batch-size', type=int, default=None, help='Codes per DELETE (default CODE_SWEEP_BATCH_SIZE).')
+@click.option('--archive/--delete', default=None, help='Archive instead of delete (default CODE_SWEEP_ARCHIVE).')
+@click.option('--max-batches', type=int, default=None, help='Stop after this many batches.')
+def sweep_codes_command(batch_size, archive, max_batches):
+    """Remove expired access codes in batches (for cron when the sweeper thread is off)."""
+    archive = app.config['CODE_SWEEP_ARCHIVE'] if archive is None else archive
+    removed = sweep_expired_codes(batch_size=batch_size, archive=archive, max_batches=max_batches)
+    stats = sweep_stats()
+    print(f"{removed} expired code(s) {'archived' if archive else 'deleted'} in {stats['last_duration_ms']} ms")
+    if stats['last_error']:
+        raise SystemExit(stats['last_error'])
+
+@app.cli.command('mint-codes')
+@click.argument('count', type=int)
+@click.option('--days', type=int, default=30, help='Days until the codes expire.')
+@click.option('--notes', default=None, help='Note stored on every code.')
+@click.option('--csv', 'csv_path', type=click.Path(dir_okay=False, writable=True), help='Write the batch to this CSV file.')
+def mint_codes_command(count, days, notes, csv_path):
+    """Create COUNT access codes in one batch."""
+    started = time.monotonic()
+    batch_id, codes = mint_access_codes(count, days, notes)
+    print(f'{len(codes)} code(s) minted in {time.monotonic() - started:.1f}s (batch {batch_id})')
+    if csv_path:
+        with open(csv_path, 'wb') as f:
+            for chunk in stream_export(CODE_BATCH_COLUMNS, code_batch_query(batch_id)):
+                f.write(chunk)
+        print(f'Written to {csv_path}')
+
+def _export_command(kind, fmt, status, search, since, watermark_file, compress, output):
+    if watermark_file and since is None and os.path.exists(watermark_file):
+        with open(watermark_file) as f:
+            since = int(f.read().strip() or 0)
+    query, watermark = export_query(kind, status, search, since)
+    
+    started = time.monotonic()
+    written = 0
+    with click.open_file(output, 'wb') as out:
+        for chunk in stream_export(EXPORTS[kind].columns, query, fmt, compress):
+            out.write(chunk)
+            written += len(chunk)
+    # Watermark baru hanya disimpan setelah export selesai ditulis
+    if watermark_file:
+        with open(watermark_file, 'w') as f:
+            f.write(f'{watermark or 0}\n')
+    click.echo(f'{kind}: ids ({since or 0}, {watermark or 0}] exported, {written} bytes '
+               f'in {time.monotonic() - started:.1f}s', err=True)
+
+def export_options(command):
+    """Shared options of export-codes and export-payments"""
+    for option in reversed([
+        click.option('--format', 'fmt', type=click.Choice(list(EXPORT_FORMATS)), default='csv'),
+        click.option('--status', default='all', help='Status filter, as on the dashboard.'),
+        click.option('--search', default='', help='Search filter, as on the dashboard.'),
+        click.option('--since', type=int, default=None, help='Only rows with an id above this watermark.'),
+        click.option('--watermark-file', type=click.Path(dir_okay=False), default=None,
+                     help='Read --since from this file and store the new watermark in it afterwards.'),
+        click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.'),
+        click.option('-o', '--output', default='-', help='Output file (default stdout).'),
+    ]):
+        command = option(command)
+    return command
+
+@app.cli.command('export-codes')
+@export_options
+def export_codes_command(fmt, status, search, since, watermark_file, compress, output):
+    """Stream access codes as CSV/NDJSON."""
+    _export_command('codes', fmt, status, search, since, watermark_file, compress, output)
+
+@app.cli.command('export-payments')
+@export_options
+def export_payments_command(fmt, status, search, since, watermark_file, compress, output):
+    """Stream payment proofs as CSV/NDJSON."""
+    _export_command('payments', fmt, status, search, since, watermark_file, compress, output)
+
+@app.cli.command('ingest-videos')
+def ingest_videos_command():
+    """Queue poster/sprite/HLS generation for videos that have no poster yet."""
+    videos = Video.query.filter(Video.poster_url.is_(None)).all()
+    for video in videos:
+        enqueue_ingest(video)
+    db.session.commit()
+    print(f'{len(videos)} video(s) queued; run `flask process-uploads` to process them')
+
+# Query di jalur panas beserta index yang wajib dipakai: (nama, pembuat query, index)
+HOT_QUERY_PLANS = [
+    ('check_access_code', lambda: _entitlement_query('device').limit(1), 'ix_access_code_entitlement'),
+    ('sweep_expired_codes', lambda: expired_code_batch_query(utc_now(), 500), 'ix_access_code_expires_at'),
+    ('dashboard pending payments', lambda: pending_payments_query().limit(10), 'ix_payment_proof_pending'),
+    ('dashboard pending payments next page', lambda: pending_payments_query((utc_now(), 1)).limit(10),
+     'ix_payment_proof_pending'),
+    ('dashboard access codes', lambda: AccessCode.query.order_by(AccessCode.created_at.desc()).limit(10),
+     'ix_access_code_created_at'),
+    ('catalog first page', lambda: _catalog_page_query(None, app.config['CATALOG_PAGE_SIZE']),
+     'ix_video_created_at_id'),
+    ('catalog next page', lambda: _catalog_page_query((utc_now(), 1), app.config['CATALOG_PAGE_SIZE']),
+     'ix_video_created_at_id'),
+    ('upload queue', _next_upload_query, 'ix_upload_job_status_id'),
+    ('duplicate payment proof', lambda: _same_proof_hash_query('0' * 16, 1), 'ix_payment_proof_image_hash'),
+    # Urutan hasil pencarian butuh sort kecil atas baris yang cocok; yang diperiksa adalah pencocokannya
+    ('dashboard code search', lambda: filter_access_codes(AccessCode.query.with_entities(AccessCode.id),
+                                                          search_query='promo').limit(10001), 'access_code_fts'),
+    # Kode lengkap: OR antara index unik kode dan index trigram (MULTI-INDEX OR, bukan scan)
+    ('dashboard full-code search', lambda: filter_access_codes(AccessCode.query.with_entities(AccessCode.id),
+                                                               search_query='ABCD1234').limit(10001),
+     'sqlite_autoindex_access_code_1'),
+]
+
+def explain_query_plan(query):
+    """SQLite EXPLAIN QUERY PLAN lines for an ORM query, with its real bound parameters"""
+    connection = db.session.connection()
+    
+    def prefix_explain(conn, cursor, statement, parameters, context, executemany):
+        return 'EXPLAIN QUERY PLAN ' + statement, parameters
+    
+    event.listen(connection, 'before_cursor_execute', prefix_explain, retval=True)
+    try:
+        rows = connection.execute(query.statement)
+        return [row[-1] for row in rows.fetchall()]
+    finally:
+        event.remove(connection, 'before_cursor_execute', prefix_explain)
+
+def plan_uses_index(plan, index_name):
+    """True if the plan reads through `index_name` and needs no temp B-tree sort"""
+    return any(index_name in line for line in plan) and not any('USE TEMP B-TREE' in line for line in plan)
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if a hot query stops using its index (SQLite EXPLAIN QUERY PLAN)."""
+    if db.engine.dialect.name != 'sqlite':
+        print('Query plan check only runs on SQLite; skipped')
+        return
+    failures = 0
+    for name, build_query, index_name in HOT_QUERY_PLANS:
+        plan = explain_query_plan(build_query())
+        ok = plan_uses_index(plan, index_name)
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {' | '.join(plan)}")
+    if failures:
+        raise SystemExit(f'{failures} hot query(s) not using their index')
+
+# Context processor untuk membuat check_access_code tersedia di template
+@app.context_processor
+def utility_processor():
+    return dict(check_access_code=check_access_code)
+
+# user_loader for Flask-Login
+@login_manager.user_loader
+def load_user(user_id):
+    try:
+        return User.query.get(int(user_id))
+    except:
+        return None
+
+# Inisialisasi database: tidak ada lagi kerja DB saat import (cold start serverless)
+_db_init = {'done': False}
+_db_init_lock = threading.Lock()
+
+def seed_admin():
+    """Create the ADMIN_EMAIL/ADMIN_PASSWORD admin if it doesn't exist; returns True if created"""
+    admin_email = os.getenv('ADMIN_EMAIL')
+    admin_password = os.getenv('ADMIN_PASSWORD')
+    if not (admin_email and admin_password):
         return False
+    if User.query.filter_by(email=admin_email).first():
+        return False
+    db.session.add(User(
+        email=admin_email,
+        password=generate_password_hash(admin_password),
+        role='admin'
+    ))
+    db.session.commit()
+    return True
+
+def init_database():
+    """Run migrations (idempotent, also upgrades old create_all databases) and seed the admin"""
+    init_migrate()
+    from flask_migrate import upgrade
+
+    upgrade()
+    _search_state.update(fts=None, code_fts=None)
+    if seed_admin():
+        print('Admin user created')
+
+def migration_heads():
+    """Head revision ids, read from the migration files without importing alembic"""
+    revisions, parents = set(), set()
+    versions_dir = os.path.join(MIGRATIONS_DIR, 'versions')
+    for name in os.listdir(versions_dir):
+        if not name.endswith('.py'):
+            continue
+        with open(os.path.join(versions_dir, name)) as f:
+            source = f.read()
+        revision = re.search(r"^revision = ['\"](\w+)['\"]", source, re.M)
+        down_revision = re.search(r"^down_revision = (.*)$", source, re.M)
+        if revision:
+            revisions.add(revision.group(1))
+        if down_revision:
+            parents.update(re.findall(r"['\"](\w+)['\"]", down_revision.group(1)))
+    return revisions - parents
+
+def schema_is_current():
+    """True if alembic_version already points at every migration head"""
+    try:
+        applied = {row[0] for row in db.session.execute(text('SELECT version_num FROM alembic_version'))}
+    except Exception:
+        # Database baru: tabel alembic_version belum ada
+        db.session.rollback()
+        return False
+    return applied == migration_heads()
+
+def ensure_database():
+    """DB_AUTO_MIGRATE: run init_database once per process, on the first request
+    
+    A database that is already at the migration head only costs one SELECT;
+    alembic is imported only when there is something to upgrade.
+    """
+    if _db_init['done'] or not app.config['DB_AUTO_MIGRATE']:
+        return
+    with _db_init_lock:
+        if _db_init['done']:
+            return
+        try:
+            if schema_is_current():
+                seed_admin()
+            else:
+                init_database()
+        except Exception as e:
+            print(f'Database init error: {e}')
+        _db_init['done'] = True
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Apply migrations and create the admin user (run on deploy)"""
+    init_database()
+    click.echo('Database siap')
+
+@app.cli.command('seed-admin')
+def seed_admin_command():
+    """Create the admin user from ADMIN_EMAIL/ADMIN_PASSWORD"""
+    click.echo('Admin user created' if seed_admin() else 'Admin sudah ada atau ADMIN_EMAIL/ADMIN_PASSWORD kosong')
+
+# Instrumentasi request ------------------------------------------------------
+
+request_metrics = RequestMetrics(app.config['PROFILE_SAMPLE_SIZE'])
+
+# Method storage yang memanggil Cloudinary (atau disk untuk backend local)
+STORAGE_TIMED_METHODS = ('upload_chunk', 'destroy', 'direct_upload_params', 'derived_video_urls',
+                         'store_file', 'store_directory')
+
+def _request_profile():
+    return g.get('profile') if has_request_context() else None
 
-# Context processor untuk membuat check_access_code tersedia di template
-@app.context_processor
-def utility_processor():
-    return dict(check_access_code=check_access_code)
+def _observe_storage_call(method, seconds, error):
+    request_metrics.record_storage_call(method, seconds, error)
+    profile = _request_profile()
+    if profile is not None:
+        profile['storage_seconds'] += seconds
 
-# user_loader for Flask-Login
-@login_manager.user_loader
-def load_user(user_id):
-    try:
-        return User.query.get(int(user_id))
-    except:
-        return None
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if elapsed * 1000 >= app.config['SLOW_QUERY_MS']:
+        print(f"Slow query ({elapsed * 1000:.0f} ms): {' '.join(statement.split())[:300]}")
+    profile = _request_profile()
+    if profile is not None:
+        profile['queries'] += 1
+        profile['sql_seconds'] += elapsed
+
+def _template_started(sender, template, context, **extra):
+    profile = _request_profile()
+    if profile is not None:
+        profile['template_stack'].append(time.perf_counter())
+
+def _template_finished(sender, template, context, **extra):
+    profile = _request_profile()
+    if profile is not None and profile['template_stack']:
+        elapsed = time.perf_counter() - profile['template_stack'].pop()
+        # Hanya render terluar yang dihitung, supaya render bertingkat tidak dobel
+        if not profile['template_stack']:
+            profile['template_seconds'] += elapsed
+
+before_render_template.connect(_template_started, app)
+template_rendered.connect(_template_finished, app)
+
+@app.before_request
+def start_request_profile():
+    g.profile = {
+        'started': time.perf_counter(),
+        'queries': 0,
+        'sql_seconds': 0.0,
+        'template_seconds': 0.0,
+        'template_stack': [],
+        'storage_seconds': 0.0
+    }
 
-# Initialize database
-with app.app_context():
-    try:
-        db.create_all()
-        cleanup_expired_codes()
-        
-        # Create default admin user jika belum ada
-        admin_email = os.getenv('ADMIN_EMAIL')
-        admin_password = os.getenv('ADMIN_PASSWORD')
-        if admin_email and admin_password:
-            admin = User.query.filter_by(email=admin_email).first()
-            if not admin:
-                admin = User(
-                    email=admin_email, 
-                    password=generate_password_hash(admin_password), 
-                    role='admin'
-                )
-                db.session.add(admin)
-                db.session.commit()
-                print('Admin user created')
+@app.after_request
+def flush_playback_when_due(response):
+    """Flush the analytics buffer at the end of a request once the interval has passed"""
+    if response.is_streamed or not playback_flush_due():
+        return response
+    try:
+        # Perubahan request yang tidak di-commit akan dibuang saat teardown; jangan ikut ter-commit di sini
+        db.session.rollback()
+        flush_playback()
     except Exception as e:
-        print(f'Database init error: {e}')
+        print(f"Error flushing playback analytics: {e}")
+    return response
+
+@app.after_request
+def record_request_profile(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    duration = time.perf_counter() - profile['started']
+    endpoint = request.endpoint or 'unmatched'
+    request_metrics.record_request(
+        endpoint, request.method, response.status_code, duration,
+        queries=profile['queries'],
+        sql_seconds=profile['sql_seconds'],
+        template_seconds=profile['template_seconds'],
+        storage_seconds=profile['storage_seconds']
+    )
+    if profile['queries'] > app.config['QUERY_COUNT_WARN']:
+        print(f"Warning: {request.method} {request.path} ({endpoint}) ran {profile['queries']} SQL queries")
+    response.headers['Server-Timing'] = ', '.join([
+        f"app;dur={duration * 1000:.1f}",
+        f"db;dur={profile['sql_seconds'] * 1000:.1f};desc=\"{profile['queries']} queries\"",
+        f"tpl;dur={profile['template_seconds'] * 1000:.1f}",
+        f"storage;dur={profile['storage_seconds'] * 1000:.1f}"
+    ])
+    return response
 
 # Error handlers
 @app.errorhandler(500)
@@ -167,13 +2359,20 @@ def not_found_error(error):
 
 # Routes --------------------------------------------------------------------
 
+@app.before_request
+def start_background_work():
+    """Sweeper berjalan di thread sendiri; request tidak pernah membersihkan kode"""
+    ensure_database()
+    start_code_sweeper()
+    start_playback_flusher()
+
 @app.before_request
 def require_payment():
     """Check if user needs to go through payment gateway"""
     try:
         if request.endpoint and request.endpoint not in [
             'payment_gateway', 'static', 'access_code', 
-            'admin_login', 'logout', 'demo', 'index', 'health'
+            'admin_login', 'logout', 'demo', 'index', 'health', 'api_videos', 'api_search', 'api_viewer', 'api_playback', 'local_media', 'local_media_upload', 'metrics'
         ]:
             if not check_access_code() and not current_user.is_authenticated:
                 return redirect(url_for('demo'))
@@ -181,27 +2380,126 @@ def require_payment():
         print(f"Error in require_payment: {e}")
 
 @app.route('/')
+@cached_view(entitlement=lambda: not app.config['CATALOG_SHELL'])
 def index():
     """Home page"""
+    shell = app.config['CATALOG_SHELL']
     try:
-        if not check_access_code() and not current_user.is_authenticated:
+        # Mode shell: halaman yang sama untuk semua orang, kunci diatur di browser
+        if not shell and not check_access_code() and not current_user.is_authenticated:
             return redirect(url_for('demo'))
         
-        videos = Video.query.order_by(Video.created_at.desc()).all()
-        return render_template('index.html', videos=videos)
+        videos, next_cursor = get_catalog_page()
+        return render_template('index.html', videos=videos, next_cursor=next_cursor, viewer_shell=shell,
+                               cards=render_catalog_cards(videos, CATALOG_CARD_TEMPLATES['index']))
     except Exception as e:
         flash('Error loading videos', 'danger')
-        return render_template('index.html', videos=[])
+        return render_template('index.html', videos=[], next_cursor=None, viewer_shell=shell, cards=Markup(''))
 
 @app.route('/demo')
+@cached_view()
 def demo():
     """Halaman demo untuk user yang belum membayar"""
     try:
-        videos = Video.query.order_by(Video.created_at.desc()).all()
-        return render_template('demo.html', videos=videos)
+        videos, next_cursor = get_catalog_page()
+        return render_template('demo.html', videos=videos, next_cursor=next_cursor,
+                               cards=render_catalog_cards(videos, CATALOG_CARD_TEMPLATES['demo']))
     except Exception as e:
         flash('Error loading demo videos', 'danger')
-        return render_template('demo.html', videos=[])
+        return render_template('demo.html', videos=[], next_cursor=None, cards=Markup(''))
+
+@app.route('/api/videos')
+# Di luar mode shell, kartu view=index bergantung pada status entitlement
+@cached_view(entitlement=lambda: request.args.get('view') == 'index' and not app.config['CATALOG_SHELL'],
+             params=('cursor', 'limit', 'view', 'sort'))
+def api_videos():
+    """Katalog video dengan keyset pagination"""
+    cursor = request.args.get('cursor') or None
+    limit = request.args.get('limit', type=int)
+    view = request.args.get('view')
+    # sort=popular: video paling banyak ditonton (satu halaman, tanpa cursor)
+    popular = request.args.get('sort') == 'popular'
+    
+    try:
+        if popular:
+            videos, next_cursor = get_popular_videos(limit), None
+        else:
+            videos, next_cursor = get_catalog_page(cursor, limit)
+    except ValueError:
+        return jsonify({'error': 'invalid cursor'}), 400
+    except Exception as e:
+        print(f"Error in api_videos: {e}")
+        return jsonify({'error': 'catalog unavailable'}), 500
+    
+    data = {
+        'videos': [{
+            'id': v.id,
+            'title': v.title,
+            'description': v.description,
+            'url': v.url,
+            'poster_url': v.poster_url,
+            'hls_url': v.hls_url,
+            'created_at': v.created_at.strftime('%d/%m/%Y')
+        } for v in videos],
+        'next_cursor': next_cursor,
+        'version': catalog_version()
+    }
+    
+    if view in CATALOG_CARD_TEMPLATES:
+        data['html'] = str(render_catalog_cards(videos, CATALOG_CARD_TEMPLATES[view], 'popular' if popular else cursor, limit))
+    
+    return jsonify(data)
+
+@app.route('/api/playback', methods=['POST'])
+def api_playback():
+    """Beacon pemutar (play/progress/complete); event hanya masuk buffer analitik"""
+    data = request.get_json(force=True, silent=True)
+    events = data.get('events') if isinstance(data, dict) else None
+    if not isinstance(events, list) or not 0 < len(events) <= 20:
+        return jsonify({'error': 'invalid events'}), 400
+    
+    decision = get_rate_limiter().hit([
+        (f"playback:{request.remote_addr or 'unknown'}", parse_limit(app.config['RATE_LIMIT_PLAYBACK']))
+    ], cost=len(events))
+    if not decision.allowed:
+        response = jsonify({'error': 'rate limited'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after_seconds(decision))
+        return response
+    
+    flush_due = False
+    max_seconds = app.config['PLAYBACK_MAX_PROGRESS_SECONDS']
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        video_id, name = event.get('video_id'), event.get('event')
+        if type(video_id) is not int or video_id < 1 or name not in PLAYBACK_EVENTS:
+            continue
+        try:
+            seconds = float(event.get('seconds') or 0)
+        except (TypeError, ValueError):
+            seconds = 0
+        # NaN dan nilai negatif jadi 0; satu event progress paling banyak max_seconds
+        seconds = min(seconds, max_seconds) if seconds > 0 else 0
+        flush_due |= record_playback(video_id, name, seconds, preview=event.get('source') == 'preview')
+    
+    if flush_due:
+        # Ambang tercapai: tulis sekarang, jangan menunggu thread yang mungkin dibekukan host
+        flush_playback()
+    return '', 204
+
+@app.route('/api/viewer')
+def api_viewer():
+    """Status entitlement penonton ini untuk shell katalog (tidak pernah di-cache)"""
+    entitlement = get_entitlement()
+    entitled = entitlement.is_current()
+    response = jsonify({
+        'entitled': entitled,
+        'admin': current_user.is_authenticated and current_user.role == 'admin',
+        'expires_at': entitlement.expires_at.isoformat() if entitled else None
+    })
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
 
 # Payment Gateway
 @app.route('/payment', methods=['GET', 'POST'])
@@ -222,23 +2520,21 @@ def payment_gateway():
                 flash('Harap lengkapi semua field', 'danger')
                 return render_template('payment.html')
             
-            upload_result = cloudinary.uploader.upload(
-                proof_image,
-                resource_type='image',
-                folder='streamflix_payments'
-            )
-            
+            # Kompresi, thumbnail dan upload berjalan di worker; status 'pending' setelah selesai
             payment_proof = PaymentProof(
                 user_name=user_name,
                 user_email=user_email,
                 user_phone=user_phone,
                 payment_method=payment_method,
                 payment_amount=int(payment_amount),
-                proof_image=upload_result.get('secure_url')
+                status='processing'
             )
-            
             db.session.add(payment_proof)
-            db.session.commit()
+            db.session.flush()
+            job = enqueue_upload('payment_proof', proof_image, {}, target_id=payment_proof.id)
+            if job.status == 'failed':
+                flash('Gagal mengupload bukti pembayaran: ' + (job.error or ''), 'danger')
+                return render_template('payment.html')
             
             flash('Bukti pembayaran berhasil dikirim! Admin akan memverifikasi dalam 1x24 jam.', 'success')
             return redirect(url_for('payment_gateway'))
@@ -256,18 +2552,32 @@ def access_code():
         if check_access_code():
             return redirect(url_for('index'))
         
-        cleanup_expired_codes()
-        
         if request.method == 'POST':
             code = request.form.get('code', '').strip().upper().replace('-', '').replace(' ', '')
             
-            if not code or len(code) != 8:
+            # Kode selalu 8 karakter hex; yang lain ditolak tanpa menyentuh database atau bucket
+            if not ACCESS_CODE_PATTERN.fullmatch(code):
+                _count_rate_limit('malformed')
                 flash('Masukkan kode akses yang valid (8 karakter)', 'danger')
                 return render_template('access_code.html')
             
-            access_code_obj = AccessCode.query.filter_by(code=code).first()
+            limited = limit_redeem_attempt()
+            if limited:
+                retry_after = retry_after_seconds(limited)
+                flash(f'Terlalu banyak percobaan. Coba lagi dalam {retry_after} detik.', 'danger')
+                return render_template('access_code.html'), 429, {'Retry-After': str(retry_after)}
+            
+            limited = limit_redeem_lookup()
+            if limited:
+                retry_after = retry_after_seconds(limited)
+                flash('Server sedang sibuk, coba lagi sebentar.', 'warning')
+                return render_template('access_code.html'), 429, {'Retry-After': str(retry_after)}
+            
+            # Kunci baris kode (PostgreSQL) supaya dua device tidak menebus kode yang sama
+            access_code_obj = AccessCode.query.filter_by(code=code).with_for_update().first()
             
             if not access_code_obj:
+                record_redeem_failure()
                 flash('Kode akses tidak valid', 'danger')
                 return render_template('access_code.html')
             
@@ -284,11 +2594,26 @@ def access_code():
                 return render_template('access_code.html')
             
             device_id = get_device_id()
-            access_code_obj.is_used = True
-            access_code_obj.device_id = device_id
-            access_code_obj.used_at = utc_now()
+            # UPDATE bersyarat: di SQLite (tanpa row lock) penebus kedua mendapat 0 baris
+            claimed = AccessCode.query.filter_by(id=access_code_obj.id, is_used=False, is_active=True).filter(
+                AccessCode.expires_at > utc_now()
+            ).update({'is_used': True, 'device_id': device_id, 'used_at': utc_now()}, synchronize_session=False)
+            if not claimed:
+                db.session.rollback()
+                flash('Kode akses sudah digunakan', 'danger')
+                return render_template('access_code.html')
             
             db.session.commit()
+            invalidate_entitlement(device_id)
+            invalidate_dashboard_stats()
+            publish_change('code', id=access_code_obj.id, action='redeemed')
+            g.pop('entitlement', None)
+            g.pop('new_device', None)
+            issue_entitlement_claim(Entitlement(
+                valid=True,
+                expires_at=access_code_obj.expires_at.replace(tzinfo=timezone.utc),
+                code_id=access_code_obj.id
+            ), device_id)
             
             flash('Akses berhasil! Selamat menikmati StreamFlix.', 'success')
             return redirect(url_for('index'))
@@ -336,8 +2661,12 @@ def admin_dashboard():
             flash('Akses ditolak', 'danger')
             return redirect(url_for('index'))
         
-        pending_payments = PaymentProof.query.filter_by(status='pending').order_by(PaymentProof.created_at.desc()).all()
-        videos = Video.query.order_by(Video.created_at.desc()).all()
+        # Watermark diambil sebelum query: perubahan selama render diputar ulang oleh live update
+        feed_last_id = change_feed.last_id
+        
+        # Panel video dan pembayaran hanya memuat halaman pertama; sisanya lewat JSON
+        pending_payments, payments_cursor = get_pending_payments_page()
+        videos, videos_cursor = get_catalog_page(limit=app.config['ADMIN_PANEL_PAGE_SIZE'])
         
         # Get all access codes
         page = request.args.get('page', 1, type=int)
@@ -347,55 +2676,29 @@ def admin_dashboard():
         status_filter = request.args.get('status', 'all')
         search_query = request.args.get('search', '')
         
-        # Base query
-        access_codes_query = AccessCode.query
-        
-        # Apply filters
-        if status_filter == 'active':
-            access_codes_query = access_codes_query.filter_by(is_active=True)
-        elif status_filter == 'inactive':
-            access_codes_query = access_codes_query.filter_by(is_active=False)
-        elif status_filter == 'used':
-            access_codes_query = access_codes_query.filter_by(is_used=True)
-        elif status_filter == 'unused':
-            access_codes_query = access_codes_query.filter_by(is_used=False)
-        elif status_filter == 'expired':
-            access_codes_query = access_codes_query.filter(AccessCode.expires_at <= utc_now())
-        
-        # Apply search
-        if search_query:
-            access_codes_query = access_codes_query.filter(
-                db.or_(
-                    AccessCode.code.ilike(f'%{search_query}%'),
-                    AccessCode.device_id.ilike(f'%{search_query}%'),
-                    AccessCode.notes.ilike(f'%{search_query}%')
-                )
-            )
+        access_codes_query = filter_access_codes(AccessCode.query, status_filter, search_query)
         
         # Order and paginate
         access_codes = access_codes_query.order_by(AccessCode.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+            page=page, per_page=per_page, error_out=False, count=False
         )
-        
-        # Stats for dashboard
-        total_codes = AccessCode.query.count()
-        active_codes = AccessCode.query.filter_by(is_active=True).filter(AccessCode.expires_at > utc_now()).count()
-        used_codes = AccessCode.query.filter_by(is_used=True).count()
-        expired_codes = AccessCode.query.filter(AccessCode.expires_at <= utc_now()).count()
+        access_codes.total, access_codes_capped = count_access_codes(access_codes_query, status_filter, search_query)
         
         current_time = utc_now().replace(tzinfo=None)
         
         return render_template('admin.html', 
                              videos=videos, 
+                             videos_cursor=videos_cursor,
                              pending_payments=pending_payments,
+                             payments_cursor=payments_cursor,
                              access_codes=access_codes,
-                             total_codes=total_codes,
-                             active_codes=active_codes,
-                             used_codes=used_codes,
-                             expired_codes=expired_codes,
+                             access_codes_capped=access_codes_capped,
+                             stats=get_dashboard_stats(),
                              status_filter=status_filter,
                              search_query=search_query,
-                             current_time=current_time)
+                             current_time=current_time,
+                             feed_epoch=change_feed.epoch,
+                             feed_last_id=feed_last_id)
     
     except Exception as e:
         flash('Error loading dashboard', 'danger')
@@ -403,10 +2706,103 @@ def admin_dashboard():
                              videos=[], 
                              pending_payments=[],
                              access_codes=None,
-                             total_codes=0,
-                             active_codes=0,
-                             used_codes=0,
-                             expired_codes=0)
+                             stats=DashboardStats())
+
+@app.route('/admin/panel/videos')
+@login_required
+def admin_videos_panel():
+    """Halaman berikutnya panel video dashboard"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Akses ditolak'}), 403
+    
+    try:
+        videos, next_cursor = get_catalog_page(request.args.get('cursor') or None, app.config['ADMIN_PANEL_PAGE_SIZE'])
+    except ValueError:
+        return jsonify({'error': 'invalid cursor'}), 400
+    return jsonify({
+        'html': render_template('_admin_video_items.html', videos=videos),
+        'next_cursor': next_cursor
+    })
+
+@app.route('/admin/panel/pending-payments')
+@login_required
+def admin_payments_panel():
+    """Halaman berikutnya panel pembayaran pending"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Akses ditolak'}), 403
+    
+    try:
+        payments, next_cursor = get_pending_payments_page(request.args.get('cursor') or None)
+    except ValueError:
+        return jsonify({'error': 'invalid cursor'}), 400
+    return jsonify({
+        'html': render_template('_admin_payment_items.html', pending_payments=payments),
+        'next_cursor': next_cursor
+    })
+
+@app.route('/admin/events')
+@login_required
+def admin_events():
+    """Live update dashboard lewat Server-Sent Events"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Akses ditolak'}), 403
+    if not app.config['ADMIN_EVENTS_SSE']:
+        # Worker sinkron: satu stream menahan satu worker, dashboard memakai polling
+        return jsonify({'error': 'SSE dinonaktifkan'}), 404
+    
+    since, stale = feed_watermark()
+    # Stream hanya menunggu di memori; koneksi database dikembalikan ke pool selama menunggu
+    db.session.close()
+    
+    def generate():
+        last_id = since
+        yield f"retry: {app.config['ADMIN_EVENTS_POLL_INTERVAL'] * 1000}\n\n"
+        if stale:
+            yield _sse_message(admin_feed_payload([], last_id, reset=True), event_id=last_id)
+            db.session.close()
+        
+        stats = None
+        deadline = time.monotonic() + app.config['ADMIN_EVENTS_STREAM_SECONDS']
+        while time.monotonic() < deadline:
+            timeout = min(app.config['ADMIN_EVENTS_KEEPALIVE'], deadline - time.monotonic())
+            changes, reset = change_feed.wait(last_id, timeout)
+            if reset:
+                last_id = change_feed.last_id
+                payload = admin_feed_payload([], last_id, reset=True)
+            elif changes:
+                last_id = changes[-1].id
+                payload = admin_feed_payload(changes, last_id)
+            else:
+                # Mutasi di worker lain tidak lewat feed proses ini; counter tetap disegarkan
+                fresh = get_dashboard_stats()._asdict()
+                db.session.close()
+                if fresh != stats:
+                    stats = fresh
+                    yield _sse_message({'stats': fresh}, event='stats')
+                else:
+                    yield ': keepalive\n\n'
+                continue
+            db.session.close()
+            stats = payload['stats']
+            yield _sse_message(payload, event_id=last_id)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/admin/events.json')
+@login_required
+def admin_events_poll():
+    """Polling fallback live update: perubahan sesudah ?since= (watermark dari payload sebelumnya)"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Akses ditolak'}), 403
+    
+    since, stale = feed_watermark()
+    changes, reset = ([], True) if stale else change_feed.since(since)
+    if reset:
+        return jsonify(admin_feed_payload([], change_feed.last_id, reset=True))
+    return jsonify(admin_feed_payload(changes, changes[-1].id if changes else since))
 
 @app.route('/admin/approve-payment/<int:payment_id>', methods=['POST'])
 @login_required
@@ -416,19 +2812,14 @@ def approve_payment(payment_id):
             flash('Akses ditolak', 'danger')
             return redirect(url_for('index'))
         
-        payment = PaymentProof.query.get_or_404(payment_id)
+        # Kunci baris pembayaran supaya dua admin tidak menyetujui pembayaran yang sama
+        payment = PaymentProof.query.filter_by(id=payment_id).with_for_update().first_or_404()
         
         if payment.status != 'pending':
             flash('Pembayaran sudah diproses', 'warning')
             return redirect(url_for('admin_dashboard'))
         
-        # Generate unique access code
-        while True:
-            code = generate_access_code()
-            existing_code = AccessCode.query.filter_by(code=code).first()
-            if not existing_code:
-                break
-        
+        code = unique_access_codes(1)[0]
         expires_at = utc_now() + timedelta(days=30)
         
         access_code_obj = AccessCode(
@@ -443,6 +2834,9 @@ def approve_payment(payment_id):
         
         db.session.add(access_code_obj)
         db.session.commit()
+        invalidate_dashboard_stats()
+        publish_change('payment', id=payment_id, action='approved')
+        publish_change('code', id=access_code_obj.id, action='created')
         
         flash(f'Pembayaran disetujui! Kode akses: {code}', 'success')
         return redirect(url_for('admin_dashboard'))
@@ -467,6 +2861,8 @@ def reject_payment(payment_id):
         
         payment.status = 'rejected'
         db.session.commit()
+        invalidate_dashboard_stats()
+        publish_change('payment', id=payment_id, action='rejected')
         
         flash('Pembayaran ditolak', 'success')
         return redirect(url_for('admin_dashboard'))
@@ -486,14 +2882,22 @@ def generate_manual_code():
         
         days_valid = int(request.form.get('days', 30))
         notes = request.form.get('notes', '').strip()
+        count = int(request.form.get('count', 1))
         
-        # Generate unique code
-        while True:
-            code = generate_access_code()
-            existing_code = AccessCode.query.filter_by(code=code).first()
-            if not existing_code:
-                break
+        if count < 1 or count > app.config['MINT_MAX_COUNT']:
+            flash(f"Jumlah kode harus 1 - {app.config['MINT_MAX_COUNT']}", 'danger')
+            return redirect(url_for('admin_dashboard'))
+        
+        if count > 1:
+            batch_id, codes = mint_access_codes(count, days_valid, notes or None)
+            csv_url = url_for('export_code_batch', batch_id=batch_id)
+            flash(Markup(
+                f'{len(codes)} kode akses berhasil dibuat (Berlaku {days_valid} hari). '
+                f'<a href="{escape(csv_url)}" class="alert-link">Download CSV</a>'
+            ), 'success')
+            return redirect(url_for('admin_dashboard'))
         
+        code = unique_access_codes(1)[0]
         expires_at = utc_now() + timedelta(days=days_valid)
         
         access_code_obj = AccessCode(
@@ -504,6 +2908,8 @@ def generate_manual_code():
         
         db.session.add(access_code_obj)
         db.session.commit()
+        invalidate_dashboard_stats()
+        publish_change('code', id=access_code_obj.id, action='created')
         
         flash(f'Kode akses berhasil dibuat: {code} (Berlaku {days_valid} hari)', 'success')
         return redirect(url_for('admin_dashboard'))
@@ -512,6 +2918,44 @@ def generate_manual_code():
         flash('Error generating access code: ' + str(e), 'danger')
         return redirect(url_for('admin_dashboard'))
 
+@app.route('/admin/codes/batch/<batch_id>.csv')
+@login_required
+def export_code_batch(batch_id):
+    """Download satu batch kode hasil minting"""
+    if current_user.role != 'admin':
+        flash('Akses ditolak', 'danger')
+        return redirect(url_for('index'))
+    
+    rows = stream_export(CODE_BATCH_COLUMNS, code_batch_query(batch_id))
+    return Response(stream_with_context(rows), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename=codes-{secure_filename(batch_id)}.csv'
+    })
+
+@app.route('/admin/export/<kind>.<fmt>')
+@login_required
+def export_records(kind, fmt):
+    """Export kode akses atau bukti pembayaran (CSV/NDJSON) sesuai filter dashboard"""
+    if current_user.role != 'admin':
+        flash('Akses ditolak', 'danger')
+        return redirect(url_for('index'))
+    if kind not in EXPORTS or fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'unknown export'}), 404
+    
+    since_id = request.args.get('since', type=int)
+    compress = request.args.get('gzip') == '1'
+    query, watermark = export_query(kind, request.args.get('status', 'all'), request.args.get('search', ''), since_id)
+    filename = f"{kind}-{since_id or 0}-{watermark or 0}.{fmt}" + ('.gz' if compress else '')
+    return Response(
+        stream_with_context(stream_export(EXPORTS[kind].columns, query, fmt, compress)),
+        mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            # Simpan nilai ini dan kirim sebagai ?since= untuk export berikutnya
+            'X-Export-Watermark': str(watermark or 0),
+            'Cache-Control': 'private, no-store'
+        }
+    )
+
 @app.route('/admin/deactivate-code/<int:code_id>', methods=['POST'])
 @login_required
 def deactivate_code(code_id):
@@ -522,7 +2966,11 @@ def deactivate_code(code_id):
         
         code = AccessCode.query.get_or_404(code_id)
         code.is_active = False
+        revoke_codes([code.id])
         db.session.commit()
+        invalidate_dashboard_stats()
+        invalidate_entitlement(code.device_id)
+        publish_change('code', id=code_id, action='deactivate')
         
         flash(f'Kode {code.code} berhasil dinonaktifkan', 'success')
         return redirect(url_for('admin_dashboard'))
@@ -542,6 +2990,9 @@ def activate_code(code_id):
         code = AccessCode.query.get_or_404(code_id)
         code.is_active = True
         db.session.commit()
+        invalidate_dashboard_stats()
+        invalidate_entitlement(code.device_id)
+        publish_change('code', id=code_id, action='activate')
         
         flash(f'Kode {code.code} berhasil diaktifkan', 'success')
         return redirect(url_for('admin_dashboard'))
@@ -552,4 +3003,511 @@ def activate_code(code_id):
 
 @app.route('/admin/delete-code/<int:code_id>', methods=['POST'])
 @login_required
-def del
+def delete_code(code_id):
+    try:
+        if current_user.role != 'admin':
+            flash('Akses ditolak', 'danger')
+            return redirect(url_for('index'))
+        
+        code = AccessCode.query.get_or_404(code_id)
+        code_value = code.code
+        device_id = code.device_id
+        revoke_codes([code.id])
+        db.session.delete(code)
+        db.session.commit()
+        invalidate_dashboard_stats()
+        invalidate_entitlement(device_id)
+        publish_change('code', id=code_id, action='delete')
+        
+        flash(f'Kode {code_value} berhasil dihapus', 'success')
+        return redirect(url_for('admin_dashboard'))
+    
+    except Exception as e:
+        flash('Error deleting code: ' + str(e), 'danger')
+        return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/reset-code/<int:code_id>', methods=['POST'])
+@login_required
+def reset_code(code_id):
+    try:
+        if current_user.role != 'admin':
+            flash('Akses ditolak', 'danger')
+            return redirect(url_for('index'))
+        
+        code = AccessCode.query.get_or_404(code_id)
+        device_id = code.device_id
+        code.is_used = False
+        code.device_id = None
+        code.used_at = None
+        revoke_codes([code.id])
+        db.session.commit()
+        invalidate_dashboard_stats()
+        invalidate_entitlement(device_id)
+        publish_change('code', id=code_id, action='reset')
+        
+        flash(f'Kode {code.code} berhasil direset', 'success')
+        return redirect(url_for('admin_dashboard'))
+    
+    except Exception as e:
+        flash('Error resetting code: ' + str(e), 'danger')
+        return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/extend-code/<int:code_id>', methods=['POST'])
+@login_required
+def extend_code(code_id):
+    try:
+        if current_user.role != 'admin':
+            flash('Akses ditolak', 'danger')
+            return redirect(url_for('index'))
+        
+        days = int(request.form.get('days', 30))
+        code = AccessCode.query.get_or_404(code_id)
+        
+        # Perpanjang dari waktu kadaluarsa, atau dari sekarang jika sudah lewat
+        base_time = max(code.expires_at.replace(tzinfo=timezone.utc), utc_now())
+        code.expires_at = base_time + timedelta(days=days)
+        db.session.commit()
+        invalidate_dashboard_stats()
+        invalidate_entitlement(code.device_id)
+        publish_change('code', id=code_id, action='extend')
+        
+        flash(f'Kode {code.code} diperpanjang {days} hari', 'success')
+        return redirect(url_for('admin_dashboard'))
+    
+    except Exception as e:
+        flash('Error extending code: ' + str(e), 'danger')
+        return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/update-code-notes/<int:code_id>', methods=['POST'])
+@login_required
+def update_code_notes(code_id):
+    try:
+        if current_user.role != 'admin':
+            flash('Akses ditolak', 'danger')
+            return redirect(url_for('index'))
+        
+        code = AccessCode.query.get_or_404(code_id)
+        code.notes = request.form.get('notes', '').strip()
+        db.session.commit()
+        publish_change('code', id=code_id, action='notes')
+        
+        flash(f'Catatan kode {code.code} berhasil diperbarui', 'success')
+        return redirect(url_for('admin_dashboard'))
+    
+    except Exception as e:
+        flash('Error updating notes: ' + str(e), 'danger')
+        return redirect(url_for('admin_dashboard'))
+
+def _bulk_codes_query():
+    """Codes targeted by a bulk form: the checked ids, or everything matching the dashboard filter"""
+    if request.form.get('scope') == 'filter':
+        return filter_access_codes(AccessCode.query, request.form.get('status', 'all'), request.form.get('search', ''))
+    code_ids = request.form.getlist('code_ids', type=int)
+    if not code_ids:
+        return None
+    return AccessCode.query.filter(AccessCode.id.in_(code_ids))
+
+def _bulk_result(action, affected, message):
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'action': action, 'affected': affected})
+    flash(message, 'success')
+    return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/bulk-action', methods=['POST'])
+@login_required
+def bulk_action():
+    try:
+        if current_user.role != 'admin':
+            flash('Akses ditolak', 'danger')
+            return redirect(url_for('index'))
+        
+        action = request.form.get('bulk_action', '')
+        if action not in BULK_CODE_ACTIONS:
+            flash('Aksi tidak dikenal', 'danger')
+            return redirect(url_for('admin_dashboard'))
+        
+        query = _bulk_codes_query()
+        if query is None:
+            flash('Tidak ada kode yang dipilih', 'warning')
+            return redirect(url_for('admin_dashboard'))
+        
+        affected = apply_code_action(action, query, days=int(request.form.get('days', 30)))
+        return _bulk_result(action, affected, f'{affected} kode berhasil diproses')
+    
+    except Exception as e:
+        db.session.rollback()
+        flash('Error processing bulk action: ' + str(e), 'danger')
+        return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/bulk-delete-codes', methods=['POST'])
+@login_required
+def bulk_delete_codes():
+    try:
+        if current_user.role != 'admin':
+            flash('Akses ditolak', 'danger')
+            return redirect(url_for('index'))
+        
+        query = _bulk_codes_query()
+        if query is None:
+            flash('Tidak ada kode yang dipilih', 'warning')
+            return redirect(url_for('admin_dashboard'))
+        
+        affected = apply_code_action('delete', query)
+        return _bulk_result('delete', affected, f'{affected} kode berhasil dihapus')
+    
+    except Exception as e:
+        db.session.rollback()
+        flash('Error deleting codes: ' + str(e), 'danger')
+        return redirect(url_for('admin_dashboard'))
+
+# Video Management
+@app.route('/admin/upload', methods=['POST'])
+@login_required
+def admin_upload():
+    try:
+        if current_user.role != 'admin':
+            flash('Akses ditolak', 'danger')
+            return redirect(url_for('index'))
+        
+        title = request.form.get('title', '').strip()
+        description = request.form.get('description', '').strip()
+        video_file = request.files.get('video')
+        
+        if not title or not video_file:
+            flash('Judul dan file video harus diisi', 'danger')
+            return redirect(url_for('admin_dashboard'))
+        
+        job = enqueue_upload('video', video_file, {
+            'title': title,
+            'description': description
+        })
+        
+        if job.status == 'done':
+            flash('Video berhasil diupload!', 'success')
+        elif job.status == 'failed':
+            flash(f'Gagal mengupload video: {job.error}', 'danger')
+        else:
+            flash(f'Video sedang diupload di background (job #{job.id})', 'success')
+        return redirect(url_for('admin_dashboard'))
+    
+    except Exception as e:
+        flash('Gagal mengupload video: ' + str(e), 'danger')
+        return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/delete/<int:video_id>', methods=['POST'])
+@login_required
+def admin_delete(video_id):
+    try:
+        if current_user.role != 'admin':
+            flash('Akses ditolak', 'danger')
+            return redirect(url_for('index'))
+        
+        video = Video.query.get_or_404(video_id)
+        
+        if video.public_id:
+            try:
+                get_storage().destroy(video.public_id, resource_type='video')
+            except Exception as e:
+                print(f"Cloudinary delete error: {e}")
+        
+        db.session.delete(video)
+        VideoPlaybackHourly.query.filter_by(video_id=video_id).delete()
+        db.session.commit()
+        bump_catalog_version()
+        publish_change('video', id=video_id, action='delete')
+        
+        flash('Video berhasil dihapus', 'success')
+        return redirect(url_for('admin_dashboard'))
+    
+    except Exception as e:
+        flash('Error deleting video: ' + str(e), 'danger')
+        return redirect(url_for('admin_dashboard'))
+
+# Search
+@app.route('/search')
+@cached_view(params=('q',))
+def search_videos():
+    """Halaman hasil pencarian video"""
+    query = request.args.get('q', '').strip()
+    videos = []
+    
+    try:
+        if query:
+            videos, timed_out = search_catalog(query)
+            if timed_out:
+                flash('Pencarian terlalu lama, coba kata kunci yang lebih spesifik', 'warning')
+    except Exception as e:
+        flash('Error searching videos', 'danger')
+    
+    return render_template('search.html', videos=videos, query=query, search_count=len(videos))
+
+@app.route('/api/search')
+@cached_view(max_age_config='SEARCH_CACHE_TTL', params=('q', 'limit'))
+def api_search():
+    """Live search untuk navbar"""
+    try:
+        query = request.args.get('q', '').strip()
+        limit = request.args.get('limit', 5, type=int)
+        
+        if len(query) < 2:
+            return jsonify({'videos': []})
+        
+        videos, timed_out = search_catalog(query, limit)
+        
+        response = jsonify({'videos': [{
+            'id': v.id,
+            'title': v.title,
+            'description': v.description,
+            'title_html': str(v.title_html),
+            'description_html': str(v.description_html),
+            'url': v.url,
+            'poster_url': v.poster_url,
+            'created_at': v.created_at.strftime('%d/%m/%Y')
+        } for v in videos], 'timed_out': timed_out})
+        # Hasil parsial karena timeout jangan sampai disimpan cache mana pun
+        if timed_out:
+            response.headers['Cache-Control'] = 'no-store'
+        return response
+    except Exception as e:
+        print(f"Error in api_search: {e}")
+        response = jsonify({'videos': []})
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+@app.route('/admin/sweeper')
+@login_required
+def admin_sweeper_stats():
+    """Metrik sweeper kode kedaluwarsa di proses ini"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Akses ditolak'}), 403
+    
+    return jsonify(sweep_stats())
+
+@app.route('/admin/uploads')
+@login_required
+def admin_upload_jobs():
+    """Status upload terbaru untuk polling dari dashboard"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Akses ditolak'}), 403
+    
+    jobs = UploadJob.query.order_by(UploadJob.id.desc()).limit(20).all()
+    return jsonify({'jobs': [job.to_dict() for job in jobs]})
+
+@app.route('/admin/uploads/<int:job_id>')
+@login_required
+def admin_upload_job(job_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Akses ditolak'}), 403
+    
+    job = UploadJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
+@app.route('/admin/uploads/<int:job_id>/retry', methods=['POST'])
+@login_required
+def admin_retry_upload(job_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Akses ditolak'}), 403
+    
+    job = UploadJob.query.get_or_404(job_id)
+    if job.status == 'failed':
+        job.status = 'queued'
+        job.attempts = 0
+        db.session.commit()
+        wake_upload_workers()
+    return jsonify(job.to_dict())
+
+# Upload langsung dari browser: server hanya menandatangani dan mencatat hasilnya
+@app.route('/admin/direct-upload/sign', methods=['POST'])
+@login_required
+def direct_upload_sign():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Akses ditolak'}), 403
+    
+    resource_type, folder = UPLOAD_TARGETS['video']
+    try:
+        params = get_storage().direct_upload_params(resource_type, folder)
+    except Exception as e:
+        print(f"Error signing direct upload: {e}")
+        return jsonify({'error': 'Direct upload tidak tersedia'}), 503
+    
+    params['chunk_size'] = app.config['UPLOAD_CHUNK_SIZE']
+    return jsonify(params)
+
+@app.route('/admin/direct-upload/complete', methods=['POST'])
+@login_required
+def direct_upload_complete():
+    """Register the Video for a finished browser upload (idempotent per public_id)"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Akses ditolak'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    result = data.get('result') or {}
+    title = (data.get('title') or '').strip()
+    storage = get_storage()
+    resource_type, folder = UPLOAD_TARGETS['video']
+    
+    if not title:
+        return jsonify({'error': 'Judul video harus diisi'}), 400
+    try:
+        if not storage.verify_upload_result(result):
+            return jsonify({'error': 'Tanda tangan upload tidak valid'}), 400
+        # Tanda tangan berlaku untuk semua aset di akun ini (mis. bukti pembayaran); hanya video di folder video
+        if result.get('resource_type') != resource_type or not str(result['public_id']).startswith(folder + '/'):
+            return jsonify({'error': 'Upload bukan video katalog'}), 400
+        url = storage.upload_result_url(result, resource_type)
+    except Exception as e:
+        print(f"Error verifying direct upload: {e}")
+        return jsonify({'error': 'Tanda tangan upload tidak valid'}), 400
+    
+    public_id = result['public_id']
+    video = Video.query.filter_by(public_id=public_id).first()
+    if video is not None:
+        return jsonify({'video_id': video.id, 'created': False})
+    
+    video = Video(
+        title=title,
+        description=(data.get('description') or '').strip(),
+        url=url,
+        public_id=public_id
+    )
+    db.session.add(video)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Callback yang sama datang bersamaan; pakai baris yang sudah tersimpan
+        db.session.rollback()
+        video = Video.query.filter_by(public_id=public_id).first()
+        return jsonify({'video_id': video.id, 'created': False})
+    
+    enqueue_ingest(video)
+    db.session.commit()
+    bump_catalog_version()
+    wake_upload_workers()
+    publish_change('video', id=video.id, action='created')
+    return jsonify({'video_id': video.id, 'created': True})
+
+# File dari LocalStorage (STORAGE_BACKEND=local)
+@app.route('/media/<path:filename>')
+def local_media(filename):
+    return send_from_directory(app.config['LOCAL_STORAGE_DIR'], filename)
+
+@app.route('/media/upload/<resource_type>', methods=['POST'])
+def local_media_upload(resource_type):
+    """Server upload palsu yang meniru API upload Cloudinary, untuk development dan testing"""
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        return jsonify({'error': {'message': 'Not found'}}), 404
+    if not storage.check_upload_signature(request.form):
+        return jsonify({'error': {'message': 'Invalid Signature'}}), 401
+    
+    upload_file = request.files.get('file')
+    if upload_file is None:
+        return jsonify({'error': {'message': 'Missing required parameter - file'}}), 400
+    chunk = upload_file.read()
+    
+    # Chunked upload memakai header yang sama dengan Cloudinary
+    upload_id = request.headers.get('X-Unique-Upload-Id') or storage.new_upload_id()
+    content_range = re.fullmatch(r'bytes (\d+)-(\d+)/(\d+)', request.headers.get('Content-Range', ''))
+    if not re.fullmatch(r'[A-Za-z0-9_-]{1,64}', upload_id):
+        return jsonify({'error': {'message': 'Invalid upload id'}}), 400
+    if content_range:
+        offset, total_size = int(content_range.group(1)), int(content_range.group(3))
+    else:
+        offset, total_size = 0, len(chunk)
+    
+    result = storage.upload_chunk(
+        upload_id, chunk, offset, total_size, secure_filename(upload_file.filename or '') or 'upload',
+        resource_type=resource_type, folder=request.form.get('folder')
+    )
+    return jsonify(result or {'done': False, 'bytes': offset + len(chunk)})
+
+@app.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('Logout berhasil', 'success')
+    return redirect(url_for('admin_login'))
+
+@app.route('/metrics')
+def metrics():
+    """Metrik proses ini dalam format teks Prometheus (scraper dengan METRICS_TOKEN, atau admin)"""
+    token = app.config['METRICS_TOKEN']
+    scraper = bool(token) and secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not scraper and not (current_user.is_authenticated and current_user.role == 'admin'):
+        # Tanpa token endpoint ini tidak terlihat sama sekali
+        if token:
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return Response('Not Found\n', status=404, mimetype='text/plain')
+    
+    stats = sweep_stats()
+    extra = [
+        '# HELP streamflix_code_sweeper_runs_total Expired-code sweeper runs in this process.',
+        '# TYPE streamflix_code_sweeper_runs_total counter',
+        f"streamflix_code_sweeper_runs_total {stats['runs']}",
+        '# HELP streamflix_code_sweeper_removed_total Expired codes deleted or archived by the sweeper.',
+        '# TYPE streamflix_code_sweeper_removed_total counter',
+        f"streamflix_code_sweeper_removed_total {stats['total_deleted'] + stats['total_archived']}",
+        '# HELP streamflix_redeem_rejected_total Access-code attempts rejected before the database, by reason.',
+        '# TYPE streamflix_redeem_rejected_total counter'
+    ]
+    with _rate_limit_lock:
+        extra += [f'streamflix_redeem_rejected_total{{reason="{reason}"}} {count}'
+                  for reason, count in sorted(_rate_limit_stats.items()) if reason != 'failures']
+        extra += ['# HELP streamflix_redeem_failures_total Access-code attempts with a code that does not exist.',
+                  '# TYPE streamflix_redeem_failures_total counter',
+                  f"streamflix_redeem_failures_total {_rate_limit_stats['failures']}"]
+    playback = playback_stats()
+    extra += [
+        '# HELP streamflix_playback_events_total Player beacon events accepted into the analytics buffer.',
+        '# TYPE streamflix_playback_events_total counter',
+        f"streamflix_playback_events_total {playback['received']}",
+        '# HELP streamflix_playback_events_dropped_total Player events dropped because the buffer was full.',
+        '# TYPE streamflix_playback_events_dropped_total counter',
+        f"streamflix_playback_events_dropped_total {playback['dropped']}",
+        '# HELP streamflix_playback_buffered_events Player events waiting for the next flush.',
+        '# TYPE streamflix_playback_buffered_events gauge',
+        f"streamflix_playback_buffered_events {playback['buffered_events']}"
+    ]
+    return Response(request_metrics.render_prometheus(extra), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/profiling')
+@login_required
+def admin_profiling():
+    """Persentil latency dan jumlah query per endpoint (proses ini saja)"""
+    if current_user.role != 'admin':
+        flash('Akses ditolak', 'danger')
+        return redirect(url_for('index'))
+    
+    rows = request_metrics.snapshot()
+    if request.args.get('format') == 'json':
+        return jsonify({'endpoints': rows})
+    return render_template('admin_profiling.html', rows=rows,
+                           query_count_warn=app.config['QUERY_COUNT_WARN'])
+
+@app.route('/admin/analytics')
+@login_required
+def admin_analytics():
+    """Video paling banyak ditonton dan pemutaran per jam dari rollup analitik"""
+    if current_user.role != 'admin':
+        flash('Akses ditolak', 'danger')
+        return redirect(url_for('index'))
+    
+    hours = max(1, min(request.args.get('hours', 24, type=int), 24 * 90))
+    videos, hourly = playback_summary(hours)
+    stats = playback_stats()
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'hours': hours,
+            'videos': videos,
+            'hourly': [dict(row, hour=row['hour'].isoformat()) for row in hourly],
+            'buffer': stats
+        })
+    return render_template('admin_analytics.html', hours=hours, videos=videos, hourly=hourly, stats=stats,
+                           max_hourly_plays=max((row['plays'] for row in hourly), default=0))
+
+@app.route('/health')
+def health():
+    return jsonify({'status': 'ok'})
+
+if __name__ == '__main__':
+    app.run(debug=True)
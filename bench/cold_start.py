@@ -0,0 +1,115 @@
+"""Cold start benchmark: import app.py in a fresh interpreter and time the first response
+
+Setiap run memakai proses Python baru (seperti instance serverless baru) dan
+mengukur waktu import, waktu request pertama dan total dari start proses.
+Tanpa flag, konfigurasi default yang diukur: SQLite dengan DB_AUTO_MIGRATE
+menyala dan database yang sudah dimigrasi sebelumnya (instance baru, file
+database lama). --deploy-migrate mematikan DB_AUTO_MIGRATE (migrasi lewat
+`flask init-db` saat deploy); --fresh-db memulai setiap run dengan database
+kosong, sehingga request pertama menjalankan semua migrasi.
+
+    python bench/cold_start.py --runs 10 --path /health --max-ms 800
+
+Hasil di mesin development (median request pertama, GET /health):
+default 10 ms (sebelumnya 132 ms karena alembic selalu dijalankan),
+--deploy-migrate 6 ms, --fresh-db 155 ms.
+
+Exit code 1 jika median total melewati --max-ms (untuk CI).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get(sys.argv[1])
+responded = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (responded - imported) * 1000,
+    'status': response.status_code
+}))
+'''
+
+INIT = 'import app\nwith app.app.app_context():\n    app.init_database()\n'
+
+
+def run_child(code, args, env):
+    return subprocess.run([sys.executable, '-c', code, *args], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/health', help='URL yang diminta sebagai request pertama')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--deploy-migrate', action='store_true',
+                      help='DB_AUTO_MIGRATE=0: migrasi hanya saat setup, seperti `flask init-db` saat deploy')
+    mode.add_argument('--fresh-db', action='store_true',
+                      help='database kosong di setiap run; request pertama menjalankan semua migrasi')
+    parser.add_argument('--max-ms', type=float, help='gagal jika median total melewati batas ini')
+    parser.add_argument('--json', action='store_true', help='cetak hasil sebagai JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        env.setdefault('STORAGE_BACKEND', 'local')
+        env.setdefault('LOCAL_STORAGE_DIR', os.path.join(tmp, 'media'))
+        env['CODE_SWEEP_INTERVAL'] = '0'
+        env.pop('FLASK_RUN_FROM_CLI', None)
+        env.pop('DB_AUTO_MIGRATE', None)
+
+        if args.deploy_migrate:
+            env['DB_AUTO_MIGRATE'] = '0'
+        if not args.fresh_db:
+            run_child(INIT, [], env)
+
+        runs = []
+        for _ in range(args.runs):
+            if args.fresh_db:
+                # Instance baru = database kosong lagi
+                for suffix in ('', '-wal', '-shm'):
+                    path = os.path.join(tmp, 'bench.db' + suffix)
+                    if os.path.exists(path):
+                        os.remove(path)
+            started = time.perf_counter()
+            result = json.loads(run_child(CHILD, [args.path], env).stdout.strip().splitlines()[-1])
+            result['total_ms'] = (time.perf_counter() - started) * 1000
+            runs.append(result)
+
+    mode = 'deploy-migrate' if args.deploy_migrate else 'fresh-db' if args.fresh_db else 'default'
+    summary = {'path': args.path, 'runs': len(runs), 'mode': mode}
+    for key in ('import_ms', 'first_response_ms', 'total_ms'):
+        values = [run[key] for run in runs]
+        summary[key] = {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+    summary['statuses'] = sorted({run['status'] for run in runs})
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"{summary['runs']} cold start(s) ({mode}), GET {args.path} -> {summary['statuses']}")
+        for key in ('import_ms', 'first_response_ms', 'total_ms'):
+            stats = summary[key]
+            print(f"  {key:<18} median {stats['median']:8.1f}  min {stats['min']:8.1f}  max {stats['max']:8.1f}")
+
+    if args.max_ms is not None and summary['total_ms']['median'] > args.max_ms:
+        print(f"Cold start regression: median {summary['total_ms']['median']:.1f} ms > {args.max_ms:.1f} ms",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,357 @@
+"""Load test for the viewer and admin hot paths with JSON baselines
+
+Database (SQLite sementara, atau Postgres lewat --database-url) diisi video,
+kode akses dan bukti pembayaran sesuai volume yang diminta; Cloudinary
+diganti LocalStorage sehingga tidak ada panggilan jaringan. Setiap skenario
+dijalankan oleh beberapa thread bersamaan lewat test client. Jumlah query SQL
+per request dibaca dari header Server-Timing yang dipasang aplikasi.
+
+Skenario index memakai penonton yang sudah menebus kode: `index` seperti di
+produksi (cache halaman aktif), `index_uncached` tanpa cache halaman dan
+katalog sehingga query katalog dan render ikut terukur.
+
+    python bench/load.py --videos 2000 --codes 20000 --payments 1000 --save-baseline bench/baselines/sqlite.json
+    python bench/load.py --baseline bench/baselines/sqlite.json
+
+Exit code 1 jika ada request yang gagal, atau jika dibandingkan dengan
+--baseline: p95 naik lebih dari --max-latency-regression kali (plus
+--latency-slack-ms) atau rata-rata query per request bertambah. Throughput
+hanya dilaporkan; latency berisik di mesin CI, jumlah query dihitung persis
+sehingga itulah gerbang yang paling tegas.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ('index', 'index_uncached', 'demo', 'api_search', 'access_code', 'admin_dashboard')
+
+# Override konfigurasi selama satu skenario: index_uncached mematikan cache halaman dan katalog
+# supaya gerbang jumlah query benar-benar melewati query katalog dan render halaman
+SCENARIO_CONFIG = {
+    'index_uncached': {'PAGE_CACHE_TTL': 0, 'CATALOG_CACHE_TTL': 0}
+}
+
+WORDS = ('action', 'drama', 'comedy', 'horror', 'romance', 'thriller', 'anime', 'documentary',
+         'night', 'city', 'ocean', 'storm', 'shadow', 'legend', 'journey', 'secret', 'summer',
+         'winter', 'hunter', 'kingdom', 'galaxy', 'dragon', 'river', 'mountain', 'island',
+         'detective', 'family', 'school', 'revenge', 'empire', 'signal', 'mirror', 'garden')
+
+ADMIN_EMAIL = 'bench@streamflix.local'
+ADMIN_PASSWORD = 'bench-password'
+
+_SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def seed(streamflix, videos, codes, payments, rnd):
+    """Bulk-insert the requested volumes; returns unused access codes for the redemption scenario"""
+    db = streamflix.db
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    chunk = 1000
+
+    for start in range(0, videos, chunk):
+        rows = []
+        for i in range(start, min(videos, start + chunk)):
+            title = ' '.join(rnd.sample(WORDS, 3)).title()
+            public_id = f'streamflix_videos/bench-{i}'
+            rows.append({
+                'title': f'{title} {i}',
+                'description': ' '.join(rnd.choice(WORDS) for _ in range(30)),
+                'url': f'/media/{public_id}.mp4',
+                'public_id': public_id,
+                'poster_url': f'/media/{public_id}.jpg',
+                'created_at': now - timedelta(minutes=i)
+            })
+        db.session.execute(db.insert(streamflix.Video), rows)
+        db.session.commit()
+
+    redeemable = []
+    if codes:
+        _, minted = streamflix.mint_access_codes(codes, 30, 'bench')
+        # Separuh kode dipakai perangkat lain (seperti produksi), sisanya bisa ditebus
+        used = minted[:len(minted) // 2]
+        redeemable = minted[len(minted) // 2:]
+        for start in range(0, len(used), chunk):
+            db.session.execute(
+                db.update(streamflix.AccessCode)
+                .where(streamflix.AccessCode.code.in_(used[start:start + chunk]))
+                .values(is_used=True, used_at=now, device_id=streamflix.uuid.uuid4().hex)
+            )
+        db.session.commit()
+
+    statuses = ('pending', 'approved', 'approved', 'rejected')
+    for start in range(0, payments, chunk):
+        rows = []
+        for i in range(start, min(payments, start + chunk)):
+            rows.append({
+                'user_name': f'Bench User {i}',
+                'user_email': f'user{i}@bench.local',
+                'user_phone': f'08{rnd.randrange(10 ** 9, 10 ** 10)}',
+                'payment_method': rnd.choice(('dana', 'ovo', 'gopay', 'bank')),
+                'payment_amount': 25000,
+                'proof_image': f'/media/streamflix_payments/bench-{i}.jpg',
+                'thumbnail_url': f'/media/streamflix_payments_thumbs/bench-{i}.jpg',
+                'image_hash': f'{rnd.getrandbits(64):016x}',
+                'status': statuses[i % len(statuses)],
+                'created_at': now - timedelta(minutes=i)
+            })
+        db.session.execute(db.insert(streamflix.PaymentProof), rows)
+        db.session.commit()
+
+    streamflix.bump_catalog_version()
+    return redeemable
+
+
+class Scenario:
+    """One endpoint under load: builds a client per worker and issues one request"""
+
+    def __init__(self, name, flask_app, redeemable, admin):
+        self.name = name
+        self.app = flask_app
+        self.redeemable = redeemable
+        self.redeemable_lock = threading.Lock()
+        self.admin = admin
+
+    def client(self):
+        client = self.app.test_client()
+        if self.name in ('index', 'index_uncached'):
+            # Penonton yang sudah menebus kode; tanpa akses / hanya mengukur redirect ke /demo
+            with self.redeemable_lock:
+                code = self.redeemable.pop() if self.redeemable else None
+            if code is None:
+                raise RuntimeError(f'no redeemable access code left for the {self.name} scenario (raise --codes)')
+            client.post('/access-code', data={'code': code})
+            if not client.get('/api/viewer').get_json()['entitled']:
+                raise RuntimeError(f'redeeming {code} did not grant access')
+        if self.name == 'admin_dashboard':
+            response = client.post('/admin', data={'email': self.admin[0], 'password': self.admin[1]})
+            if response.status_code != 302:
+                raise RuntimeError(f'admin login failed: HTTP {response.status_code}')
+        return client
+
+    def request(self, client, rnd, worker):
+        """Returns (response, expected statuses)"""
+        if self.name in ('index', 'index_uncached'):
+            return client.get('/'), (200,)
+        if self.name == 'demo':
+            return client.get('/demo'), (200,)
+        if self.name == 'api_search':
+            return client.get('/api/search', query_string={'q': ' '.join(rnd.sample(WORDS, rnd.randint(1, 2)))}), (200,)
+        if self.name == 'access_code':
+            # Campuran penebusan sah (kode baru, device baru) dan tebakan salah dari IP berbeda
+            code = None
+            if rnd.random() < 0.2:
+                with self.redeemable_lock:
+                    code = self.redeemable.pop() if self.redeemable else None
+            if code is None:
+                code = f'{rnd.getrandbits(32):08X}'
+            response = self.app.test_client().post(
+                '/access-code', data={'code': code},
+                headers={'X-Forwarded-For': f'10.{worker}.{rnd.randrange(256)}.{rnd.randrange(256)}'}
+            )
+            return response, (200, 302)
+        if self.name == 'admin_dashboard':
+            return client.get('/admin/dashboard'), (200,)
+        raise ValueError(self.name)
+
+
+def run_scenario(scenario, requests_total, concurrency, warmup, seed_value, percentile):
+    overrides = SCENARIO_CONFIG.get(scenario.name, {})
+    previous = {key: scenario.app.config[key] for key in overrides}
+    scenario.app.config.update(overrides)
+    try:
+        return _run_scenario(scenario, requests_total, concurrency, warmup, seed_value, percentile)
+    finally:
+        scenario.app.config.update(previous)
+
+
+def _run_scenario(scenario, requests_total, concurrency, warmup, seed_value, percentile):
+    clients = [scenario.client() for _ in range(concurrency)]
+    warm_rnd = random.Random(seed_value)
+    for i in range(warmup):
+        scenario.request(clients[i % concurrency], warm_rnd, 0)
+
+    samples = []
+    errors = []
+    lock = threading.Lock()
+    remaining = [requests_total]
+
+    def worker(index):
+        rnd = random.Random(f'{seed_value}-{scenario.name}-{index}')
+        client = clients[index]
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            response, expected = scenario.request(client, rnd, index)
+            elapsed = time.perf_counter() - started
+            match = _SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+            queries = int(match.group(1)) if match else 0
+            response.close()
+            with lock:
+                samples.append((elapsed, queries))
+                if response.status_code not in expected:
+                    errors.append(response.status_code)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    durations = sorted(d for d, _ in samples)
+    queries = [q for _, q in samples]
+    return {
+        'requests': len(samples),
+        'errors': len(errors),
+        'error_statuses': sorted(set(errors)),
+        'throughput_rps': len(samples) / wall if wall else 0.0,
+        'p50_ms': percentile(durations, 50) * 1000,
+        'p95_ms': percentile(durations, 95) * 1000,
+        'p99_ms': percentile(durations, 99) * 1000,
+        'avg_queries': sum(queries) / len(queries) if queries else 0.0,
+        'max_queries': max(queries, default=0)
+    }
+
+
+def compare(results, baseline, max_latency_regression, latency_slack_ms):
+    """Regression messages for results against a saved baseline"""
+    problems = []
+    for name, current in results.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        # Slack absolut supaya cache hit di bawah 1 ms tidak gagal karena noise
+        if current['p95_ms'] > previous['p95_ms'] * max_latency_regression + latency_slack_ms:
+            problems.append(f"{name}: p95 {current['p95_ms']:.1f} ms > {max_latency_regression:g}x "
+                            f"baseline {previous['p95_ms']:.1f} ms")
+        # Toleransi kecil untuk pembulatan rata-rata; query tambahan per request tetap gagal
+        if current['avg_queries'] > previous['avg_queries'] + 0.05:
+            problems.append(f"{name}: {current['avg_queries']:.2f} queries/request > "
+                            f"baseline {previous['avg_queries']:.2f}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='default: SQLite sementara; Postgres harus database kosong')
+    parser.add_argument('--videos', type=int, default=1000)
+    parser.add_argument('--codes', type=int, default=10000)
+    parser.add_argument('--payments', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=300, help='request per skenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=20, help='request pemanasan per skenario (tidak diukur)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='daftar skenario dipisah koma')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', help='file JSON baseline untuk dibandingkan')
+    parser.add_argument('--save-baseline', help='tulis hasil sebagai baseline JSON ke file ini')
+    parser.add_argument('--max-latency-regression', type=float, default=1.5,
+                        help='gagal jika p95 naik lebih dari faktor ini')
+    parser.add_argument('--latency-slack-ms', type=float, default=20.0,
+                        help='kenaikan p95 absolut yang selalu diterima')
+    parser.add_argument('--json', action='store_true', help='cetak hasil sebagai JSON')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    tmp = tempfile.mkdtemp()
+    os.environ.update({
+        'DATABASE_URL': args.database_url or f"sqlite:///{os.path.join(tmp, 'load.db')}",
+        'STORAGE_BACKEND': 'local',
+        'LOCAL_STORAGE_DIR': os.path.join(tmp, 'media'),
+        'ADMIN_EMAIL': ADMIN_EMAIL,
+        'ADMIN_PASSWORD': ADMIN_PASSWORD,
+        'CODE_SWEEP_INTERVAL': '0',
+        'DB_AUTO_MIGRATE': '0',
+        # Yang diukur adalah jalur database penebusan, bukan penolakan 429
+        'RATE_LIMIT_REDEEM_IP': '1000000/1',
+        'RATE_LIMIT_REDEEM_DEVICE': '1000000/1',
+        'RATE_LIMIT_REDEEM_FAILURES': '1000000/1',
+        'RATE_LIMIT_REDEEM_GLOBAL': '1000000/1'
+    })
+    for key in ('CLOUDINARY_CLOUD_NAME', 'CLOUDINARY_API_KEY', 'CLOUDINARY_API_SECRET'):
+        os.environ.pop(key, None)
+    sys.path.insert(0, ROOT)
+    import app as streamflix
+    from metrics import percentile
+
+    flask_app = streamflix.app
+    flask_app.config['TESTING'] = True
+    rnd = random.Random(args.seed)
+    seed_started = time.perf_counter()
+    with flask_app.app_context():
+        streamflix.init_database()
+        redeemable = seed(streamflix, args.videos, args.codes, args.payments, rnd)
+        dialect = streamflix.db.engine.dialect.name
+    seed_seconds = time.perf_counter() - seed_started
+
+    results = {}
+    for name in names:
+        scenario = Scenario(name, flask_app, redeemable, (ADMIN_EMAIL, ADMIN_PASSWORD))
+        results[name] = run_scenario(scenario, args.requests, args.concurrency, args.warmup, args.seed, percentile)
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'database': dialect,
+        'python': platform.python_version(),
+        'volumes': {'videos': args.videos, 'codes': args.codes, 'payments': args.payments},
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'seed_seconds': round(seed_seconds, 2),
+        'scenarios': {name: {key: round(value, 3) if isinstance(value, float) else value
+                             for key, value in stats.items()} for name, stats in results.items()}
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        volumes = report['volumes']
+        print(f"{report['database']}: {volumes['videos']} videos, {volumes['codes']} codes, "
+              f"{volumes['payments']} payments (seeded in {seed_seconds:.1f}s); "
+              f"{args.requests} requests x {args.concurrency} threads per scenario")
+        print(f"  {'scenario':<16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'queries':>8} {'max q':>6} {'errors':>6}")
+        for name, stats in results.items():
+            print(f"  {name:<16} {stats['throughput_rps']:8.0f} {stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} "
+                  f"{stats['p99_ms']:8.1f} {stats['avg_queries']:8.2f} {stats['max_queries']:6d} {stats['errors']:6d}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+    failed = False
+    for name, stats in results.items():
+        if stats['errors']:
+            print(f"FAIL: {name}: {stats['errors']} unexpected response(s) {stats['error_statuses']}", file=sys.stderr)
+            failed = True
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('volumes') != report['volumes']:
+            print(f"Warning: baseline volumes {baseline.get('volumes')} differ from this run", file=sys.stderr)
+        for problem in compare(results, baseline, args.max_latency_regression, args.latency_slack_ms):
+            print(f'REGRESSION: {problem}', file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
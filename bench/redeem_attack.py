@@ -0,0 +1,120 @@
+"""Brute-force load test for /access-code: the database lookup rate must stay bounded
+
+Penyerang menebak kode acak dari banyak IP (X-Forwarded-For) dan selalu
+memakai cookie baru, jadi bucket per device tidak pernah membantu; yang
+membatasi hanyalah bucket per IP, bucket kegagalan dan bucket global.
+Setiap statement SQL yang menyentuh tabel access_code dihitung.
+
+    python bench/redeem_attack.py --attackers 8 --seconds 5 --ips 200
+
+Exit code 1 jika lookup ke access_code melebihi batas bucket global
+(burst + rate x durasi), atau jika penebusan sah setelah serangan gagal.
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--attackers', type=int, default=8, help='thread penyerang')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--ips', type=int, default=200, help='jumlah IP yang dirotasi penyerang')
+    parser.add_argument('--malformed', type=float, default=0.3, help='proporsi tebakan yang formatnya salah')
+    parser.add_argument('--backend', default='memory', choices=['memory', 'sqlite'])
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'attack.db')}",
+        'RATE_LIMIT_BACKEND': args.backend,
+        'RATE_LIMIT_URL': os.path.join(tmp, 'ratelimit.db'),
+        'STORAGE_BACKEND': 'local',
+        'LOCAL_STORAGE_DIR': os.path.join(tmp, 'media'),
+        'CODE_SWEEP_INTERVAL': '0',
+        'DB_AUTO_MIGRATE': '0'
+    })
+    sys.path.insert(0, ROOT)
+    import app as streamflix
+    from sqlalchemy import event
+
+    flask_app = streamflix.app
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        streamflix.init_database()
+        _, codes = streamflix.mint_access_codes(50, 30, 'redeem_attack')
+        engine = streamflix.db.engine
+
+    lookups = []
+    lookups_lock = threading.Lock()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_lookup(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM access_code' in statement:
+            with lookups_lock:
+                lookups.append(time.monotonic())
+
+    statuses = Counter()
+    statuses_lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+
+    def attacker(seed):
+        rnd = random.Random(seed)
+        while time.monotonic() < deadline:
+            if rnd.random() < args.malformed:
+                guess = ''.join(rnd.choice(string.ascii_letters) for _ in range(rnd.randint(1, 12)))
+            else:
+                guess = ''.join(rnd.choice('0123456789ABCDEF') for _ in range(8))
+            # Client baru = cookie/device baru di setiap percobaan
+            response = flask_app.test_client().post(
+                '/access-code', data={'code': guess},
+                headers={'X-Forwarded-For': f'10.0.{rnd.randrange(args.ips) // 256}.{rnd.randrange(args.ips) % 256}'}
+            )
+            with statuses_lock:
+                statuses[response.status_code] += 1
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=attacker, args=(i,)) for i in range(args.attackers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    global_limit = streamflix.parse_limit(flask_app.config['RATE_LIMIT_REDEEM_GLOBAL'])
+    allowed_lookups = global_limit.capacity + global_limit.rate * elapsed
+    attack_lookups = len(lookups)
+    requests_total = sum(statuses.values())
+    per_second = Counter(int(t - started) for t in lookups)
+
+    print(f'{requests_total} attack requests in {elapsed:.1f}s ({requests_total / elapsed:.0f}/s), '
+          f'statuses {dict(sorted(statuses.items()))}')
+    print(f'access_code lookups: {attack_lookups} ({attack_lookups / elapsed:.1f}/s), '
+          f'peak {max(per_second.values(), default=0)}/s, bound {allowed_lookups:.0f}')
+
+    # Setelah serangan (bucket global terisi lagi), pengguna sah dari IP lain tetap bisa menebus
+    time.sleep(global_limit.period)
+    legit = flask_app.test_client().post('/access-code', data={'code': codes[0]},
+                                         headers={'X-Forwarded-For': '192.0.2.10'})
+    print(f'legitimate redemption after attack: HTTP {legit.status_code}')
+
+    failed = False
+    if attack_lookups > allowed_lookups:
+        print('FAIL: database lookups exceeded the global bucket', file=sys.stderr)
+        failed = True
+    if legit.status_code != 302:
+        print('FAIL: legitimate redemption was rejected', file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
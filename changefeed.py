@@ -0,0 +1,73 @@
+import secrets
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+
+class Change(NamedTuple):
+    """Satu perubahan: id naik terus per proses, `kind` payment/code/codes/video"""
+    id: int
+    kind: str
+    data: dict
+    at: float
+
+
+class ChangeFeed:
+    """Pub/sub dalam proses: ring buffer perubahan terakhir plus Condition untuk pelanggan
+
+    Pelanggan menyimpan id terakhir yang sudah diterapkan (watermark) dan meminta
+    semua perubahan sesudahnya. `epoch` berganti setiap proses dimulai, jadi
+    watermark dari proses lain atau dari sebelum restart terdeteksi sebagai reset.
+    """
+
+    def __init__(self, maxlen=1000):
+        self.epoch = secrets.token_hex(4)
+        self._changes = deque(maxlen=maxlen)
+        self._last_id = 0
+        self._listeners = 0
+        self._condition = threading.Condition()
+
+    @property
+    def last_id(self):
+        with self._condition:
+            return self._last_id
+
+    def publish(self, kind, data):
+        with self._condition:
+            self._last_id += 1
+            change = Change(self._last_id, kind, data, time.time())
+            self._changes.append(change)
+            self._condition.notify_all()
+        return change
+
+    def _since(self, last_id):
+        if last_id > self._last_id:
+            return [], True
+        if self._changes and self._changes[0].id > last_id + 1:
+            # Perubahan di antaranya sudah keluar dari buffer
+            return [], True
+        return [change for change in self._changes if change.id > last_id], False
+
+    def since(self, last_id):
+        """Return (changes after `last_id`, reset); reset means the caller must reload its state"""
+        with self._condition:
+            return self._since(last_id)
+
+    def wait(self, last_id, timeout):
+        """Block until something newer than `last_id` is published or `timeout` elapses"""
+        with self._condition:
+            self._listeners += 1
+            try:
+                self._condition.wait_for(lambda: self._last_id != last_id, timeout)
+                return self._since(last_id)
+            finally:
+                self._listeners -= 1
+
+    def stats(self):
+        with self._condition:
+            return {
+                'last_id': self._last_id,
+                'buffered': len(self._changes),
+                'listeners': self._listeners
+            }
@@ -0,0 +1,143 @@
+import importlib.util
+import os
+import shutil
+import subprocess
+
+# Rendition ladder HLS: (tinggi, bitrate video kbps)
+HLS_LADDER = [(360, 800), (720, 2500)]
+
+
+def ffmpeg_available():
+    return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+
+def pillow_available():
+    return importlib.util.find_spec('PIL') is not None
+
+
+def _run(args, timeout=1800):
+    subprocess.run(args, check=True, timeout=timeout,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def probe_duration(source):
+    out = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', source],
+        check=True, capture_output=True, text=True, timeout=120
+    ).stdout.strip()
+    try:
+        return float(out)
+    except ValueError:
+        return 0.0
+
+
+def has_audio(source):
+    out = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'a', '-show_entries', 'stream=index', '-of', 'csv=p=0', source],
+        check=True, capture_output=True, text=True, timeout=120
+    ).stdout.strip()
+    return bool(out)
+
+
+def make_poster(source, dest, width=480):
+    """Satu frame JPEG (detik ke-1, atau frame pertama untuk video pendek)"""
+    offset = 1.0 if probe_duration(source) > 2 else 0.0
+    _run(['ffmpeg', '-y', '-ss', str(offset), '-i', source, '-frames:v', '1',
+          '-vf', f'scale={width}:-2', '-q:v', '4', dest])
+    return dest
+
+
+def make_sprite(source, dest, columns=5, rows=5, width=160):
+    """Sprite sheet columns x rows frame yang tersebar rata sepanjang video"""
+    frames = columns * rows
+    duration = probe_duration(source) or frames
+    interval = max(duration / frames, 0.1)
+    _run(['ffmpeg', '-y', '-i', source, '-frames:v', '1',
+          '-vf', f'fps=1/{interval:.3f},scale={width}:-2,tile={columns}x{rows}',
+          '-q:v', '5', dest])
+    return dest
+
+
+def make_hls(source, out_dir, ladder=HLS_LADDER, segment_seconds=6):
+    """HLS VOD multi-bitrate; mengembalikan path master playlist"""
+    audio = has_audio(source)
+    count = len(ladder)
+    for i in range(count):
+        os.makedirs(os.path.join(out_dir, str(i)), exist_ok=True)
+
+    split = ''.join(f'[v{i}]' for i in range(count))
+    scales = ';'.join(f'[v{i}]scale=-2:{height}[v{i}o]' for i, (height, _) in enumerate(ladder))
+    args = ['ffmpeg', '-y', '-i', source, '-filter_complex', f'[0:v]split={count}{split};{scales}']
+
+    for i, (_, kbps) in enumerate(ladder):
+        args += ['-map', f'[v{i}o]']
+        if audio:
+            args += ['-map', '0:a:0']
+        args += [f'-c:v:{i}', 'libx264', f'-b:v:{i}', f'{kbps}k', f'-maxrate:v:{i}', f'{int(kbps * 1.2)}k']
+    if audio:
+        args += ['-c:a', 'aac', '-b:a', '128k']
+
+    stream_map = ' '.join(f'v:{i},a:{i}' if audio else f'v:{i}' for i in range(count))
+    args += ['-preset', 'veryfast', '-g', str(segment_seconds * 25), '-sc_threshold', '0',
+             '-f', 'hls', '-hls_time', str(segment_seconds), '-hls_playlist_type', 'vod',
+             '-master_pl_name', 'master.m3u8', '-var_stream_map', stream_map,
+             '-hls_segment_filename', os.path.join(out_dir, '%v', 'seg_%03d.ts'),
+             os.path.join(out_dir, '%v', 'index.m3u8')]
+    _run(args)
+    return os.path.join(out_dir, 'master.m3u8')
+
+
+# Gambar (bukti pembayaran) ---------------------------------------------------
+# Pillow diimport di dalam fungsi supaya tidak ikut dimuat saat cold start
+
+
+def _open_image(source):
+    from PIL import Image, ImageOps
+
+    image = Image.open(source)
+    # Foto dari HP sering diputar lewat EXIF; terapkan dulu sebelum resize/hash
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', image.size, 'white')
+        if 'A' in image.getbands():
+            background.paste(image.convert('RGBA'), mask=image.convert('RGBA').getchannel('A'))
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+    return image
+
+
+def compress_image(source, dest, max_side=1600, quality=80):
+    """Downscale so the longest side is at most max_side and re-encode as progressive JPEG"""
+    image = _open_image(source)
+    image.thumbnail((max_side, max_side))
+    image.convert('RGB').save(dest, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return dest
+
+
+def make_thumbnail(source, dest, width=320, quality=70):
+    """Small JPEG for review lists"""
+    image = _open_image(source)
+    image.thumbnail((width, width * 4))
+    image.convert('RGB').save(dest, 'JPEG', quality=quality, optimize=True)
+    return dest
+
+
+def image_dhash(source, size=8):
+    """Perceptual difference hash (size*size bits, hex); survives resizing and recompression"""
+    from PIL import Image
+
+    image = _open_image(source).convert('L').resize((size + 1, size), Image.LANCZOS)
+    pixels = list(image.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f'{bits:0{size * size // 4}x}'
+
+
+def hash_distance(a, b):
+    """Hamming distance between two hex hashes of the same length"""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
@@ -0,0 +1,188 @@
+import bisect
+import functools
+import math
+import threading
+import time
+from collections import deque
+
+# Batas bucket histogram latency (detik), sama dengan default client Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list (q in 0..100)"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_label(value)}"' for key, value in labels.items()) + '}'
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def render(self, name, **labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {self.count}')
+        lines.append(f'{name}_sum{_labels(**labels)} {self.sum:.6f}')
+        lines.append(f'{name}_count{_labels(**labels)} {self.count}')
+        return lines
+
+
+class EndpointStats:
+    def __init__(self, sample_size):
+        self.requests = 0
+        self.errors = 0
+        self.latency = Histogram()
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.storage_seconds = 0.0
+        self.max_queries = 0
+        # Sampel terbaru untuk persentil di halaman profiling: (durasi, jumlah query)
+        self.samples = deque(maxlen=sample_size)
+
+
+class RequestMetrics:
+    """Per-process request, SQL, template and storage metrics"""
+
+    def __init__(self, sample_size=1000):
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._responses = {}
+        self._storage = {}
+        self._storage_errors = {}
+        self.started_at = time.time()
+
+    def record_request(self, endpoint, method, status, duration, queries=0, sql_seconds=0.0,
+                       template_seconds=0.0, storage_seconds=0.0):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats(self.sample_size)
+            stats.requests += 1
+            stats.errors += status >= 500
+            stats.latency.observe(duration)
+            stats.sql_queries += queries
+            stats.sql_seconds += sql_seconds
+            stats.template_seconds += template_seconds
+            stats.storage_seconds += storage_seconds
+            stats.max_queries = max(stats.max_queries, queries)
+            stats.samples.append((duration, queries))
+            key = (endpoint, method, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def record_storage_call(self, method, seconds, error=False):
+        with self._lock:
+            histogram = self._storage.get(method)
+            if histogram is None:
+                histogram = self._storage[method] = Histogram()
+            histogram.observe(seconds)
+            if error:
+                self._storage_errors[method] = self._storage_errors.get(method, 0) + 1
+
+    def snapshot(self):
+        """Rows for the profiling view, slowest p95 first"""
+        with self._lock:
+            items = [(endpoint, stats, sorted(d for d, _ in stats.samples), [q for _, q in stats.samples])
+                     for endpoint, stats in self._endpoints.items()]
+        rows = []
+        for endpoint, stats, durations, queries in items:
+            rows.append({
+                'endpoint': endpoint,
+                'requests': stats.requests,
+                'errors': stats.errors,
+                'p50_ms': percentile(durations, 50) * 1000,
+                'p95_ms': percentile(durations, 95) * 1000,
+                'p99_ms': percentile(durations, 99) * 1000,
+                'avg_queries': stats.sql_queries / stats.requests,
+                'max_queries': stats.max_queries,
+                'recent_max_queries': max(queries, default=0),
+                'avg_sql_ms': stats.sql_seconds / stats.requests * 1000,
+                'avg_template_ms': stats.template_seconds / stats.requests * 1000,
+                'avg_storage_ms': stats.storage_seconds / stats.requests * 1000
+            })
+        return sorted(rows, key=lambda row: row['p95_ms'], reverse=True)
+
+    def render_prometheus(self, extra_lines=()):
+        lines = []
+        with self._lock:
+            lines += ['# HELP streamflix_http_requests_total Requests handled, by endpoint, method and status.',
+                      '# TYPE streamflix_http_requests_total counter']
+            for (endpoint, method, status), count in sorted(self._responses.items()):
+                lines.append(f'streamflix_http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+            lines += ['# HELP streamflix_http_request_duration_seconds Request wall time.',
+                      '# TYPE streamflix_http_request_duration_seconds histogram']
+            for endpoint, stats in sorted(self._endpoints.items()):
+                lines += stats.latency.render('streamflix_http_request_duration_seconds', endpoint=endpoint)
+
+            for name, attribute, help_text in (
+                ('streamflix_db_queries_total', 'sql_queries', 'SQL statements executed while handling requests.'),
+                ('streamflix_db_query_seconds_total', 'sql_seconds', 'Time spent in SQL while handling requests.'),
+                ('streamflix_template_render_seconds_total', 'template_seconds', 'Time spent rendering templates.'),
+                ('streamflix_storage_request_seconds_total', 'storage_seconds', 'Time spent in storage calls during requests.'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for endpoint, stats in sorted(self._endpoints.items()):
+                    value = getattr(stats, attribute)
+                    lines.append(f'{name}{_labels(endpoint=endpoint)} {value:.6f}' if isinstance(value, float)
+                                 else f'{name}{_labels(endpoint=endpoint)} {value}')
+
+            lines += ['# HELP streamflix_storage_call_duration_seconds Storage backend (Cloudinary/local) call time.',
+                      '# TYPE streamflix_storage_call_duration_seconds histogram']
+            for method, histogram in sorted(self._storage.items()):
+                lines += histogram.render('streamflix_storage_call_duration_seconds', method=method)
+            lines += ['# HELP streamflix_storage_call_errors_total Storage calls that raised.',
+                      '# TYPE streamflix_storage_call_errors_total counter']
+            for method, count in sorted(self._storage_errors.items()):
+                lines.append(f'streamflix_storage_call_errors_total{_labels(method=method)} {count}')
+
+        lines += ['# HELP streamflix_process_start_time_seconds Start time of this process.',
+                  '# TYPE streamflix_process_start_time_seconds gauge',
+                  f'streamflix_process_start_time_seconds {self.started_at:.3f}']
+        lines += list(extra_lines)
+        return '\n'.join(lines) + '\n'
+
+
+def instrument_methods(obj, names, observe):
+    """Wrap obj's methods so each call reports (name, seconds, error) to observe; isinstance is unchanged"""
+    for name in names:
+        method = getattr(obj, name)
+
+        def wrapper(*args, _method=method, _name=name, **kwargs):
+            started = time.perf_counter()
+            error = False
+            try:
+                return _method(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                observe(_name, time.perf_counter() - started, error)
+
+        setattr(obj, name, functools.wraps(method)(wrapper))
+    return obj
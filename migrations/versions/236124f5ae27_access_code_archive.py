@@ -0,0 +1,39 @@
+"""access code archive for the expired-code sweeper
+
+Revision ID: 236124f5ae27
+Revises: 5afab41fcdb3
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '236124f5ae27'
+down_revision = '5afab41fcdb3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'access_code_archive' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'access_code_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('code', sa.String(length=10), nullable=True),
+        sa.Column('is_used', sa.Boolean(), nullable=True),
+        sa.Column('device_id', sa.String(length=200), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('used_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('notes', sa.String(length=200), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('access_code_archive')
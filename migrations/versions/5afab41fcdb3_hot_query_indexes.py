@@ -0,0 +1,48 @@
+"""indexes for the hot query paths
+
+Revision ID: 5afab41fcdb3
+Revises: 7a5b0b242228
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5afab41fcdb3'
+down_revision = '7a5b0b242228'
+branch_labels = None
+depends_on = None
+
+
+PENDING = sa.text("status = 'pending'")
+
+# (nama, tabel, kolom, opsi)
+INDEXES = [
+    # check_access_code: device_id + is_used + is_active, range dan ORDER BY di expires_at
+    ('ix_access_code_entitlement', 'access_code', ['device_id', 'is_used', 'is_active', 'expires_at'], {}),
+    # cleanup kode kedaluwarsa dan statistik dashboard
+    ('ix_access_code_expires_at', 'access_code', ['expires_at'], {}),
+    # tabel kode di dashboard (ORDER BY created_at DESC)
+    ('ix_access_code_created_at', 'access_code', ['created_at'], {}),
+    # daftar pembayaran pending di dashboard; partial karena hanya pending yang dibaca
+    ('ix_payment_proof_pending', 'payment_proof', ['created_at'],
+     {'sqlite_where': PENDING, 'postgresql_where': PENDING}),
+    # worker upload mengambil job queued tertua
+    ('ix_upload_job_status_id', 'upload_job', ['status', 'id'], {}),
+    # pruning pencabutan lama
+    ('ix_code_revocation_revoked_at', 'code_revocation', ['revoked_at'], {}),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns, options in INDEXES:
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, **options)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
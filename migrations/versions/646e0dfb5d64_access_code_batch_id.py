@@ -0,0 +1,31 @@
+"""access_code.batch_id for bulk-minted codes
+
+Revision ID: 646e0dfb5d64
+Revises: 236124f5ae27
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '646e0dfb5d64'
+down_revision = '236124f5ae27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'batch_id' not in {column['name'] for column in inspector.get_columns('access_code')}:
+        with op.batch_alter_table('access_code') as batch_op:
+            batch_op.add_column(sa.Column('batch_id', sa.String(length=32), nullable=True))
+    if 'ix_access_code_batch_id' not in {index['name'] for index in inspector.get_indexes('access_code')}:
+        op.create_index('ix_access_code_batch_id', 'access_code', ['batch_id'])
+
+
+def downgrade():
+    op.drop_index('ix_access_code_batch_id', table_name='access_code')
+    with op.batch_alter_table('access_code') as batch_op:
+        batch_op.drop_column('batch_id')
@@ -0,0 +1,113 @@
+"""upload jobs, code revocations, video assets and the FTS5 search index
+
+Revision ID: 7a5b0b242228
+Revises: 8b4d6a38a85c
+Create Date: 2026-10-17 09:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a5b0b242228'
+down_revision = '8b4d6a38a85c'
+branch_labels = None
+depends_on = None
+
+
+VIDEO_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS video_fts USING fts5(
+        title, description,
+        content='video', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS video_fts_ai AFTER INSERT ON video BEGIN
+        INSERT INTO video_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS video_fts_ad AFTER DELETE ON video BEGIN
+        INSERT INTO video_fts(video_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS video_fts_au AFTER UPDATE ON video BEGIN
+        INSERT INTO video_fts(video_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO video_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END"""
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing = set(inspector.get_table_names())
+
+    if 'code_revocation' not in existing:
+        op.create_table(
+            'code_revocation',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('code_id', sa.Integer(), nullable=False),
+            sa.Column('revoked_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'upload_job' not in existing:
+        op.create_table(
+            'upload_job',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('kind', sa.String(length=20), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('filename', sa.String(length=255), nullable=True),
+            sa.Column('spool_path', sa.String(length=1024), nullable=True),
+            sa.Column('total_bytes', sa.BigInteger(), nullable=True),
+            sa.Column('uploaded_bytes', sa.BigInteger(), nullable=True),
+            sa.Column('upload_id', sa.String(length=64), nullable=True),
+            sa.Column('payload', sa.Text(), nullable=True),
+            sa.Column('attempts', sa.Integer(), nullable=True),
+            sa.Column('error', sa.String(length=500), nullable=True),
+            sa.Column('result_url', sa.String(length=1024), nullable=True),
+            sa.Column('result_public_id', sa.String(length=1024), nullable=True),
+            sa.Column('target_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    video_columns = {column['name'] for column in inspector.get_columns('video')}
+    with op.batch_alter_table('video') as batch_op:
+        for name in ('poster_url', 'sprite_url', 'hls_url'):
+            if name not in video_columns:
+                batch_op.add_column(sa.Column(name, sa.String(length=1024), nullable=True))
+
+    video_indexes = {index['name'] for index in inspector.get_indexes('video')}
+    if 'ix_video_created_at_id' not in video_indexes:
+        op.create_index('ix_video_created_at_id', 'video', ['created_at', 'id'])
+    if 'ix_video_public_id' not in video_indexes:
+        op.create_index('ix_video_public_id', 'video', ['public_id'], unique=True)
+
+    # Index pencarian FTS5 hanya untuk SQLite; dialect lain memakai LIKE
+    if bind.dialect.name == 'sqlite':
+        try:
+            fts_exists = 'video_fts' in existing
+            for ddl in VIDEO_FTS_DDL:
+                op.execute(ddl)
+            if not fts_exists:
+                op.execute("INSERT INTO video_fts(video_fts) VALUES ('rebuild')")
+        except Exception as e:
+            print(f"FTS5 unavailable, using LIKE search: {e}")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('video_fts_au', 'video_fts_ad', 'video_fts_ai'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS video_fts')
+
+    op.drop_index('ix_video_public_id', table_name='video')
+    op.drop_index('ix_video_created_at_id', table_name='video')
+    with op.batch_alter_table('video') as batch_op:
+        batch_op.drop_column('hls_url')
+        batch_op.drop_column('sprite_url')
+        batch_op.drop_column('poster_url')
+
+    op.drop_table('upload_job')
+    op.drop_table('code_revocation')
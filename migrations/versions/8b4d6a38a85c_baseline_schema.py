@@ -0,0 +1,87 @@
+"""baseline schema (tabel yang dulu dibuat oleh db.create_all)
+
+Revision ID: 8b4d6a38a85c
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4d6a38a85c'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Deployment lama sudah punya tabel ini dari db.create_all(); lewati yang sudah ada
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'user' not in existing:
+        op.create_table(
+            'user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('email', sa.String(length=150), nullable=True),
+            sa.Column('password', sa.String(length=200), nullable=True),
+            sa.Column('role', sa.String(length=20), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email')
+        )
+
+    if 'video' not in existing:
+        op.create_table(
+            'video',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=255), nullable=True),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('url', sa.String(length=1024), nullable=True),
+            sa.Column('public_id', sa.String(length=1024), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'payment_proof' not in existing:
+        op.create_table(
+            'payment_proof',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_name', sa.String(length=100), nullable=True),
+            sa.Column('user_email', sa.String(length=120), nullable=True),
+            sa.Column('user_phone', sa.String(length=20), nullable=True),
+            sa.Column('payment_method', sa.String(length=50), nullable=True),
+            sa.Column('payment_amount', sa.Integer(), nullable=True),
+            sa.Column('proof_image', sa.String(length=500), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('access_code', sa.String(length=10), nullable=True),
+            sa.Column('device_id', sa.String(length=200), nullable=True),
+            sa.Column('expires_at', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('approved_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'access_code' not in existing:
+        op.create_table(
+            'access_code',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('code', sa.String(length=10), nullable=True),
+            sa.Column('is_used', sa.Boolean(), nullable=True),
+            sa.Column('device_id', sa.String(length=200), nullable=True),
+            sa.Column('expires_at', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('used_at', sa.DateTime(), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.Column('notes', sa.String(length=200), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('code')
+        )
+
+
+def downgrade():
+    op.drop_table('access_code')
+    op.drop_table('payment_proof')
+    op.drop_table('video')
+    op.drop_table('user')
@@ -0,0 +1,37 @@
+"""hourly playback rollup for viewing analytics
+
+Revision ID: 9d2f4b6c8e13
+Revises: e5a9c3b71f04
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2f4b6c8e13'
+down_revision = 'e5a9c3b71f04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'video_playback_hourly' in set(sa.inspect(op.get_bind()).get_table_names()):
+        return
+    op.create_table(
+        'video_playback_hourly',
+        sa.Column('video_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('hour', sa.DateTime(), nullable=False),
+        sa.Column('plays', sa.Integer(), nullable=False),
+        sa.Column('completes', sa.Integer(), nullable=False),
+        sa.Column('previews', sa.Integer(), nullable=False),
+        sa.Column('watch_seconds', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('video_id', 'hour')
+    )
+    op.create_index('ix_video_playback_hourly_hour', 'video_playback_hourly', ['hour', 'video_id'])
+
+
+def downgrade():
+    op.drop_index('ix_video_playback_hourly_hour', table_name='video_playback_hourly')
+    op.drop_table('video_playback_hourly')
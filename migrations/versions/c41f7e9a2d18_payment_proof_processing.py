@@ -0,0 +1,42 @@
+"""payment proof thumbnails, perceptual hash and duplicate link
+
+Revision ID: c41f7e9a2d18
+Revises: 646e0dfb5d64
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f7e9a2d18'
+down_revision = '646e0dfb5d64'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = [
+    sa.Column('thumbnail_url', sa.String(length=500), nullable=True),
+    sa.Column('image_hash', sa.String(length=16), nullable=True),
+    sa.Column('duplicate_of_id', sa.Integer(), nullable=True),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {column['name'] for column in inspector.get_columns('payment_proof')}
+    missing = [column for column in COLUMNS if column.name not in existing]
+    if missing:
+        with op.batch_alter_table('payment_proof') as batch_op:
+            for column in missing:
+                batch_op.add_column(column)
+    if 'ix_payment_proof_image_hash' not in {index['name'] for index in inspector.get_indexes('payment_proof')}:
+        op.create_index('ix_payment_proof_image_hash', 'payment_proof', ['image_hash'])
+
+
+def downgrade():
+    op.drop_index('ix_payment_proof_image_hash', table_name='payment_proof')
+    with op.batch_alter_table('payment_proof') as batch_op:
+        for column in reversed(COLUMNS):
+            batch_op.drop_column(column.name)
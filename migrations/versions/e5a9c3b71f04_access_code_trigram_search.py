@@ -0,0 +1,79 @@
+"""trigram search index for the admin access code table
+
+Revision ID: e5a9c3b71f04
+Revises: c41f7e9a2d18
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3b71f04'
+down_revision = 'c41f7e9a2d18'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_COLUMNS = ('code', 'device_id', 'notes')
+
+ACCESS_CODE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS access_code_fts USING fts5(
+        code, device_id, notes,
+        content='access_code', content_rowid='id',
+        tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS access_code_fts_ai AFTER INSERT ON access_code BEGIN
+        INSERT INTO access_code_fts(rowid, code, device_id, notes) VALUES (new.id, new.code, new.device_id, new.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS access_code_fts_ad AFTER DELETE ON access_code BEGIN
+        INSERT INTO access_code_fts(access_code_fts, rowid, code, device_id, notes)
+        VALUES ('delete', old.id, old.code, old.device_id, old.notes);
+    END""",
+    # Hanya kolom yang diindeks; aksi massal seperti extend/activate tidak menyentuh index
+    """CREATE TRIGGER IF NOT EXISTS access_code_fts_au AFTER UPDATE OF code, device_id, notes ON access_code BEGIN
+        INSERT INTO access_code_fts(access_code_fts, rowid, code, device_id, notes)
+        VALUES ('delete', old.id, old.code, old.device_id, old.notes);
+        INSERT INTO access_code_fts(rowid, code, device_id, notes) VALUES (new.id, new.code, new.device_id, new.notes);
+    END"""
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # SQLite: FTS5 dengan tokenizer trigram (SQLite >= 3.34); tanpa itu dashboard memakai LIKE
+    if bind.dialect.name == 'sqlite':
+        try:
+            fts_exists = 'access_code_fts' in set(sa.inspect(bind).get_table_names())
+            for ddl in ACCESS_CODE_FTS_DDL:
+                op.execute(ddl)
+            if not fts_exists:
+                op.execute("INSERT INTO access_code_fts(access_code_fts) VALUES ('rebuild')")
+        except Exception as e:
+            print(f"FTS5 trigram tokenizer unavailable, access code search uses LIKE: {e}")
+
+    # Postgres: index GIN pg_trgm dipakai langsung oleh ILIKE '%q%'
+    elif bind.dialect.name == 'postgresql':
+        available = bind.execute(sa.text(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )).first()
+        if available is None:
+            print('pg_trgm unavailable, access code search scans the table')
+            return
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in SEARCH_COLUMNS:
+            op.execute(f'CREATE INDEX IF NOT EXISTS ix_access_code_{column}_trgm '
+                       f'ON access_code USING gin ({column} gin_trgm_ops)')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('access_code_fts_au', 'access_code_fts_ad', 'access_code_fts_ai'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS access_code_fts')
+    elif bind.dialect.name == 'postgresql':
+        for column in SEARCH_COLUMNS:
+            op.execute(f'DROP INDEX IF EXISTS ix_access_code_{column}_trgm')
@@ -0,0 +1,199 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+
+
+class Limit(NamedTuple):
+    """Token bucket: `capacity` token (burst), terisi penuh kembali dalam `period` detik"""
+    capacity: float
+    period: float
+
+    @property
+    def rate(self):
+        return self.capacity / self.period
+
+
+def parse_limit(value):
+    """'10/60' -> Limit(10, 60): burst 10, refill 10 token per 60 detik"""
+    capacity, _, period = str(value).partition('/')
+    return Limit(float(capacity), float(period or 1))
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    retry_after: float = 0.0
+    key: str = ''
+
+
+def _refill(tokens, updated, now, limit):
+    if tokens is None:
+        return limit.capacity
+    return min(limit.capacity, tokens + max(0.0, now - updated) * limit.rate)
+
+
+def _retry_after(tokens, required, limit):
+    return max(0.0, (required - tokens) / limit.rate)
+
+
+class MemoryBackend:
+    """Bucket per proses; cukup untuk satu worker atau sebagai lapisan pertama"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, limit, cost=1, required=None, now=None):
+        """Refill, then deduct `cost` if at least `required` (default cost) tokens are left"""
+        now = time.monotonic() if now is None else now
+        required = cost if required is None else required
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (None, now, limit))
+            tokens = _refill(tokens, updated, now, limit)
+            allowed = tokens >= required
+            if allowed:
+                tokens -= cost
+            if key not in self._buckets and len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = (tokens, now, limit)
+        return Decision(allowed, 0.0 if allowed else _retry_after(tokens, required, limit), key)
+
+    def _prune(self, now):
+        # Bucket yang sudah terisi penuh sama dengan bucket yang tidak ada
+        full = [key for key, (tokens, updated, limit) in self._buckets.items()
+                if _refill(tokens, updated, now, limit) >= limit.capacity]
+        for key in full:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+
+class SQLiteBackend:
+    """Bucket bersama antar proses di satu host (pengganti lokal untuk Redis)
+
+    Setiap take() adalah satu transaksi BEGIN IMMEDIATE, jadi worker yang
+    berbeda tidak bisa memakai token yang sama.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS rate_bucket ('
+                         'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, expires REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, limit, cost=1, required=None, now=None):
+        # Waktu dinding, bukan monotonic: dibagi antar proses
+        now = time.time() if now is None else now
+        required = cost if required is None else required
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM rate_bucket WHERE key = ?', (key,)).fetchone()
+            tokens = _refill(row[0], row[1], now, limit) if row else limit.capacity
+            allowed = tokens >= required
+            if allowed:
+                tokens -= cost
+            conn.execute('INSERT INTO rate_bucket (key, tokens, updated, expires) VALUES (?, ?, ?, ?) '
+                         'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated, '
+                         'expires = excluded.expires',
+                         (key, tokens, now, now + limit.period))
+            # Sesekali buang bucket yang sudah penuh kembali
+            if allowed and int(now * 1000) % 100 == 0:
+                conn.execute('DELETE FROM rate_bucket WHERE expires < ?', (now,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return Decision(allowed, 0.0 if allowed else _retry_after(tokens, required, limit), key)
+
+
+# Token bucket atomik di Redis; waktu diambil dari server Redis supaya semua instance sepakat
+_REDIS_TAKE = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local required = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1])
+if tokens == nil then
+  tokens = capacity
+else
+  tokens = math.min(capacity, tokens + math.max(0, now - tonumber(state[2])) * rate)
+end
+local allowed = 0
+if tokens >= required then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """Bucket bersama untuk semua instance (serverless); butuh paket redis"""
+
+    def __init__(self, url, prefix='streamflix:rl:'):
+        import redis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TAKE)
+
+    def take(self, key, limit, cost=1, required=None, now=None):
+        required = cost if required is None else required
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[limit.capacity, limit.rate, cost, required])
+        tokens = float(tokens)
+        return Decision(bool(allowed), 0.0 if allowed else _retry_after(tokens, required, limit), key)
+
+
+class RateLimiter:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def hit(self, rules, cost=1):
+        """Take `cost` from every (key, Limit) rule, or from none of them
+
+        Buckets are taken in order; when one is empty the tokens already taken
+        from the earlier buckets are refunded and its Decision is returned.
+        """
+        taken = []
+        for key, limit in rules:
+            decision = self.backend.take(key, limit, cost=cost)
+            if not decision.allowed:
+                # Kembalikan token bucket sebelumnya: permintaan yang ditolak tidak dihitung
+                for taken_key, taken_limit in taken:
+                    self.backend.take(taken_key, taken_limit, cost=-cost, required=0)
+                return decision
+            taken.append((key, limit))
+        return Decision(True)
+
+    def check(self, key, limit):
+        """Whether the bucket still has a token, without taking one"""
+        return self.backend.take(key, limit, cost=0, required=1)
+
+    def penalize(self, key, limit, cost=1):
+        """Take tokens unconditionally (e.g. after a failed attempt); the bucket may go empty"""
+        return self.backend.take(key, limit, cost=cost, required=0)
+
+
+def retry_after_seconds(decision):
+    return max(1, math.ceil(decision.retry_after))
@@ -0,0 +1,273 @@
+import hashlib
+import hmac
+import os
+import re
+import shutil
+import time
+import uuid
+
+
+def sign_params(params, secret):
+    """Tanda tangan gaya Cloudinary: sha1 dari parameter terurut ditambah secret"""
+    to_sign = '&'.join(sorted(f'{k}={v}' for k, v in params.items() if v))
+    return hashlib.sha1((to_sign + secret).encode()).hexdigest()
+
+
+class StorageBackend:
+    """Tempat penyimpanan file media (video, bukti pembayaran)
+
+    Upload dikirim per chunk supaya bisa dilanjutkan: pemanggil menyimpan
+    upload_id dan offset terakhir, lalu memanggil upload_chunk lagi dari
+    offset tersebut setelah gagal. Chunk terakhir mengembalikan dict hasil
+    dengan 'secure_url' dan 'public_id'; chunk lain mengembalikan None.
+    """
+
+    def new_upload_id(self):
+        return uuid.uuid4().hex
+
+    def upload_chunk(self, upload_id, chunk, offset, total_size, filename,
+                     resource_type='auto', folder=None):
+        raise NotImplementedError
+
+    def destroy(self, public_id, resource_type='image'):
+        raise NotImplementedError
+
+    # Upload langsung dari browser ke storage ---------------------------------
+
+    def direct_upload_params(self, resource_type, folder):
+        """Return {'upload_url', 'fields'} for a short-lived signed browser upload"""
+        raise NotImplementedError
+
+    def verify_upload_result(self, result):
+        """Check the storage's signature over public_id and version"""
+        raise NotImplementedError
+
+    def upload_result_url(self, result, resource_type):
+        """Build the delivery URL from a verified upload result"""
+        raise NotImplementedError
+
+    # Aset turunan video (poster, sprite, HLS) ---------------------------------
+
+    def derived_video_urls(self, public_id):
+        """URLs the storage can derive by itself (e.g. {'poster_url', 'hls_url'})"""
+        return {}
+
+    def local_path(self, public_id):
+        """Local file path of an asset, or None if it only exists remotely"""
+        return None
+
+    def store_file(self, path, resource_type, folder):
+        """Store a generated file and return its URL"""
+        raise NotImplementedError
+
+    def store_directory(self, path, folder):
+        """Store a generated directory (HLS) and return its base URL, or None if unsupported"""
+        return None
+
+
+class CloudinaryStorage(StorageBackend):
+    """Chunked upload ke Cloudinary (protokol yang sama dengan upload_large)
+
+    SDK Cloudinary baru diimport dan dikonfigurasi saat pertama dipakai,
+    bukan saat aplikasi diimport.
+    """
+
+    def __init__(self, cloud_name=None, api_key=None, api_secret=None):
+        self._credentials = {'cloud_name': cloud_name, 'api_key': api_key, 'api_secret': api_secret}
+        self._configured = False
+
+    def _configure(self):
+        import cloudinary
+
+        if not self._configured:
+            cloudinary.config(**self._credentials, secure=True)
+            self._configured = True
+
+    def upload_chunk(self, upload_id, chunk, offset, total_size, filename,
+                     resource_type='auto', folder=None):
+        import cloudinary.uploader
+
+        self._configure()
+        end = offset + len(chunk) - 1
+        result = cloudinary.uploader.upload_large_part(
+            (filename, chunk),
+            http_headers={
+                'Content-Range': f'bytes {offset}-{end}/{total_size}',
+                'X-Unique-Upload-Id': upload_id
+            },
+            resource_type=resource_type,
+            folder=folder
+        )
+        if end + 1 >= total_size:
+            return result
+        return None
+
+    def destroy(self, public_id, resource_type='image'):
+        import cloudinary.uploader
+
+        self._configure()
+        return cloudinary.uploader.destroy(public_id, resource_type=resource_type)
+
+    def direct_upload_params(self, resource_type, folder):
+        import cloudinary
+        import cloudinary.utils
+
+        self._configure()
+        config = cloudinary.config()
+        fields = {'timestamp': int(time.time()), 'folder': folder}
+        fields['signature'] = cloudinary.utils.api_sign_request(fields, config.api_secret)
+        fields['api_key'] = config.api_key
+        return {
+            'upload_url': f'https://api.cloudinary.com/v1_1/{config.cloud_name}/{resource_type}/upload',
+            'fields': fields
+        }
+
+    def verify_upload_result(self, result):
+        import cloudinary.utils
+
+        self._configure()
+        return cloudinary.utils.verify_api_response_signature(
+            result.get('public_id'), result.get('version'), result.get('signature')
+        )
+
+    def upload_result_url(self, result, resource_type):
+        import cloudinary.utils
+
+        self._configure()
+        url, _ = cloudinary.utils.cloudinary_url(
+            result['public_id'],
+            resource_type=resource_type,
+            version=result['version'],
+            format=result.get('format'),
+            secure=True
+        )
+        return url
+
+    def derived_video_urls(self, public_id):
+        import cloudinary.uploader
+        import cloudinary.utils
+
+        self._configure()
+        # Minta rendition HLS dibuat sekarang agar penonton pertama tidak menunggu transcoding
+        cloudinary.uploader.explicit(
+            public_id, type='upload', resource_type='video',
+            eager=[{'streaming_profile': 'hd', 'format': 'm3u8'}],
+            eager_async=True
+        )
+        poster_url, _ = cloudinary.utils.cloudinary_url(
+            public_id, resource_type='video', format='jpg', secure=True,
+            transformation=[{'start_offset': 'auto', 'width': 480, 'crop': 'scale', 'quality': 'auto'}]
+        )
+        hls_url, _ = cloudinary.utils.cloudinary_url(
+            public_id, resource_type='video', format='m3u8', secure=True,
+            streaming_profile='hd'
+        )
+        return {'poster_url': poster_url, 'hls_url': hls_url}
+
+    def store_file(self, path, resource_type, folder):
+        import cloudinary.uploader
+
+        self._configure()
+        return cloudinary.uploader.upload(path, resource_type=resource_type, folder=folder).get('secure_url')
+
+
+class LocalStorage(StorageBackend):
+    """Pengganti Cloudinary berbasis filesystem untuk development dan testing"""
+
+    def __init__(self, root, base_url, secret='', upload_url=None, signature_ttl=3600):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+        self.secret = secret
+        # Endpoint upload palsu untuk upload langsung dari browser (lihat local_media_upload)
+        self.upload_url = upload_url
+        self.signature_ttl = signature_ttl
+
+    def _partial_path(self, upload_id):
+        return os.path.join(self.root, '.partial', upload_id)
+
+    def upload_chunk(self, upload_id, chunk, offset, total_size, filename,
+                     resource_type='auto', folder=None):
+        partial = self._partial_path(upload_id)
+        os.makedirs(os.path.dirname(partial), exist_ok=True)
+
+        # Tulis di offset yang diminta, sehingga chunk yang diulang tidak menggandakan data
+        mode = 'r+b' if os.path.exists(partial) else 'wb'
+        with open(partial, mode) as f:
+            f.seek(offset)
+            f.write(chunk)
+            f.truncate()
+
+        if offset + len(chunk) < total_size:
+            return None
+
+        ext = os.path.splitext(filename)[1].lower()
+        public_id = '/'.join(p for p in [folder, upload_id] if p)
+        final_path = os.path.join(self.root, public_id + ext)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(partial, final_path)
+
+        version = int(time.time())
+        return {
+            'public_id': public_id,
+            'version': version,
+            'format': ext.lstrip('.'),
+            'signature': sign_params({'public_id': public_id, 'version': version}, self.secret),
+            'secure_url': f'{self.base_url}/{public_id}{ext}',
+            'bytes': total_size,
+            'resource_type': resource_type
+        }
+
+    def destroy(self, public_id, resource_type='image'):
+        path = self.local_path(public_id)
+        if path is None:
+            return {'result': 'not found'}
+        os.remove(path)
+        return {'result': 'ok'}
+
+    def direct_upload_params(self, resource_type, folder):
+        fields = {'timestamp': int(time.time()), 'folder': folder}
+        fields['signature'] = sign_params(fields, self.secret)
+        return {
+            'upload_url': f'{self.upload_url.rstrip("/")}/{resource_type}',
+            'fields': fields
+        }
+
+    def check_upload_signature(self, fields):
+        """Validate signed upload fields the way Cloudinary would (signature and age)"""
+        signed = {k: fields.get(k) for k in ('timestamp', 'folder')}
+        try:
+            age = time.time() - int(signed['timestamp'])
+        except (TypeError, ValueError):
+            return False
+        expected = sign_params(signed, self.secret)
+        return 0 <= age <= self.signature_ttl and hmac.compare_digest(expected, fields.get('signature') or '')
+
+    def verify_upload_result(self, result):
+        expected = sign_params({'public_id': result.get('public_id'), 'version': result.get('version')}, self.secret)
+        return hmac.compare_digest(expected, str(result.get('signature') or ''))
+
+    def upload_result_url(self, result, resource_type):
+        fmt = result.get('format') or ''
+        if not re.fullmatch(r'[A-Za-z0-9]{0,10}', fmt):
+            raise ValueError('invalid format')
+        return f"{self.base_url}/{result['public_id']}" + (f'.{fmt}' if fmt else '')
+
+    def local_path(self, public_id):
+        directory = os.path.join(self.root, os.path.dirname(public_id))
+        prefix = os.path.basename(public_id)
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if os.path.splitext(name)[0] == prefix:
+                    return os.path.join(directory, name)
+        return None
+
+    def store_file(self, path, resource_type, folder):
+        name = uuid.uuid4().hex + os.path.splitext(path)[1].lower()
+        os.makedirs(os.path.join(self.root, folder), exist_ok=True)
+        shutil.copyfile(path, os.path.join(self.root, folder, name))
+        return f'{self.base_url}/{folder}/{name}'
+
+    def store_directory(self, path, folder):
+        name = uuid.uuid4().hex
+        shutil.copytree(path, os.path.join(self.root, folder, name))
+        return f'{self.base_url}/{folder}/{name}'
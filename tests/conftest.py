@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP = tempfile.mkdtemp(prefix='streamflix-test-')
+
+# Konfigurasi dibaca saat import; set sebelum modul app dimuat.
+# LocalStorage menggantikan Cloudinary, antrean upload diproses manual oleh test
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(TMP, 'test.db')}",
+    'STORAGE_BACKEND': 'local',
+    'LOCAL_STORAGE_DIR': os.path.join(TMP, 'media'),
+    'UPLOAD_SPOOL_DIR': os.path.join(TMP, 'spool'),
+    'UPLOAD_WORKERS': '0',
+    'CODE_SWEEP_INTERVAL': '0',
+    'PLAYBACK_FLUSH_INTERVAL': '0',
+    'DB_AUTO_MIGRATE': '0',
+    'ADMIN_EMAIL': 'admin@test.local',
+    'ADMIN_PASSWORD': 'test-password'
+})
+for name in ('CLOUDINARY_CLOUD_NAME', 'CLOUDINARY_API_KEY', 'CLOUDINARY_API_SECRET', 'DATABASE_REPLICA_URL'):
+    os.environ.pop(name, None)
+sys.path.insert(0, ROOT)
+
+import app as streamflix  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def flask_app():
+    streamflix.app.config['TESTING'] = True
+    with streamflix.app.app_context():
+        streamflix.init_database()
+    return streamflix.app
+
+
+@pytest.fixture
+def app_context(flask_app):
+    with flask_app.app_context():
+        yield
+        streamflix.db.session.remove()
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def admin_client(flask_app):
+    client = flask_app.test_client()
+    response = client.post('/admin', data={'email': 'admin@test.local', 'password': 'test-password'})
+    assert response.status_code == 302
+    return client
@@ -0,0 +1,135 @@
+import json
+
+import pytest
+
+from changefeed import ChangeFeed
+from conftest import streamflix
+
+AccessCode = streamflix.AccessCode
+
+
+@pytest.fixture
+def code_id(flask_app):
+    with flask_app.app_context():
+        _, (code,) = streamflix.mint_access_codes(1)
+        return AccessCode.query.filter_by(code=code).one().id
+
+
+@pytest.fixture
+def short_stream(flask_app, monkeypatch):
+    monkeypatch.setitem(flask_app.config, 'ADMIN_EVENTS_STREAM_SECONDS', 1)
+    monkeypatch.setitem(flask_app.config, 'ADMIN_EVENTS_KEEPALIVE', 1)
+
+
+def poll(admin_client, **params):
+    response = admin_client.get('/admin/events.json', query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def first_change(response):
+    """Payload of the first `change` message on an SSE stream, with its id"""
+    try:
+        for chunk in response.response:
+            message = chunk.decode() if isinstance(chunk, bytes) else chunk
+            fields = dict(line.split(': ', 1) for line in message.strip().splitlines() if ': ' in line)
+            if fields.get('event') == 'change':
+                return fields.get('id'), json.loads(fields['data'])
+    finally:
+        response.close()
+    return None, None
+
+
+def test_poll_without_watermark_starts_with_a_reset(admin_client):
+    payload = poll(admin_client)
+    assert payload['reset'] is True
+    assert payload['epoch'] == streamflix.change_feed.epoch
+    assert payload['last_id'] == streamflix.change_feed.last_id
+    assert payload['stats']['total_codes'] >= 0
+
+
+def test_poll_returns_changes_after_the_watermark_once(admin_client, code_id):
+    start = poll(admin_client)
+    admin_client.post(f'/admin/deactivate-code/{code_id}')
+
+    payload = poll(admin_client, epoch=start['epoch'], since=start['last_id'])
+    assert payload['reset'] is False
+    assert [(event['kind'], event['id'], event['action']) for event in payload['events']] == \
+        [('code', code_id, 'deactivate')]
+    assert payload['last_id'] > start['last_id']
+
+    # Watermark baru: tidak ada yang dikirim ulang
+    again = poll(admin_client, epoch=payload['epoch'], since=payload['last_id'])
+    assert again['events'] == [] and again['last_id'] == payload['last_id']
+
+
+def test_repeated_changes_to_one_object_are_sent_once_with_the_latest_state(admin_client, code_id):
+    start = poll(admin_client)
+    admin_client.post(f'/admin/deactivate-code/{code_id}')
+    admin_client.post(f'/admin/activate-code/{code_id}')
+
+    events = poll(admin_client, epoch=start['epoch'], since=start['last_id'])['events']
+    assert len(events) == 1
+    assert events[0]['action'] == 'activate' and events[0]['status'] == 'exists'
+    # HTML baris dirender dari keadaan database sekarang (aktif lagi), bukan dari event pertama
+    assert f'data-code-id="{code_id}"' in events[0]['html']
+    assert 'table-warning' not in events[0]['html']
+
+
+def test_deleted_object_is_reported_as_deleted(admin_client, code_id):
+    start = poll(admin_client)
+    admin_client.post(f'/admin/delete-code/{code_id}')
+
+    (event,) = poll(admin_client, epoch=start['epoch'], since=start['last_id'])['events']
+    assert event['status'] == 'deleted' and 'html' not in event
+
+
+@pytest.mark.parametrize('params', [
+    {'epoch': 'otherproc', 'since': '0'},
+    {'since': '0'},
+    {'epoch': 'current', 'since': 'abc'},
+])
+def test_unusable_watermark_resets(admin_client, params):
+    if params.get('epoch') == 'current':
+        params = {**params, 'epoch': streamflix.change_feed.epoch}
+    payload = poll(admin_client, **params)
+    assert payload['reset'] is True and payload['events'] == []
+
+
+def test_watermark_older_than_the_buffer_resets(admin_client, monkeypatch):
+    feed = ChangeFeed(maxlen=2)
+    monkeypatch.setattr(streamflix, 'change_feed', feed)
+    start = poll(admin_client)
+    for _ in range(3):
+        streamflix.publish_change('codes', action='minted', count=1)
+
+    payload = poll(admin_client, epoch=feed.epoch, since=start['last_id'])
+    assert payload['reset'] is True
+    assert payload['last_id'] == feed.last_id == 3
+
+
+def test_sse_reconnect_resumes_from_last_event_id(admin_client, code_id, short_stream):
+    start = poll(admin_client)
+    admin_client.post(f'/admin/deactivate-code/{code_id}')
+
+    response = admin_client.get('/admin/events', buffered=False,
+                                headers={'Last-Event-ID': f"{start['epoch']}:{start['last_id']}"})
+    assert response.mimetype == 'text/event-stream'
+    event_id, payload = first_change(response)
+
+    assert payload['reset'] is False
+    assert [event['id'] for event in payload['events']] == [code_id]
+    assert event_id == f"{streamflix.change_feed.epoch}:{payload['last_id']}"
+
+
+def test_sse_reconnect_from_another_epoch_resets(admin_client, short_stream):
+    response = admin_client.get('/admin/events', buffered=False, headers={'Last-Event-ID': 'otherproc:5'})
+    event_id, payload = first_change(response)
+
+    assert payload['reset'] is True
+    assert event_id == f"{streamflix.change_feed.epoch}:{streamflix.change_feed.last_id}"
+
+
+def test_events_require_an_admin(client):
+    assert client.get('/admin/events.json').status_code in (302, 401)
+    assert client.get('/admin/events').status_code in (302, 401)
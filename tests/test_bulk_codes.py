@@ -0,0 +1,115 @@
+import uuid
+from datetime import timedelta, timezone
+
+import pytest
+
+from conftest import streamflix
+
+db = streamflix.db
+AccessCode = streamflix.AccessCode
+CodeRevocation = streamflix.CodeRevocation
+
+
+@pytest.fixture
+def mint(flask_app):
+    """Mint codes tagged with a unique note; the first `used` ones are marked redeemed"""
+    def mint(count, used=0, days_valid=30):
+        note = 'bulk-' + uuid.uuid4().hex[:8]
+        with flask_app.app_context():
+            _, codes = streamflix.mint_access_codes(count, days_valid=days_valid, notes=note)
+            for code in codes[:used]:
+                AccessCode.query.filter_by(code=code).update({
+                    'is_used': True, 'device_id': 'device-' + code, 'used_at': streamflix.utc_now()
+                })
+            db.session.commit()
+            ids = [row.id for row in AccessCode.query.filter(AccessCode.code.in_(codes)).order_by(AccessCode.id)]
+        return note, ids
+    return mint
+
+
+def codes_by_id(flask_app, ids):
+    with flask_app.app_context():
+        rows = AccessCode.query.filter(AccessCode.id.in_(ids)).all()
+        db.session.expunge_all()
+    return {row.id: row for row in rows}
+
+
+def revoked_ids(flask_app, ids):
+    with flask_app.app_context():
+        return {row.code_id for row in CodeRevocation.query.filter(CodeRevocation.code_id.in_(ids))}
+
+
+def bulk(admin_client, action, **form):
+    response = admin_client.post('/admin/bulk-action', data={'bulk_action': action, **form},
+                                 headers={'Accept': 'application/json'})
+    assert response.status_code == 200
+    return response.get_json()['affected']
+
+
+@pytest.mark.parametrize('action, expected', [
+    ('activate', {'is_active': True}),
+    ('deactivate', {'is_active': False}),
+    ('reset', {'is_used': False, 'device_id': None, 'used_at': None}),
+])
+def test_bulk_action_updates_only_selected_codes(flask_app, admin_client, mint, action, expected):
+    _, ids = mint(3, used=3)
+    assert bulk(admin_client, action, code_ids=ids[:2]) == 2
+
+    rows = codes_by_id(flask_app, ids)
+    for code_id in ids[:2]:
+        assert {name: getattr(rows[code_id], name) for name in expected} == expected
+    assert rows[ids[2]].is_used and rows[ids[2]].device_id and rows[ids[2]].is_active
+
+
+def test_bulk_extend_matches_single_extend(flask_app, admin_client, mint):
+    _, ids = mint(2)
+    before = codes_by_id(flask_app, ids)
+
+    assert bulk(admin_client, 'extend', code_ids=[ids[0]], days=10) == 1
+    assert admin_client.post(f'/admin/extend-code/{ids[1]}', data={'days': 10}).status_code == 302
+
+    after = codes_by_id(flask_app, ids)
+    for code_id in ids:
+        assert after[code_id].expires_at - before[code_id].expires_at == timedelta(days=10)
+
+
+def test_bulk_extend_of_expired_code_starts_from_now(flask_app, admin_client, mint):
+    _, ids = mint(1)
+    bulk(admin_client, 'expire', code_ids=ids)
+    started = streamflix.utc_now()
+
+    bulk(admin_client, 'extend', code_ids=ids, days=10)
+    expires_at = codes_by_id(flask_app, ids)[ids[0]].expires_at.replace(tzinfo=timezone.utc)
+    assert started + timedelta(days=10) <= expires_at <= streamflix.utc_now() + timedelta(days=10)
+
+
+def test_bulk_expire_and_delete(flask_app, admin_client, mint):
+    _, ids = mint(2)
+    bulk(admin_client, 'expire', code_ids=[ids[0]])
+    assert codes_by_id(flask_app, ids)[ids[0]].expires_at.replace(tzinfo=timezone.utc) <= streamflix.utc_now()
+
+    assert bulk(admin_client, 'delete', code_ids=ids) == 2
+    assert codes_by_id(flask_app, ids) == {}
+
+
+def test_filter_scope_applies_to_every_matching_code(flask_app, admin_client, mint):
+    note, ids = mint(3)
+    _, others = mint(2)
+
+    assert bulk(admin_client, 'deactivate', scope='filter', status='active', search=note) == 3
+    rows = codes_by_id(flask_app, ids + others)
+    assert [rows[code_id].is_active for code_id in ids] == [False] * 3
+    assert [rows[code_id].is_active for code_id in others] == [True] * 2
+
+    # Filter status ikut dihitung: kode yang sudah nonaktif tidak cocok lagi
+    assert bulk(admin_client, 'activate', scope='filter', status='active', search=note) == 0
+
+
+@pytest.mark.parametrize('action', streamflix.BULK_CODE_ACTIONS)
+def test_only_revoking_actions_revoke_redeemed_codes(flask_app, admin_client, mint, action):
+    note, ids = mint(3, used=2)
+    bulk(admin_client, action, scope='filter', search=note)
+
+    # Kode yang belum ditebus tidak punya klaim, jadi tidak perlu dicabut
+    expected = set(ids[:2]) if action in streamflix.REVOKING_CODE_ACTIONS else set()
+    assert revoked_ids(flask_app, ids) == expected
@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import streamflix
+
+db = streamflix.db
+AccessCode = streamflix.AccessCode
+
+
+@pytest.fixture(params=['fts', 'ilike'])
+def search_index(request, app_context, monkeypatch):
+    if request.param == 'ilike':
+        # Database tanpa index trigram (mis. SQLite tanpa FTS5): jalur ILIKE
+        monkeypatch.setitem(streamflix._search_state, 'code_fts', False)
+    return request.param
+
+
+def matching_codes(term):
+    query = streamflix.filter_access_codes(AccessCode.query, search_query=term)
+    return {row.code for row in query}
+
+
+def test_full_code_also_matches_notes_and_devices_that_mention_it(search_index):
+    _, (code,) = streamflix.mint_access_codes(1)
+    _, (replacement,) = streamflix.mint_access_codes(1, notes=f'replacement for {code}')
+    _, (other,) = streamflix.mint_access_codes(1)
+    AccessCode.query.filter_by(code=other).update({'device_id': f'device-{code.lower()}'})
+    db.session.commit()
+
+    assert matching_codes(code) == {code, replacement, other}
+    assert matching_codes(code.lower()) == {code, replacement, other}
+
+
+def test_full_code_fast_path_finds_the_code(search_index):
+    _, (code,) = streamflix.mint_access_codes(1)
+    assert matching_codes(f'  {code}  ') == {code}
+
+
+def test_unknown_full_code_still_searches_notes(search_index):
+    lost = streamflix.unique_access_codes(1)[0]
+    _, (noted,) = streamflix.mint_access_codes(1, notes=f'lost code {lost} reissued')
+    assert matching_codes(lost) == {noted}
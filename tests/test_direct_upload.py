@@ -0,0 +1,101 @@
+import io
+import os
+import time
+
+from conftest import streamflix
+from storage import sign_params
+
+db = streamflix.db
+
+
+def sign_upload(admin_client):
+    response = admin_client.post('/admin/direct-upload/sign')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def send_chunk(client, params, upload_id, data, start, end, fields=None):
+    return client.post(params['upload_url'], data={
+        **(fields or params['fields']),
+        'file': (io.BytesIO(data[start:end]), 'direct.mp4')
+    }, content_type='multipart/form-data', headers={
+        'X-Unique-Upload-Id': upload_id,
+        'Content-Range': f'bytes {start}-{end - 1}/{len(data)}'
+    })
+
+
+def complete(admin_client, result, title='Direct upload'):
+    return admin_client.post('/admin/direct-upload/complete', json={'title': title, 'result': result})
+
+
+def test_chunked_upload_resumes_at_offset(admin_client, client):
+    params = sign_upload(admin_client)
+    data = os.urandom(3000)
+    upload_id = 'resume' + os.urandom(4).hex()
+
+    assert send_chunk(client, params, upload_id, data, 0, 1024).get_json() == {'done': False, 'bytes': 1024}
+    # Koneksi putus setelah chunk kedua terkirim; browser mengulang dari offset yang sama
+    assert send_chunk(client, params, upload_id, data, 1024, 2048).status_code == 200
+    assert send_chunk(client, params, upload_id, data, 1024, 2048).get_json() == {'done': False, 'bytes': 2048}
+    result = send_chunk(client, params, upload_id, data, 2048, 3000).get_json()
+
+    assert result['bytes'] == len(data)
+    with open(streamflix.get_storage().local_path(result['public_id']), 'rb') as f:
+        assert f.read() == data
+
+
+def test_upload_with_bad_signature_is_rejected(admin_client, client):
+    params = sign_upload(admin_client)
+    fields = {**params['fields'], 'signature': '0' * 40}
+    response = send_chunk(client, params, 'badsig', b'data', 0, 4, fields=fields)
+    assert response.status_code == 401
+
+
+def test_upload_with_expired_signature_is_rejected(flask_app, admin_client, client):
+    params = sign_upload(admin_client)
+    fields = {
+        'timestamp': int(time.time()) - flask_app.config['DIRECT_UPLOAD_TTL'] - 60,
+        'folder': params['fields']['folder']
+    }
+    fields['signature'] = sign_params(fields, flask_app.config['SECRET_KEY'])
+    response = send_chunk(client, params, 'expired', b'data', 0, 4, fields=fields)
+    assert response.status_code == 401
+
+
+def test_complete_rejects_forged_result(admin_client, client):
+    params = sign_upload(admin_client)
+    result = send_chunk(client, params, 'forged', b'data', 0, 4).get_json()
+    result['public_id'] = 'streamflix_videos/someone-elses-file'
+    assert complete(admin_client, result).status_code == 400
+
+
+def test_complete_is_idempotent(admin_client, client, app_context):
+    params = sign_upload(admin_client)
+    result = send_chunk(client, params, 'replay' + os.urandom(4).hex(), b'video bytes', 0, 11).get_json()
+
+    first = complete(admin_client, result)
+    replay = complete(admin_client, result)
+
+    assert first.status_code == 200 and first.get_json()['created'] is True
+    assert replay.status_code == 200 and replay.get_json() == {'video_id': first.get_json()['video_id'], 'created': False}
+    assert streamflix.Video.query.filter_by(public_id=result['public_id']).count() == 1
+
+
+def test_complete_rejects_signed_asset_outside_the_video_target(flask_app, admin_client, client):
+    # Bukti pembayaran di akun storage yang sama juga punya tanda tangan yang sah
+    storage = streamflix.get_storage()
+    resource_type, folder = streamflix.UPLOAD_TARGETS['payment_proof']
+    params = storage.direct_upload_params(resource_type, folder)
+    proof = client.post(params['upload_url'], data={
+        **params['fields'],
+        'file': (io.BytesIO(b'proof'), 'proof.png')
+    }, content_type='multipart/form-data').get_json()
+    assert storage.verify_upload_result(proof)
+    assert complete(admin_client, proof).status_code == 400
+
+    video = send_chunk(client, sign_upload(admin_client), 'wrongtype', b'data', 0, 4).get_json()
+    assert complete(admin_client, {**video, 'resource_type': 'image'}).status_code == 400
+
+    params = storage.direct_upload_params('video', 'streamflix_posters')
+    elsewhere = send_chunk(client, params, 'wrongfolder', b'data', 0, 4).get_json()
+    assert complete(admin_client, elsewhere).status_code == 400
@@ -0,0 +1,121 @@
+import time
+
+import pytest
+from itsdangerous import URLSafeSerializer
+
+from conftest import streamflix
+
+db = streamflix.db
+AccessCode = streamflix.AccessCode
+
+
+# Tanpa fixture app_context: request test client akan memakai ulang app context
+# (dan flask.g) yang sedang aktif, sehingga entitlement request sebelumnya terbawa
+@pytest.fixture
+def redeem(flask_app, client, monkeypatch):
+    """Redeem a fresh code with `client`; returns (code_id, device_id)"""
+    # Semua test menebus dari 127.0.0.1; bucket IP/global tidak boleh ikut menentukan hasil
+    monkeypatch.setitem(flask_app.config, 'RATE_LIMIT_REDEEM_IP', '1000/60')
+    monkeypatch.setitem(flask_app.config, 'RATE_LIMIT_REDEEM_GLOBAL', '1000/1')
+
+    def redeem():
+        with flask_app.app_context():
+            _, codes = streamflix.mint_access_codes(1, days_valid=30)
+        response = client.post('/access-code', data={'code': codes[0]})
+        assert response.status_code == 302
+        with flask_app.app_context():
+            code = AccessCode.query.filter_by(code=codes[0]).one()
+            return code.id, code.device_id
+    return redeem
+
+
+def entitled(client):
+    return client.get('/api/viewer').get_json()['entitled']
+
+
+def as_other_instance(device_id, code_id):
+    """Forget this process's revocations and cache a stale grant, like an instance that missed the admin action"""
+    with streamflix._revocations_lock:
+        streamflix._revocations.clear()
+        streamflix._revocations_state.update(last_id=0, checked_at=None)
+    streamflix._store_entitlement(device_id, streamflix.Entitlement(
+        valid=True, expires_at=streamflix.utc_now() + streamflix.timedelta(days=30), code_id=code_id
+    ))
+
+
+def claim_token(client, secret, **claim):
+    with client.session_transaction() as session:
+        device_id = session['device_id']
+    claim = {'cid': 1, 'dev': device_id, 'exp': int(time.time()) + 3600, 'iat': int(time.time()), **claim}
+    return URLSafeSerializer(secret, salt='streamflix-entitlement').dumps(claim)
+
+
+def set_claim(client, token):
+    with client.session_transaction() as session:
+        session['entitlement'] = token
+
+
+def test_redeem_issues_a_claim_that_skips_the_database(flask_app, client, redeem):
+    code_id, device_id = redeem()
+    with client.session_transaction() as session:
+        assert session['entitlement']
+        assert session['device_id'] == device_id
+
+    # Baris kode hilang tanpa pencabutan: klaim yang ditandatangani tetap berlaku
+    with flask_app.app_context():
+        db.session.execute(db.delete(AccessCode).where(AccessCode.id == code_id))
+        db.session.commit()
+    streamflix.invalidate_entitlement(device_id)
+    assert entitled(client)
+
+
+@pytest.mark.parametrize('action', ['deactivate', 'reset', 'delete'])
+def test_admin_action_invalidates_issued_claim(client, admin_client, redeem, action):
+    code_id, device_id = redeem()
+    assert entitled(client)
+
+    response = admin_client.post(f'/admin/{action}-code/{code_id}')
+    assert response.status_code == 302
+    as_other_instance(device_id, code_id)
+    assert not entitled(client)
+
+
+@pytest.mark.parametrize('action', streamflix.REVOKING_CODE_ACTIONS)
+def test_bulk_action_invalidates_issued_claim(client, admin_client, redeem, action):
+    code_id, device_id = redeem()
+    assert entitled(client)
+
+    response = admin_client.post('/admin/bulk-action', data={'bulk_action': action, 'code_ids': [code_id]})
+    assert response.status_code == 302
+    as_other_instance(device_id, code_id)
+    assert not entitled(client)
+
+
+def test_extend_keeps_issued_claim(client, admin_client, redeem):
+    redeem_id, _ = redeem()
+    response = admin_client.post('/admin/bulk-action', data={'bulk_action': 'extend', 'code_ids': [redeem_id]})
+    assert response.status_code == 302
+    assert entitled(client)
+
+
+def test_tampered_claim_is_rejected(flask_app, client):
+    client.get('/access-code')
+    set_claim(client, claim_token(client, flask_app.config['SECRET_KEY']))
+    assert entitled(client)
+
+    set_claim(client, claim_token(client, 'not-the-secret-key'))
+    assert not entitled(client)
+    with client.session_transaction() as session:
+        assert 'entitlement' not in session
+
+
+def test_expired_claim_is_rejected(flask_app, client):
+    client.get('/access-code')
+    set_claim(client, claim_token(client, flask_app.config['SECRET_KEY'], exp=int(time.time()) - 1))
+    assert not entitled(client)
+
+
+def test_claim_for_another_device_is_rejected(flask_app, client):
+    client.get('/access-code')
+    set_claim(client, claim_token(client, flask_app.config['SECRET_KEY'], dev='someone-else'))
+    assert not entitled(client)
@@ -0,0 +1,47 @@
+import csv
+import gzip
+import io
+import json
+
+from conftest import streamflix
+
+
+def read_csv(data):
+    return list(csv.reader(io.StringIO(data.decode())))
+
+
+def test_code_batch_csv(flask_app, admin_client, app_context, monkeypatch):
+    # Potongan kecil supaya response benar-benar terdiri dari beberapa chunk
+    monkeypatch.setitem(flask_app.config, 'EXPORT_CHUNK_BYTES', 64)
+    batch_id, codes = streamflix.mint_access_codes(25, 7, 'batch export')
+
+    response = admin_client.get(f'/admin/codes/batch/{batch_id}.csv')
+    rows = read_csv(response.get_data())
+
+    assert response.mimetype == 'text/csv'
+    assert rows[0] == ['code', 'expires_at', 'notes']
+    assert sorted(row[0] for row in rows[1:]) == sorted(codes)
+    assert {row[2] for row in rows[1:]} == {'batch export'}
+
+
+def test_mint_codes_cli_writes_batch_csv(flask_app, tmp_path):
+    path = tmp_path / 'codes.csv'
+    result = flask_app.test_cli_runner().invoke(args=['mint-codes', '3', '--notes', 'cli', '--csv', str(path)])
+
+    assert result.exit_code == 0, result.output
+    rows = read_csv(path.read_bytes())
+    assert rows[0] == ['code', 'expires_at', 'notes']
+    assert len(rows) == 4 and all(row[2] == 'cli' for row in rows[1:])
+
+
+def test_export_resumes_from_watermark(admin_client, app_context):
+    streamflix.mint_access_codes(3, 7, 'watermark')
+    first = admin_client.get('/admin/export/codes.ndjson?search=watermark')
+    watermark = int(first.headers['X-Export-Watermark'])
+    _, new_codes = streamflix.mint_access_codes(2, 7, 'watermark')
+
+    second = admin_client.get(f'/admin/export/codes.ndjson?search=watermark&since={watermark}&gzip=1')
+    rows = [json.loads(line) for line in gzip.decompress(second.get_data()).splitlines()]
+
+    assert len(first.get_data().splitlines()) == 3
+    assert sorted(row['code'] for row in rows) == sorted(new_codes)
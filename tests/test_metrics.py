@@ -0,0 +1,18 @@
+
+def test_metrics_hidden_without_token(flask_app, client, monkeypatch):
+    monkeypatch.setitem(flask_app.config, 'METRICS_TOKEN', None)
+    assert client.get('/metrics').status_code == 404
+
+
+def test_metrics_for_logged_in_admin(flask_app, admin_client, monkeypatch):
+    monkeypatch.setitem(flask_app.config, 'METRICS_TOKEN', None)
+    response = admin_client.get('/metrics')
+    assert response.status_code == 200
+    assert b'streamflix_code_sweeper_runs_total' in response.get_data()
+
+
+def test_metrics_requires_the_configured_token(flask_app, client, monkeypatch):
+    monkeypatch.setitem(flask_app.config, 'METRICS_TOKEN', 'scrape-secret')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
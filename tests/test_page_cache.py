@@ -0,0 +1,31 @@
+from conftest import streamflix
+
+
+def test_unread_query_params_share_one_cache_entry(client):
+    streamflix.bump_catalog_version()
+    first = client.get('/api/videos?limit=5')
+    for i in range(20):
+        response = client.get(f'/api/videos?limit=5&utm_source=spam{i}&_={i}')
+        assert response.get_data() == first.get_data()
+
+    keys = [key for key in streamflix._page_cache if key[1] == '/api/videos']
+    assert keys == [('anon', '/api/videos', (None, '5', None, None))]
+
+
+def test_params_the_view_reads_stay_in_the_key(client):
+    streamflix.bump_catalog_version()
+    client.get('/api/search?q=abc')
+    client.get('/api/search?q=xyz&fbclid=1')
+
+    keys = sorted(key[2] for key in streamflix._page_cache if key[1] == '/api/search')
+    assert keys == [('abc', None), ('xyz', None)]
+
+
+def test_search_page_is_shared_by_entitled_and_anonymous_viewers(client, monkeypatch):
+    # search.html tidak bergantung pada entitlement, jadi tidak perlu dua salinan
+    streamflix.bump_catalog_version()
+    client.get('/search?q=abc')
+    monkeypatch.setattr(streamflix, 'check_access_code', lambda: True)
+    client.get('/search?q=abc')
+
+    assert [key for key in streamflix._page_cache if key[1] == '/search'] == [('anon', '/search', ('abc',))]
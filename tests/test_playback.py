@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from conftest import streamflix
+
+db = streamflix.db
+VideoPlaybackHourly = streamflix.VideoPlaybackHourly
+
+
+@pytest.fixture
+def videos(flask_app):
+    """Two fresh catalog videos; returns their ids"""
+    with flask_app.app_context():
+        rows = [streamflix.Video(title=f'Playback {i}', url=f'/media/playback-{i}.mp4') for i in range(2)]
+        db.session.add_all(rows)
+        db.session.commit()
+        return [row.id for row in rows]
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer(flask_app):
+    with flask_app.app_context():
+        streamflix.flush_playback()
+
+
+def beacon(client, *events):
+    response = client.post('/api/playback', json={'events': list(events)})
+    assert response.status_code == 204
+
+
+def plays(flask_app, video_id):
+    with flask_app.app_context():
+        return db.session.query(db.func.sum(VideoPlaybackHourly.plays)).filter_by(video_id=video_id).scalar() or 0
+
+
+def test_beacon_only_buffers_below_the_threshold(flask_app, client, videos):
+    beacon(client, {'video_id': videos[0], 'event': 'play'})
+    assert plays(flask_app, videos[0]) == 0
+    assert streamflix.playback_stats()['buffered_events'] == 1
+
+
+def test_beacon_over_the_threshold_flushes_inline(flask_app, client, videos, monkeypatch):
+    monkeypatch.setitem(flask_app.config, 'PLAYBACK_FLUSH_EVENTS', 3)
+    beacon(client, *[{'video_id': videos[0], 'event': 'play'}] * 2)
+    assert plays(flask_app, videos[0]) == 0
+
+    beacon(client, {'video_id': videos[0], 'event': 'play'}, {'video_id': videos[0], 'event': 'progress', 'seconds': 30})
+    assert plays(flask_app, videos[0]) == 3
+    assert streamflix.playback_stats()['buffered_events'] == 0
+
+
+def test_request_after_the_interval_flushes_without_the_thread(flask_app, client, videos, monkeypatch):
+    # Di serverless thread flusher dibekukan; request berikutnya yang menulis buffer
+    monkeypatch.setitem(flask_app.config, 'PLAYBACK_FLUSH_INTERVAL', 10)
+    beacon(client, {'video_id': videos[0], 'event': 'play'})
+    assert plays(flask_app, videos[0]) == 0
+
+    monkeypatch.setitem(streamflix._playback, 'flushed_at', time.monotonic() - 10)
+    client.get('/health')
+    assert plays(flask_app, videos[0]) == 1
+
+
+def test_flushed_plays_order_the_popular_catalog(flask_app, client, videos, monkeypatch):
+    monkeypatch.setitem(flask_app.config, 'PLAYBACK_FLUSH_EVENTS', 5)
+    monkeypatch.setitem(flask_app.config, 'POPULAR_CACHE_TTL', 0)
+    quiet, popular = videos
+    beacon(client, {'video_id': quiet, 'event': 'play'}, *[{'video_id': popular, 'event': 'play'}] * 4)
+    streamflix.bump_catalog_version()
+
+    response = client.get('/api/videos', query_string={'sort': 'popular', 'limit': 50})
+    ids = [video['id'] for video in response.get_json()['videos']]
+    assert ids.index(popular) < ids.index(quiet)
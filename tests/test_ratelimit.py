@@ -0,0 +1,49 @@
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT, streamflix
+from ratelimit import Limit, MemoryBackend, RateLimiter
+
+
+def test_hit_refunds_earlier_buckets_when_a_later_one_is_empty():
+    limiter = RateLimiter(MemoryBackend())
+    wide, narrow = ('ip', Limit(10, 60)), ('device', Limit(1, 60))
+
+    assert limiter.hit([wide, narrow]).allowed
+    for _ in range(5):
+        assert not limiter.hit([wide, narrow]).allowed
+    # Hanya permintaan yang lolos yang memakai token bucket ip
+    assert 9 <= limiter.backend._buckets['ip'][0] < 9.5
+
+
+def test_malformed_codes_do_not_take_redeem_tokens(flask_app, client, monkeypatch):
+    monkeypatch.setitem(flask_app.config, 'RATE_LIMIT_REDEEM_DEVICE', '2/60')
+    for _ in range(5):
+        response = client.post('/access-code', data={'code': 'not-a-code'})
+        assert response.status_code == 200
+
+    response = client.post('/access-code', data={'code': 'DEADBEEF'})
+    assert response.status_code == 200
+    assert b'Kode akses tidak valid' in response.data
+
+
+def test_redis_backend_requires_an_explicit_url():
+    env = {**os.environ, 'RATE_LIMIT_BACKEND': 'redis'}
+    env.pop('RATE_LIMIT_URL', None)
+    result = subprocess.run([sys.executable, '-c', 'import app'], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode != 0
+    assert 'RATE_LIMIT_URL' in result.stderr
+
+
+@pytest.mark.skipif(importlib.util.find_spec('redis') is not None, reason='redis terpasang')
+def test_redis_backend_names_the_missing_package():
+    env = {**os.environ, 'RATE_LIMIT_BACKEND': 'redis', 'RATE_LIMIT_URL': 'redis://localhost:6379/0'}
+    result = subprocess.run([sys.executable, '-c', 'import app'], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode != 0
+    assert 'butuh paket redis' in result.stderr
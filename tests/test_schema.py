@@ -0,0 +1,28 @@
+import pytest
+
+from conftest import streamflix
+
+
+@pytest.mark.parametrize('name,build_query,index_name', streamflix.HOT_QUERY_PLANS,
+                         ids=[name for name, _, _ in streamflix.HOT_QUERY_PLANS])
+def test_hot_query_uses_its_index(app_context, name, build_query, index_name):
+    plan = streamflix.explain_query_plan(build_query())
+    assert streamflix.plan_uses_index(plan, index_name), ' | '.join(plan)
+
+
+def test_models_match_migrations(app_context):
+    from flask_migrate import check
+
+    # `flask db check`: autogenerate tidak boleh menemukan perubahan yang belum dimigrasi
+    streamflix.init_migrate()
+    check()
+
+
+def test_ensure_database_fast_path_sees_the_alembic_head(app_context):
+    from alembic.script import ScriptDirectory
+
+    # ensure_database membaca head dari file migrasi tanpa alembic; harus sama dengan alembic
+    streamflix.init_migrate()
+    config = streamflix.app.extensions['migrate'].migrate.get_config()
+    assert streamflix.migration_heads() == set(ScriptDirectory.from_config(config).get_heads())
+    assert streamflix.schema_is_current()
@@ -0,0 +1,136 @@
+import io
+import os
+
+import pytest
+
+from conftest import streamflix
+
+db = streamflix.db
+UploadJob = streamflix.UploadJob
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    # Job yang diantrekan ulang menunggu 2^attempts detik sebelum worker lanjut
+    monkeypatch.setattr(streamflix.time, 'sleep', lambda seconds: None)
+
+
+def drain_uploads():
+    while streamflix.process_next_upload():
+        pass
+
+
+def upload_video(admin_client, filename, data, title='Test video'):
+    response = admin_client.post('/admin/upload', data={
+        'title': title,
+        'video': (io.BytesIO(data), filename)
+    }, content_type='multipart/form-data')
+    assert response.status_code == 302
+    return UploadJob.query.filter_by(filename=filename).order_by(UploadJob.id.desc()).first()
+
+
+def test_upload_resumes_from_last_checkpointed_chunk(flask_app, admin_client, app_context, monkeypatch, no_backoff):
+    monkeypatch.setitem(flask_app.config, 'UPLOAD_CHUNK_SIZE', 1024)
+    # Job lain (mis. ingest dari test sebelumnya) tidak boleh diambil duluan
+    drain_uploads()
+    data = os.urandom(2560)
+    job = upload_video(admin_client, 'resume.mp4', data, title='Resume')
+
+    storage = streamflix.get_storage()
+    upload_chunk = storage.upload_chunk
+    offsets = []
+
+    def flaky_upload_chunk(upload_id, chunk, offset, *args, **kwargs):
+        offsets.append(offset)
+        if len(offsets) == 2:
+            raise ConnectionError('koneksi ke storage terputus')
+        return upload_chunk(upload_id, chunk, offset, *args, **kwargs)
+
+    monkeypatch.setattr(storage, 'upload_chunk', flaky_upload_chunk)
+
+    assert streamflix.process_next_upload()
+    db.session.refresh(job)
+    assert job.status == 'queued'
+    assert job.uploaded_bytes == 1024
+
+    drain_uploads()
+    db.session.refresh(job)
+    # Percobaan kedua mulai dari chunk yang gagal, bukan dari awal file
+    assert offsets == [0, 1024, 1024, 2048]
+    assert job.status == 'done'
+    assert job.uploaded_bytes == len(data)
+
+    video = db.session.get(streamflix.Video, job.target_id)
+    assert video.title == 'Resume'
+    with open(storage.local_path(video.public_id), 'rb') as f:
+        assert f.read() == data
+
+
+def test_video_upload_job_fails_after_max_attempts(flask_app, admin_client, app_context, monkeypatch, no_backoff):
+    monkeypatch.setitem(flask_app.config, 'UPLOAD_MAX_ATTEMPTS', 2)
+    job = upload_video(admin_client, 'lost.mp4', b'not really a video', title='Lost spool')
+    os.remove(job.spool_path)
+
+    drain_uploads()
+    db.session.refresh(job)
+    assert job.status == 'failed'
+    assert job.attempts == 2
+    assert job.error
+    assert streamflix.Video.query.filter_by(title='Lost spool').first() is None
+
+
+def test_failed_payment_proof_job_marks_payment_failed(flask_app, client, app_context, monkeypatch, no_backoff):
+    monkeypatch.setitem(flask_app.config, 'UPLOAD_MAX_ATTEMPTS', 1)
+    response = client.post('/payment', data={
+        'name': 'Budi',
+        'email': 'budi@test.local',
+        'phone': '0812',
+        'payment_method': 'dana',
+        'amount': '10000',
+        'proof_image': (io.BytesIO(b'proof'), 'proof-failed.png')
+    }, content_type='multipart/form-data')
+    assert response.status_code == 302
+
+    job = UploadJob.query.filter_by(filename='proof-failed.png').order_by(UploadJob.id.desc()).first()
+    os.remove(job.spool_path)
+    drain_uploads()
+
+    db.session.refresh(job)
+    assert job.status == 'failed'
+    assert db.session.get(streamflix.PaymentProof, job.target_id).status == 'failed'
+
+
+def test_inline_upload_finishes_within_the_request(flask_app, admin_client, app_context, monkeypatch):
+    # Serverless: spool hanya ada di /tmp instance penerima, jadi tidak boleh tertinggal di antrean
+    monkeypatch.setitem(flask_app.config, 'UPLOAD_INLINE', True)
+    monkeypatch.setitem(flask_app.config, 'UPLOAD_CHUNK_SIZE', 1024)
+    data = os.urandom(2100)
+    job = upload_video(admin_client, 'inline.mp4', data, title='Inline')
+
+    assert job.status == 'done'
+    assert job.uploaded_bytes == len(data)
+    assert not os.path.exists(job.spool_path)
+    video = db.session.get(streamflix.Video, job.target_id)
+    with open(streamflix.get_storage().local_path(video.public_id), 'rb') as f:
+        assert f.read() == data
+
+
+def test_inline_upload_retries_from_the_failed_chunk(flask_app, admin_client, app_context, monkeypatch):
+    monkeypatch.setitem(flask_app.config, 'UPLOAD_INLINE', True)
+    monkeypatch.setitem(flask_app.config, 'UPLOAD_CHUNK_SIZE', 1024)
+    storage = streamflix.get_storage()
+    upload_chunk = storage.upload_chunk
+    offsets = []
+
+    def flaky_upload_chunk(upload_id, chunk, offset, *args, **kwargs):
+        offsets.append(offset)
+        if len(offsets) == 2:
+            raise ConnectionError('koneksi ke storage terputus')
+        return upload_chunk(upload_id, chunk, offset, *args, **kwargs)
+
+    monkeypatch.setattr(storage, 'upload_chunk', flaky_upload_chunk)
+    job = upload_video(admin_client, 'inline-retry.mp4', os.urandom(2100), title='Inline retry')
+
+    assert job.status == 'done'
+    assert job.attempts == 2
+    assert offsets == [0, 1024, 1024, 2048]